@@ -1,19 +1,33 @@
+import os
+import sys
+
 import can
-import struct
 
-bus = can.interface.Bus(bustype='socketcan', channel='can0')
+# joystick_codec.py lives next to the Pico's code.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "pico"))
+from joystick_codec import FRAME_ID, decode_batch, sequence_gap  # noqa: E402
 
-joystick_id = 0x20
+bus = can.interface.Bus(bustype='socketcan', channel='can0')
 
+joystick_id = FRAME_ID
+# frames decoded per batch when the bus is busy
+batch_size = 64
 
+last_sequence = None
 while True:
+    # wait for one frame, then take whatever else is already queued
+    payloads = []
     message = bus.recv()
-    if message.arbitration_id == joystick_id:
-        x, y = struct.unpack("ff", message.data)
-        x = x 
-        y = y 
-        print("Joystick position received: x={:.2f}, y={:.2f}".format(x, y))
-        #print(message.data)
-
-
+    while message is not None:
+        if message.arbitration_id == joystick_id:
+            payloads.append(message.data)
+        if len(payloads) == batch_size:
+            break
+        message = bus.recv(0)
 
+    for frame in decode_batch(payloads):
+        if last_sequence is not None and sequence_gap(last_sequence, frame.sequence):
+            print("Missed {} frame(s)".format(sequence_gap(last_sequence, frame.sequence)))
+        last_sequence = frame.sequence
+        print("Joystick position received: x={}, y={}, buttons={:#04x}".format(
+            frame.x, frame.y, frame.buttons))
@@ -1,6 +1,7 @@
 import board
 import analogio
 import time
+from joystick_filter import JoystickSampler
 
 start_time = time.monotonic()
 
@@ -25,22 +26,15 @@ center_x = 32768
 center_y = 32768
 dead_zone = 650
 
+# X and Y are sampled alternately, 8 readings each per read, through a running median and a
+# moving average (see joystick_filter.py; cantools/bench_adc_filter.py compares it with the old
+# sort-200-samples routine)
+sampler = JoystickSampler(xaxi, yaxi, samples=8, dead_zone=dead_zone)
+sampler.x.centre = center_x
+sampler.y.centre = center_y
+
 while True:
-    x_list = []
-    y_list = []
-    for i in range(200):
-        x_list.append(xaxi.value)
-        #x_list.append(65536 - xaxi.value)   #inverted - if Joystick is attached upside down        
-    for i in range(200):
-        y_list.append(yaxi.value)
-        #y_list.append(65536 - yaxi.value)   #inverted - if Joystick is attached upside down
-    x_list.sort()
-    y_list.sort()
-    x = x_list[100]
-    y = y_list[100]
-    if abs(x - center_x) < dead_zone:
-        x = center_x
-    if abs(y - center_y) < dead_zone:
-        y = center_y
+    x, y = sampler.read()
+    #x, y = 65536 - x, 65536 - y   #inverted - if Joystick is attached upside down
     print(x,y)     #Debugging print
     time.sleep(0.01)
@@ -11,18 +11,95 @@ import board
 import analogio
 import busio
 from digitalio import DigitalInOut
-from adafruit_mcp2515.canio import Message
+from adafruit_mcp2515.canio import Message, RemoteTransmissionRequest
 from adafruit_mcp2515 import MCP2515 as CAN
-import asyncio
-import struct
-import math
+from joystick_tx import JoystickTransmitter, ON_CHANGE, FIXED_RATE
+from joystick_codec import Encoder, FRAME_ID, AXIS_MIN, AXIS_MAX
+from periodic import PeriodicScheduler, SKIP, CATCH_UP
+from joystick_filter import JoystickSampler
+from joystick_calibration import AxisCalibration
+import telemetry
+from telemetry import (
+    Telemetry,
+    EVENT_JOYSTICK_SENT,
+    EVENT_FRAME_RECEIVED,
+    EVENT_SEND_FAILED,
+    EVENT_TASK_MISSED,
+)
+import usb_cdc
+
+##Periods, in ms. Each task runs on its own deadline, so the work it does doesn't stretch the period
+JOYSTICK_PERIOD_MS = 10
+CAN_RX_PERIOD_MS = 10
+REPORT_PERIOD_MS = 10000  # print the bus-load counters and task timings this often
+TELEMETRY_PERIOD_MS = 50  # write buffered telemetry to USB this often
+PROFILE_TASKS = False     # also report how long each task takes; allocates, so for bench use only
+
+##Telemetry: events are recorded into a ring buffer and written to USB in batches by a low-priority
+##task, decode them on the host with cantools/telemetry_dump.py. Enabling the second USB serial port
+##in boot.py (usb_cdc.enable(console=True, data=True)) keeps them apart from the console.
+TELEMETRY_LEVEL = telemetry.INFO
+
+##Stick filtering: readings per axis per sample (X and Y alternate)
+JOYSTICK_SAMPLES = 8
+
+##Stick calibration, per axis: the rest position, the readings around it that send 0, whether the
+##axis is flipped (stick attached upside down) and the gain. Turned into lookup tables at startup.
+JOYSTICK_CENTRE_X = 32768
+JOYSTICK_CENTRE_Y = 32768
+JOYSTICK_DEAD_ZONE = 650
+JOYSTICK_INVERT_X = False
+JOYSTICK_INVERT_Y = False
+JOYSTICK_SCALE_X = 1.0
+JOYSTICK_SCALE_Y = 1.0
+JOYSTICK_STEPS = 15       # levels either side of 0, so 31 commands from -500 to 500
+
+##Transmission: ON_CHANGE sends only when the stick moves (plus a heartbeat), FIXED_RATE every poll
+TX_MODE = ON_CHANGE
+TX_DEADBAND = 0           # largest per-axis change not worth a frame (one step is ~33)
+TX_HEARTBEAT_MS = 500     # repeat the position at least this often
+TX_MIN_SPACING_MS = 20    # never send faster than this
 
 cs = DigitalInOut(board.GP17)
 cs.switch_to_output()
 spi = busio.SPI(board.GP18, board.GP19, board.GP16)
 xaxi = analogio.AnalogIn(board.GP26_A0)
 yaxi = analogio.AnalogIn(board.GP27_A1)
-can_bus = CAN(spi, cs)
+sampler = JoystickSampler(
+    xaxi,
+    yaxi,
+    samples=JOYSTICK_SAMPLES,
+    dead_zone=0,  # applied by the calibration instead
+)
+x_calibration = AxisCalibration(
+    centre=JOYSTICK_CENTRE_X,
+    dead_zone=JOYSTICK_DEAD_ZONE,
+    invert=JOYSTICK_INVERT_X,
+    scale=JOYSTICK_SCALE_X,
+    steps=JOYSTICK_STEPS,
+    limit=AXIS_MAX,
+)
+y_calibration = AxisCalibration(
+    centre=JOYSTICK_CENTRE_Y,
+    dead_zone=JOYSTICK_DEAD_ZONE,
+    invert=JOYSTICK_INVERT_Y,
+    scale=JOYSTICK_SCALE_Y,
+    steps=JOYSTICK_STEPS,
+    limit=AXIS_MAX,
+)
+# fast_init gets the joystick back on the bus within a millisecond of a brown-out or hot-plug
+can_bus = CAN(spi, cs, fast_init=True)
+# With the MCP2515 INT line wired to GP20, receive polls skip the SPI bus while nothing is pending:
+# can_bus = CAN(spi, cs, fast_init=True, int_pin=board.GP20)
+transmitter = JoystickTransmitter(
+    TX_MODE,
+    deadband=TX_DEADBAND,
+    heartbeat_ms=TX_HEARTBEAT_MS,
+    min_spacing_ms=TX_MIN_SPACING_MS,
+)
+encoder = Encoder()
+log = Telemetry(level=TELEMETRY_LEVEL)
+telemetry_port = usb_cdc.data or usb_cdc.console
 
 ##To use filters, 2 filters can be used
 class Match:
@@ -31,60 +108,71 @@ class Match:
         self.mask = mask
         self.extended = extended
 
-##Packing joystickvalues in 0-1000 
-async def send_joystick_position(x, y):
-    if not (-500 <= x <= 500) or not (-500 <= y <= 500):
+##Packing joystickvalues in -500..500, see joystick_codec.py for the frame layout
+def send_joystick_position(x, y, buttons=0):
+    if not (AXIS_MIN <= x <= AXIS_MAX) or not (AXIS_MIN <= y <= AXIS_MAX):
+        return
+    sequence = encoder.sequence
+    data = encoder.encode(x, y, buttons)
+    message = Message(id=FRAME_ID, data=data, extended=True)
+    # a position still waiting to go out is stale, replace it rather than queue behind it
+    try:
+        can_bus.send_latest(message)
+    except RuntimeError:
+        # no room to queue it before the send timeout; the next change or heartbeat retries
+        log.error(EVENT_SEND_FAILED, c=FRAME_ID)
         return
-    id = 0x020
-    data = struct.pack("ff", x, y)
-    message = Message(id=id, data=data, extended=True)
-    can_bus.send(message)
-    print(f"Joystick position sent: x={x}, y={y}")
-
-
-async def read_joystick_position():
-    while True:
-        x = xaxi.value / 65535 * 1000
-        y = yaxi.value / 65535 * 1000
-        
-        scale_x = 100/3
-        scale_y = 100/3
-        
-        xamounts = math.floor(x/scale_x)
-        yamounts = math.floor(y/scale_y)
-        
-        xclamped = scale_x*xamounts
-        yclamped = scale_y*yamounts
-        xclamped-=500
-        yclamped-=500
-        await send_joystick_position(round(xclamped), round(yclamped))
-        await asyncio.sleep(0.01)
+    log.info(EVENT_JOYSTICK_SENT, x, y, sequence)
+
+
+def read_joystick_position():
+    x_raw, y_raw = sampler.read()
+    x = x_calibration.quantize(x_raw)
+    y = y_calibration.quantize(y_raw)
+    if transmitter.update(x, y):
+        send_joystick_position(x, y)
 
 #Listening on bus for filtered messages.
-async def listen_can(listener):
-    while True:
-        message_count = listener.in_waiting()
-        for _i in range(message_count):
-            msg = listener.receive()
-            print("Message from: ", hex(msg.id))
-            print(msg.data)
-
-            #do something with the data
-               
-        await asyncio.sleep(0.01)
-
-async def main():
+def listen_can():
+    for msg in can_bus.read_messages():
+        data = msg.data if not isinstance(msg, RemoteTransmissionRequest) else b""
+        log.info(EVENT_FRAME_RECEIVED, len(data), data[0] if data else 0, msg.id)
+
+        #do something with the data
+
+def report():
+    print(transmitter.report(can_bus.baudrate))
+    transmitter.reset_counters()
+    print(scheduler.report())
+    scheduler.reset_stats()
+
+def flush_telemetry():
+    if telemetry_port is not None:
+        log.flush(telemetry_port)
+
+def task_missed(index, count):
+    log.warning(EVENT_TASK_MISSED, index, 0, count)
+
+scheduler = PeriodicScheduler(on_missed=task_missed, profile=PROFILE_TASKS)
+# SKIP: a late joystick sample is replaced by the next one, never sent twice in a row
+scheduler.add(read_joystick_position, JOYSTICK_PERIOD_MS, policy=SKIP, name="joystick")
+# CATCH_UP: every missed receive poll is made up, so the receive buffers are drained quickly
+scheduler.add(listen_can, CAN_RX_PERIOD_MS, policy=CATCH_UP, name="can rx", phase_ms=5)
+scheduler.add(report, REPORT_PERIOD_MS, name="report", phase_ms=REPORT_PERIOD_MS)
+# added last: runs after the control tasks whenever they are due at the same time
+scheduler.add(flush_telemetry, TELEMETRY_PERIOD_MS, name="telemetry", phase_ms=2)
+
+def main():
     matches = [
          #  Match(0xF1,0xFF,True),
            Match(0x941,0xFFF,True),
            ]
-    with can_bus.listen(matches) as listener:
-        task1 = asyncio.create_task(listen_can(listener))
-        task2 = asyncio.create_task(read_joystick_position())
-        await asyncio.gather(task1, task2)
+    # the listener programs the filters; frames are then read by the "can rx" task
+    with can_bus.listen(matches):
+        scheduler.run()
 
 try:
-    asyncio.run(main())
+    main()
 except KeyboardInterrupt:
     print("Program ended")
 
@@ -0,0 +1,52 @@
+"""Power-of-two histograms for timing statistics in the application; see `Histogram`"""
+
+
+class Histogram:
+    """Counts of non-negative integers in power-of-two buckets: bucket 0 holds 0, bucket 1 holds
+    1, bucket 2 holds 2-3, bucket 3 holds 4-7 and so on, with everything too large for the last
+    bucket counted there. Recording a small int is a few compares and allocates nothing.
+
+    Args:
+        bucket_count (int): The number of buckets. Defaults to 12 (up to 1024 and above)
+    """
+
+    def __init__(self, bucket_count=12):
+        self._counts = [0] * bucket_count
+        self.count = 0
+        self.max = None
+
+    def record(self, value):
+        """Add one value"""
+        if value < 0:
+            value = 0
+        index = 0
+        limit = 1
+        last = len(self._counts) - 1
+        while value >= limit and index < last:
+            index += 1
+            limit <<= 1
+        self._counts[index] += 1
+        self.count += 1
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def percentile(self, percent):
+        """The upper bound of the bucket holding the `percent` percentile, capped at `max`, or
+        None if nothing was recorded"""
+        if not self.count:
+            return None
+        wanted = self.count * percent / 100
+        seen = 0
+        last = len(self._counts) - 1
+        for index in range(last):
+            seen += self._counts[index]
+            if seen >= wanted and self._counts[index]:
+                return min((1 << index) - 1 if index else 0, self.max)
+        return self.max
+
+    def reset(self):
+        """Forget every recorded value"""
+        for index in range(len(self._counts)):
+            self._counts[index] = 0
+        self.count = 0
+        self.max = None
@@ -0,0 +1,105 @@
+"""Turns filtered ADC counts into joystick commands with table lookups; see `AxisCalibration`"""
+
+RAW_MAX = 65535
+MIN_BIN_SHIFT = 6  # 64 counts: the coarse table never exceeds 1 KB
+
+
+class AxisCalibration:  # pylint: disable=too-many-instance-attributes
+    """The mapping from one axis' raw ADC counts to a quantized command, worked out once.
+
+    The mapping itself, used only while building the tables: the reading is optionally inverted,
+    taken relative to `centre`, zeroed within `dead_zone` of it, scaled so each side (starting
+    at the edge of the dead zone) spans -1..1 times `scale`, clipped, and rounded to the nearest
+    of `steps` levels per side. Level n sends ``round(n * limit / steps)``.
+
+    The tables: the raw value where each level starts, and a coarse table indexed by the top
+    bits of the reading, with bins narrower than the levels. `quantize` looks up the bin,
+    compares against the next level's start (once, unless a level is narrower than a bin) and
+    returns the command: integer operations only, and nothing allocated.
+
+    Args:
+        centre (int): The reading with the stick at rest. Defaults to 32768
+        dead_zone (int): Readings closer than this to `centre` send 0. Defaults to 650
+        invert (bool): Flip the axis, for a stick mounted upside down. Defaults to `False`
+        scale (float): Gain; above 1 reaches full command before the end of travel, below 1\
+            never does. Defaults to 1.0
+        steps (int): Levels on each side of 0. Defaults to 15 (31 values, as before)
+        limit (int): The command at full deflection. Defaults to 500
+    """
+
+    def __init__(
+        self, *, centre=32768, dead_zone=650, invert=False, scale=1.0, steps=15, limit=500
+    ):  # pylint: disable=too-many-arguments
+        self.centre = centre
+        self.dead_zone = dead_zone
+        self.invert = invert
+        self.scale = scale
+        self.steps = steps
+        self.limit = limit
+        # command for each level index, index 0 being -steps
+        self._commands = tuple(
+            round((index - steps) * limit / steps) for index in range(2 * steps + 1)
+        )
+        # _starts[i]: the first raw reading of level index i + 1; RAW_MAX + 1 if never reached
+        self._starts = [self._first_reading_at(index + 1) for index in range(2 * steps)]
+        self._starts.append(RAW_MAX + 1)
+
+        narrowest = RAW_MAX + 1
+        previous = 0
+        for start in self._starts:
+            if start > previous:
+                narrowest = min(narrowest, start - previous)
+            previous = start
+        # bins no wider than the narrowest level, so a lookup compares once, but no narrower than
+        # 2**MIN_BIN_SHIFT counts either: a sliver of a level costs a compare, not a bigger table
+        self._shift = MIN_BIN_SHIFT
+        while (2 << self._shift) <= narrowest and self._shift < 15:
+            self._shift += 1
+        self._coarse = bytearray((RAW_MAX >> self._shift) + 1)
+        index = 0
+        for bin_index in range(len(self._coarse)):
+            raw = bin_index << self._shift
+            while self._starts[index] <= raw:
+                index += 1
+            self._coarse[bin_index] = index
+
+    def _level(self, raw):
+        """The level (-steps..steps) of a reading that has already been inverted if needed"""
+        offset = raw - self.centre
+        if -self.dead_zone < offset < self.dead_zone:
+            return 0
+        if offset > 0:
+            span = RAW_MAX - self.centre - self.dead_zone
+        else:
+            span = self.centre - self.dead_zone
+        position = (abs(offset) - self.dead_zone) / max(span, 1) * self.scale
+        level = min(int(position * self.steps + 0.5), self.steps)
+        return level if offset > 0 else -level
+
+    def _first_reading_at(self, index):
+        """The lowest reading whose level index is at least `index`, by bisection"""
+        wanted = index - self.steps
+        low = 0
+        high = RAW_MAX + 1
+        while low < high:
+            middle = (low + high) // 2
+            if self._level(middle) >= wanted:
+                high = middle
+            else:
+                low = middle + 1
+        return low
+
+    def quantize(self, raw):
+        """The command for a reading of 0..65535"""
+        if self.invert:
+            raw = RAW_MAX - raw
+        index = self._coarse[raw >> self._shift]
+        starts = self._starts
+        while raw >= starts[index]:
+            index += 1
+        return self._commands[index]
+
+    @property
+    def table_size(self):
+        """Bytes used by the coarse table (read-only)"""
+        return len(self._coarse)
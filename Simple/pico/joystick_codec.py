@@ -0,0 +1,140 @@
+"""Joystick CAN frame layout, shared by the Pico sender (code.py) and the host receiver
+(Simple/Receiver/joycan.py).
+
+Version 1, 8 bytes, little endian:
+
+    byte 0     version
+    byte 1     sequence, counting up by one per frame and wrapping at 256
+    bytes 2-3  x, int16, -500..500
+    bytes 4-5  y, int16, -500..500
+    byte 6     buttons, one bit per button
+    byte 7     checksum, chosen so all 8 bytes add up to 0 modulo 256
+
+The float version this replaces filled all 8 bytes with two axes; int16 axes leave room for the
+sequence, buttons and checksum, and a later version can add axes the same way.
+"""
+import struct
+from collections import namedtuple
+
+try:
+    from struct import Struct
+except ImportError:
+    # CircuitPython's struct has the functions but not the class
+
+    class Struct:
+        """The parts of `struct.Struct` used here"""
+
+        def __init__(self, fmt):
+            self.format = fmt
+            self.size = struct.calcsize(fmt)
+
+        def pack_into(self, buffer, offset, *values):
+            """Matches `struct.Struct.pack_into`"""
+            struct.pack_into(self.format, buffer, offset, *values)
+
+        def unpack_from(self, buffer, offset=0):
+            """Matches `struct.Struct.unpack_from`"""
+            return struct.unpack_from(self.format, buffer, offset)
+
+
+VERSION = 1
+FRAME_ID = 0x020
+FRAME_SIZE = 8
+AXIS_MIN = -500
+AXIS_MAX = 500
+
+# everything before the checksum byte
+_BODY = Struct("<BBhhB")
+_CHECKSUM_OFFSET = _BODY.size
+
+JoystickFrame = namedtuple("JoystickFrame", ["version", "sequence", "x", "y", "buttons"])
+
+
+def checksum(data, end=_CHECKSUM_OFFSET):
+    """The byte that makes ``data[:end]`` plus itself add up to 0 modulo 256"""
+    total = 0
+    for idx in range(end):
+        total += data[idx]
+    return -total & 0xFF
+
+
+def sequence_gap(previous, current):
+    """Frames missed between two sequence numbers: 0 when `current` directly follows
+    `previous`"""
+    return (current - previous - 1) & 0xFF
+
+
+class Encoder:
+    """Packs positions into version 1 frames, numbering them as it goes"""
+
+    def __init__(self):
+        self.sequence = 0
+
+    def encode_into(self, buffer, x, y, buttons=0):
+        """Pack a frame into the first `FRAME_SIZE` bytes of `buffer`, without allocating
+
+        Raises:
+            ValueError: If an axis is outside `AXIS_MIN`..`AXIS_MAX`
+        """
+        if not (AXIS_MIN <= x <= AXIS_MAX and AXIS_MIN <= y <= AXIS_MAX):
+            raise ValueError("Axis value out of range")
+        _BODY.pack_into(buffer, 0, VERSION, self.sequence, x, y, buttons)
+        buffer[_CHECKSUM_OFFSET] = checksum(buffer)
+        self.sequence = (self.sequence + 1) & 0xFF
+        return buffer
+
+    def encode(self, x, y, buttons=0):
+        """A new `FRAME_SIZE`-byte frame"""
+        return self.encode_into(bytearray(FRAME_SIZE), x, y, buttons)
+
+
+def decode(data):
+    """Unpack one frame
+
+    Returns:
+        JoystickFrame: The decoded frame
+
+    Raises:
+        ValueError: If the length, version or checksum is wrong
+    """
+    if len(data) != FRAME_SIZE:
+        raise ValueError("Expected %d bytes, got %d" % (FRAME_SIZE, len(data)))
+    if data[0] != VERSION:
+        raise ValueError("Unsupported joystick frame version %d" % data[0])
+    if checksum(data, FRAME_SIZE):
+        raise ValueError("Joystick frame checksum mismatch")
+    return JoystickFrame(*_BODY.unpack_from(data))
+
+
+def decode_batch(payloads):
+    """Decode many frames at once on the host, dropping any that fail the length, version or
+    checksum check. Uses NumPy when it is installed.
+
+    Args:
+        payloads (Iterable[bytes]): Frame payloads, oldest first
+
+    Returns:
+        list: The `JoystickFrame` of every valid payload, in order
+    """
+    payloads = [bytes(payload) for payload in payloads if len(payload) == FRAME_SIZE]
+    if not payloads:
+        return []
+    try:
+        import numpy as np  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return [
+            JoystickFrame(*_BODY.unpack_from(payload))
+            for payload in payloads
+            if payload[0] == VERSION and not checksum(payload, FRAME_SIZE)
+        ]
+
+    raw = np.frombuffer(b"".join(payloads), dtype=np.uint8).reshape(-1, FRAME_SIZE)
+    valid = (raw[:, 0] == VERSION) & (raw.sum(axis=1, dtype=np.uint32) % 256 == 0)
+    rows = raw[valid]
+    axes = rows[:, 2:6].copy().view("<i2")
+    return [
+        JoystickFrame(VERSION, sequence, x, y, buttons)
+        for sequence, x, y, buttons in zip(
+            rows[:, 1].tolist(), axes[:, 0].tolist(), axes[:, 1].tolist(), rows[:, 6].tolist()
+        )
+    ]
@@ -0,0 +1,131 @@
+"""Smoothing for the joystick's ADC readings; see `JoystickSampler`.
+
+Replaces sorting 200 fresh samples per axis with filters that keep their state between reads:
+a running median over the last few samples throws away spikes, an exponential moving average
+takes out the remaining noise, and both work on preallocated integer lists, so filtering a
+sample allocates nothing.
+"""
+
+
+class MedianFilter:
+    """The median of the last `size` values, updated one value at a time.
+
+    The window is kept twice: in arrival order, to know which value leaves, and sorted, so the
+    median is the middle element. Each update moves at most `size` entries.
+
+    Args:
+        size (int): The window length, best odd. Defaults to 5
+        initial (int): The value the window starts filled with. Defaults to 32768
+    """
+
+    def __init__(self, size=5, initial=32768):
+        self._window = [initial] * size
+        self._sorted = [initial] * size
+        self._oldest = 0
+        self._middle = size // 2
+
+    def update(self, value):
+        """Add a value and return the new median"""
+        window = self._window
+        ordered = self._sorted
+        leaving = window[self._oldest]
+        window[self._oldest] = value
+        self._oldest += 1
+        if self._oldest == len(window):
+            self._oldest = 0
+
+        # drop the leaving value from the sorted copy and slide the new one into place
+        idx = 0
+        while ordered[idx] != leaving:
+            idx += 1
+        last = len(ordered) - 1
+        while idx < last and ordered[idx + 1] < value:
+            ordered[idx] = ordered[idx + 1]
+            idx += 1
+        while idx > 0 and ordered[idx - 1] > value:
+            ordered[idx] = ordered[idx - 1]
+            idx -= 1
+        ordered[idx] = value
+        return ordered[self._middle]
+
+    def reset(self, value):
+        """Fill the window with `value`"""
+        for idx in range(len(self._window)):
+            self._window[idx] = value
+            self._sorted[idx] = value
+        self._oldest = 0
+
+
+class AxisFilter:
+    """Running median, then an exponential moving average, then the dead zone, for one axis.
+
+    The average is kept in fixed point: with ``ema_shift`` n, each value moves the output 1/2**n
+    of the way towards it, using only integer shifts.
+
+    Args:
+        median_size (int): The running median window. Defaults to 5
+        ema_shift (int): Smoothing strength, 0 for none. Defaults to 3 (an eighth per sample)
+        centre (int): The raw reading of the stick at rest. Defaults to 32768
+        dead_zone (int): Readings closer than this to `centre` read as `centre`. Defaults to 650
+    """
+
+    def __init__(self, median_size=5, ema_shift=3, centre=32768, dead_zone=650):
+        self.centre = centre
+        self.dead_zone = dead_zone
+        self._median = MedianFilter(median_size, centre)
+        self._shift = ema_shift
+        self._average = centre << ema_shift
+        self.value = centre
+        """The latest output, in raw ADC counts"""
+
+    def update(self, raw):
+        """Filter one reading and return the new `value`"""
+        median = self._median.update(raw)
+        self._average += median - (self._average >> self._shift)
+        value = self._average >> self._shift
+        if -self.dead_zone < value - self.centre < self.dead_zone:
+            value = self.centre
+        self.value = value
+        return value
+
+    def reset(self, raw=None):
+        """Forget the history, starting again from `raw` (or the centre)"""
+        if raw is None:
+            raw = self.centre
+        self._median.reset(raw)
+        self._average = raw << self._shift
+        self.value = raw
+
+
+class JoystickSampler:
+    """Reads both axes of an analog joystick, alternating X and Y so both see the same moment,
+    and filters them with an `AxisFilter` each.
+
+    Args:
+        x_input (analogio.AnalogIn): The X axis
+        y_input (analogio.AnalogIn): The Y axis
+        samples (int): Readings per axis for every `read`. Defaults to 8
+        kwargs: `AxisFilter` settings, applied to both axes
+    """
+
+    def __init__(self, x_input, y_input, samples=8, **kwargs):
+        self._x_input = x_input
+        self._y_input = y_input
+        self.samples = samples
+        self.x = AxisFilter(**kwargs)
+        self.y = AxisFilter(**kwargs)
+
+    def read(self):
+        """Take `samples` interleaved readings per axis
+
+        Returns:
+            tuple: The filtered (x, y), in raw ADC counts
+        """
+        x_input = self._x_input
+        y_input = self._y_input
+        x_filter = self.x
+        y_filter = self.y
+        for _ in range(self.samples):
+            x_filter.update(x_input.value)
+            y_filter.update(y_input.value)
+        return x_filter.value, y_filter.value
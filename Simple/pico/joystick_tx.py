@@ -0,0 +1,114 @@
+"""Decides when a joystick position is worth a CAN frame; see `JoystickTransmitter`"""
+from adafruit_ticks import ticks_ms, ticks_diff
+
+# Extended frame with 8 data bytes: 67 bits of header/CRC/ACK/EOF + 64 data bits + 3 bits
+# interframe space, plus roughly 10% stuff bits
+FRAME_BITS = 148
+
+FIXED_RATE = 0
+"""Send on every poll, as the original loop did"""
+ON_CHANGE = 1
+"""Send when the position moved beyond the deadband, or as a heartbeat"""
+
+
+class JoystickTransmitter:  # pylint: disable=too-many-instance-attributes
+    """Filters a stream of quantized (x, y) positions down to the ones that need sending.
+
+    In `ON_CHANGE` mode a position is sent when either axis differs from the last one sent by
+    more than `deadband`, or comes back to 0 (so letting go of the stick is never swallowed by
+    the deadband). Frames are kept at least `min_spacing_ms` apart; a change inside that window
+    goes out on the first poll after it. When nothing has been sent for `heartbeat_ms` the last
+    position is repeated so receivers can tell the sender is alive.
+
+    The counters compare against `FIXED_RATE`, which would have sent a frame on every poll.
+
+    Args:
+        mode (int): `ON_CHANGE` or `FIXED_RATE`. Defaults to `ON_CHANGE`
+        deadband (int): Largest change per axis, in output units, that is not sent. Defaults to 0
+        heartbeat_ms (int): Longest silence before the position is repeated. Defaults to 500
+        min_spacing_ms (int): Shortest time between two frames. Defaults to 20
+    """
+
+    def __init__(self, mode=ON_CHANGE, *, deadband=0, heartbeat_ms=500, min_spacing_ms=20):
+        self.mode = mode
+        self.deadband = deadband
+        self.heartbeat_ms = heartbeat_ms
+        self.min_spacing_ms = min_spacing_ms
+        self._last_x = None
+        self._last_y = None
+        self._last_sent = ticks_ms()
+        self._started = self._last_sent
+        self.polls = 0
+        """Positions offered, which is what `FIXED_RATE` would have sent"""
+        self.changes = 0
+        """Frames sent because the position changed (every frame, in `FIXED_RATE` mode)"""
+        self.heartbeats = 0
+        """Frames sent because nothing had been sent for `heartbeat_ms`"""
+
+    @property
+    def frames_sent(self):
+        """Frames sent in total (read-only)"""
+        return self.changes + self.heartbeats
+
+    def update(self, x, y):
+        """Offer the latest position
+
+        Returns:
+            bool: True if it should be sent now
+        """
+        self.polls += 1
+        now = ticks_ms()
+        since_last = ticks_diff(now, self._last_sent)
+        if self.mode == FIXED_RATE or self._last_x is None:
+            changed = True
+        else:
+            if since_last < self.min_spacing_ms:
+                return False
+            changed = self._moved(x, self._last_x) or self._moved(y, self._last_y)
+            if not changed and since_last < self.heartbeat_ms:
+                return False
+        if changed:
+            self.changes += 1
+        else:
+            self.heartbeats += 1
+        self._last_x = x
+        self._last_y = y
+        self._last_sent = now
+        return True
+
+    def _moved(self, value, last):
+        if value == last:
+            return False
+        return value == 0 or abs(value - last) > self.deadband
+
+    def bus_load(self, bitrate):
+        """The share of `bitrate` taken by the frames sent since the counters were reset, and the
+        share `FIXED_RATE` would have taken, as fractions"""
+        elapsed_ms = ticks_diff(ticks_ms(), self._started) or 1
+        capacity = bitrate * elapsed_ms / 1000
+        return (
+            self.frames_sent * FRAME_BITS / capacity,
+            self.polls * FRAME_BITS / capacity,
+        )
+
+    def reset_counters(self):
+        """Zero the counters and restart the `bus_load` clock"""
+        self.polls = 0
+        self.changes = 0
+        self.heartbeats = 0
+        self._started = ticks_ms()
+
+    def report(self, bitrate):
+        """A one-line summary of the counters, for the serial console"""
+        load, fixed_load = self.bus_load(bitrate)
+        saved = 100 - 100 * self.frames_sent / self.polls if self.polls else 0
+        return "tx: %d frames (%d changes, %d heartbeats) for %d polls, %d%% fewer; " \
+            "bus load %.2f%% vs %.2f%% fixed-rate" % (
+                self.frames_sent,
+                self.changes,
+                self.heartbeats,
+                self.polls,
+                saved,
+                100 * load,
+                100 * fixed_load,
+            )
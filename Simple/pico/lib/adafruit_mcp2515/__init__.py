@@ -30,17 +30,21 @@ Implementation Notes
 """
 
 from collections import namedtuple
-from struct import unpack_from, pack_into
+from struct import pack_into
 from time import sleep
 from micropython import const
 from adafruit_bus_device import spi_device
+from adafruit_ticks import ticks_ms, ticks_diff
 from .canio import *
+from .filters import plan_filters, FilterPlan, SoftwareFilter
+from .health import BusHealth, HealthMonitor, bus_state
+from .interrupt import InterruptLine, SimulatedInterruptPin
+from .ring_buffer import RingBuffer, OverflowPolicy
+from .scheduler import SPIScheduler
+from .shadow import ShadowRegisters, READ_BLOCKS, RUNNING_READ_BLOCKS
+from .stats import DriverStats, CountingSPIDevice, _now_us
 from .timer import Timer
-
-try:
-    from typing_extensions import Literal
-except ImportError:
-    pass
+from . import timing
 
 __version__ = "1.0.19"
 __repo__ = "https://github.com/adafruit/Adafruit_CircuitPython_MCP2515.git"
@@ -122,6 +126,12 @@ _WAKIF = const(0x40)
 # Standard/Extended ID Buffers, Masks, Flags
 _TXB_EXIDE_M_16 = const(0x08)
 _TXB_TXREQ_M = const(0x08)  # TX request/completion bit
+_TXB_ABTF_M = const(0x40)  # set when a pending message was aborted
+_TXB_TXP_M = const(0x03)  # transmit priority
+
+# TXP values handed out when the pending transmit buffers have to be re-ranked, by how many
+# messages there are to rank; spread out so the next message usually fits in between
+_TXP_SPREAD = ((2,), (3, 1), (3, 2, 1))
 
 EXTID_TOP_11_WRITE_MASK = 0x1FFC0000
 EXTID_TOP_11_READ_MASK = 0xFFE00000
@@ -150,6 +160,7 @@ _STAT_TX1_PENDING = const(0x10)
 _STAT_TX2_PENDING = const(0x40)
 
 _STAT_TX_PENDING_MASK = const(_STAT_TX0_PENDING | _STAT_TX1_PENDING | _STAT_TX2_PENDING)
+_STAT_TX_PENDING = (_STAT_TX0_PENDING, _STAT_TX1_PENDING, _STAT_TX2_PENDING)
 
 ###### Bus State and Error Counts ##########
 
@@ -158,10 +169,22 @@ _TEC = const(0x1C)
 _REC = const(0x1D)
 # REC: RECEIVE ERROR COUNTER REGISTER (ADDRESS: 1Dh)
 _EFLG = const(0x2D)
+_EFLG_RX0OVR = const(0x40)
+_EFLG_RX1OVR = const(0x80)
 
 ############ Misc Consts #########
 _SEND_TIMEOUT_MS = const(5)  # 500ms
 _MAX_CAN_MSG_LEN = 8  # ?!
+_TX_FRAME_HEADER_LEN = const(8)  # WRITE command, TXBnCTRL address, TXBnCTRL, 4 ID bytes, DLC
+_ID_HEADER_CACHE_SIZE = const(32)
+# receive sequence numbers wrap here so they stay small ints on MicroPython
+_RX_SEQUENCE_MASK = const(0x3FFFFFFF)
+# how long the oscillator may take to start after a RESET before CANSTAT reports config mode
+_RESET_TIMEOUT_MS = const(20)
+# CNF3, CNF2, CNF1, CANINTE and CANINTF sit at consecutive addresses and all read 0 after a RESET,
+# as do TXBnCTRL and RXBnCTRL
+_CONFIG_BLOCK_RESET = b"\x00\x00\x00\x00\x00"
+_CTRL_RESET = b"\x00"
 # perhaps this will be stateful later?
 TransmitBuffer = namedtuple(
     "TransmitBuffer",
@@ -176,7 +199,8 @@ ReceiveBuffer = namedtuple(
 
 _BAUD_RATES = {
     # This is magic, don't disturb the dragon
-    # expects a 16Mhz crystal
+    # Fast path for the common bitrates; anything else is worked out by timing.solve, and
+    # timing.check_table(_BAUD_RATES) lists entries that are off
     16000000: {
         # CNF1, CNF2, CNF3
         1000000: (0x00, 0xD0, 0x82),
@@ -190,7 +214,7 @@ _BAUD_RATES = {
         80000: (0x03, 0xFF, 0x87),
         50000: (0x07, 0xFA, 0x87),
         40000: (0x07, 0xFF, 0x87),
-        33000: (0x09, 0xBE, 0x07),
+        33000: (0x0A, 0xBF, 0x04),
         31250: (0x0F, 0xF1, 0x85),
         25000: (0x0F, 0xBA, 0x07),
         20000: (0x0F, 0xFF, 0x87),
@@ -200,26 +224,27 @@ _BAUD_RATES = {
     },
     
     
+    # Generated with timing.solve at a 75% sample point, apart from 500000 and 250000
     12000000: {
         # CNF1, CNF2, CNF3
-        1000000: (0x00, 0xD0, 0x82),  ##Not correct
+        1000000: (0x00, 0x88, 0x01),
         500000: (0x00, 0x9B, 0x02),
         250000: (0x02, 0x91, 0x01),
-        200000: (0x01, 0xFA, 0x87),  ##Not correct
-        125000: (0x03, 0xF0, 0x86),  ##Not correct
-        100000: (0x03, 0xFA, 0x87),  ##Not correct
-        95000: (0x03, 0xAD, 0x07),  ##Not correct
-        83300: (0x03, 0xBE, 0x07),  ##Not correct
-        80000: (0x03, 0xFF, 0x87),  ##Not correct
-        50000: (0x07, 0xFA, 0x87),  ##Not correct
-        40000: (0x07, 0xFF, 0x87),  ##Not correct
-        33000: (0x09, 0xBE, 0x07),  ##Not correct
-        31250: (0x0F, 0xF1, 0x85),  ##Not correct
-        25000: (0x0F, 0xBA, 0x07),  ##Not correct
-        20000: (0x0F, 0xFF, 0x87),  ##Not correct
-        10000: (0x1F, 0xFF, 0x87),  ##Not correct
-        5000: (0x3F, 0xFF, 0x87),  ##Not correct
-        666000: (0x00, 0xA0, 0x04),  ##Not correct
+        200000: (0x01, 0x9D, 0x03),
+        125000: (0x02, 0x9E, 0x03),
+        100000: (0x02, 0xAF, 0x04),
+        95000: (0x02, 0xB7, 0x04),
+        83300: (0x05, 0x94, 0x02),
+        80000: (0x04, 0x9D, 0x03),
+        50000: (0x05, 0xAF, 0x04),
+        40000: (0x09, 0x9D, 0x03),
+        33000: (0x0D, 0x95, 0x02),
+        31250: (0x0B, 0x9E, 0x03),
+        25000: (0x0B, 0xAF, 0x04),
+        20000: (0x0E, 0xAF, 0x04),
+        10000: (0x1D, 0xAF, 0x04),
+        5000: (0x3B, 0xAF, 0x04),
+        666000: (0x00, 0x8B, 0x01),
     },
     
     
@@ -280,23 +305,36 @@ class MCP2515:  # pylint:disable=too-many-instance-attributes
         cs_pin,
         *,
         baudrate: int = 500000,
-        crystal_freq: Literal[8000000, 12000000, 16000000] = 12000000,
+        crystal_freq: int = 12000000,
+        sample_point: float = None,
         loopback: bool = False,
         silent: bool = False,
         auto_restart: bool = False,
         debug: bool = False,
+        rx_queue_size: int = 32,
+        rx_overflow_policy: int = OverflowPolicy.DROP_OLDEST,
+        tx_queue_size: int = 8,
+        send_timeout: float = 0.5,
+        int_pin=None,
+        collect_stats: bool = False,
+        fast_init: bool = False,
+        shadow_registers: bool = False,
     ):
     
 
         
         """A common shared-bus protocol.
 
-        :param ~busio.SPI spi: The SPI bus used to communicate with the MCP2515
+        :param ~busio.SPI spi: The SPI bus used to communicate with the MCP2515, or an\
+        `SPIScheduler` shared with other controllers on the same bus
         :param ~digitalio.DigitalInOut cs_pin:  SPI bus enable pin
-        :param int baudrate: The bit rate of the bus in Hz, using a 16Mhz crystal. All devices on\
-            the bus must agree on this value. Defaults to 250000.
-        :param Literal crystal_freq: MCP2515 crystal frequency. Valid values are:\
-            16000000 and 8000000. Defaults to 16000000 (16MHz).\
+        :param int baudrate: The bit rate of the bus in Hz. All devices on the bus must agree on\
+            this value. Any rate within 1% of one that the crystal can produce is accepted.\
+            Defaults to 500000.
+        :param int crystal_freq: MCP2515 crystal frequency in Hz. Defaults to 12000000 (12MHz).
+        :param float sample_point: Where in each bit to sample the bus, in percent. When `None`,\
+            the built-in register values are used for common bitrates and a 75% sample point\
+            otherwise. Defaults to `None`.
         :param bool loopback: Receive only packets sent from this device, and send only to this\
         device. Requires that `silent` is also set to `True`, but only prevents transmission to\
         other devices. Otherwise the send/receive behavior is normal.
@@ -308,6 +346,27 @@ class MCP2515:  # pylint:disable=too-many-instance-attributes
         bus-off state. Defaults to `False`.
 
         :param bool debug: If `True`, will enable printing debug information. Defaults to `False`.
+        :param int rx_queue_size: The number of received messages held in software before the\
+        overflow policy kicks in. The queue is allocated up front. Defaults to 32.
+        :param int rx_overflow_policy: What to do when the receive queue is full, one of the\
+        `OverflowPolicy` values. Defaults to `OverflowPolicy.DROP_OLDEST`.
+        :param int tx_queue_size: The number of messages `send` can hold in software, ordered by\
+        priority, while all three transmit buffers are busy. Defaults to 8.
+        :param float send_timeout: How long `send` waits for room in a full transmit queue before\
+        raising `RuntimeError`. Defaults to 0.5 seconds.
+        :param ~microcontroller.Pin int_pin: The pin wired to the MCP2515 INT output. When given,\
+        receive polls only touch the SPI bus while INT is asserted, and transmit-complete\
+        interrupts drain the software transmit queue. Anything with a boolean ``value`` can be\
+        passed instead of a pin, such as a `SimulatedInterruptPin`. Defaults to `None` (polling).
+        :param bool collect_stats: Count SPI traffic, messages, retries, overflows and latencies\
+        in `stats` from the start. See `enable_stats`. Defaults to `False`.
+        :param bool fast_init: Make `initialize` and `restart` poll CANSTAT instead of sleeping,\
+        write register blocks in sequential bursts and skip registers the reset already left as\
+        wanted, bringing the controller up in a handful of SPI transactions. With stats on,\
+        `startup_time_us` reports how long it took. Defaults to `False`.
+        :param bool shadow_registers: Keep a write-through cache of the configuration registers\
+        and the operating mode, so reconfiguring skips writes, CANSTAT reads and mode changes that\
+        would not change anything. See `enable_shadow_registers`. Defaults to `False`.
         """
 
         if loopback and not silent:
@@ -317,26 +376,64 @@ class MCP2515:  # pylint:disable=too-many-instance-attributes
 
         self._auto_restart = auto_restart
         self._debug = debug
-        self._bus_device_obj = spi_device.SPIDevice(spi_bus, cs_pin)
+        if isinstance(spi_bus, SPIScheduler):
+            self._scheduler = spi_bus
+            self._bus_device_obj = spi_bus.device(cs_pin)
+        else:
+            self._scheduler = None
+            self._bus_device_obj = spi_device.SPIDevice(spi_bus, cs_pin)
+        self._stats = None
+        if collect_stats:
+            self.enable_stats()
+        self._health_monitor = None
+        self._shadow = None
+        self._verify_shadow = False
+        if shadow_registers:
+            self.enable_shadow_registers()
         self._cs_pin = cs_pin
+        self._int_line = InterruptLine(int_pin) if int_pin is not None else None
         self._buffer = bytearray(20)
         self._id_buffer = bytearray(4)
-        self._unread_message_queue = []
+        self._tx_frame = bytearray(_TX_FRAME_HEADER_LEN + _MAX_CAN_MSG_LEN)
+        self._id_header_cache = {}
+        # pending messages sorted from least to most urgent, so the next one to send is at the end
+        self._tx_queue = []
+        self._tx_queue_priorities = []
+        self._tx_queue_size = tx_queue_size
+        self._tx_dropped_count = 0
+        self._tx_buffer_priorities = [0, 0, 0]
+        # the TXP bits last written to each transmit buffer
+        self._tx_buffer_txp = [0, 0, 0]
+        # (id << 1) | extended of the message last loaded into each transmit buffer
+        self._tx_buffer_keys = [None, None, None]
+        self._tx_superseded_count = 0
+        self._send_timeout_ms = int(send_timeout * 1000)
+        self._send_timer = Timer()
+        self._unread_message_queue = RingBuffer(rx_queue_size, rx_overflow_policy)
         self._timer = Timer()
         self._tx_buffers = []
         self._rx0_overflow = False
         self._rx1_overflow = False
-        self._masks_in_use = []
-        self._filters_in_use = [[], []]
+        self._rx_overflow_count = 0
+        self._last_drain_count = 0
+        self._rx_sequence = 0
+        self._filter_plan = None
+        self._software_filter = None
+        self._software_rejected_count = 0
         self._mode = None
+        self._fast_init = fast_init
+        self._startup_time_us = None
         self._bus_state = BusState.ERROR_ACTIVE
         self._baudrate = baudrate
         self._crystal_freq = crystal_freq
+        self._bit_timing = self._find_bit_timing(crystal_freq, baudrate, sample_point)
         self._loopback = loopback
         self._silent = silent
 
         self._init_buffers()
         self.initialize()
+        if self._scheduler is not None:
+            self._scheduler.attach(self)
 
     def _init_buffers(self):
 
@@ -366,6 +463,18 @@ class MCP2515:  # pylint:disable=too-many-instance-attributes
 
     def initialize(self):
         """Return the sensor to the default configuration"""
+        timed = self._stats is not None
+        start = _now_us() if timed else 0
+        if self._fast_init:
+            self._fast_initialize()
+        else:
+            self._full_initialize()
+        if timed:
+            self._startup_time_us = _now_us() - start
+            self._dbg("initialized in %d us" % self._startup_time_us)
+        self._check_shadow()
+
+    def _full_initialize(self):
         self._reset()
         # our mode set skips checking for sleep
         self._set_mode(_MODE_CONFIG)
@@ -383,8 +492,13 @@ class MCP2515:  # pylint:disable=too-many-instance-attributes
 
         # # # interrupt mode
         # TODO: WHAT IS THIS
-        self._set_register(_CANINTE, _RX0IF | _RX1IF)
+        interrupts = _RX0IF | _RX1IF
+        if self._int_line is not None:
+            # TX-complete interrupts let the software transmit queue drain without polling
+            interrupts |= _TX0IF | _TX1IF | _TX2IF
+        self._set_register(_CANINTE, interrupts)
         sleep(0.010)
+        # roll RXB0 over into RXB1 so a burst fills both buffers before anything is lost
         self._mod_register(
             _RXB0CTRL,
             _RXB_RX_MASK | _RXB_BUKT_MASK,
@@ -392,29 +506,281 @@ class MCP2515:  # pylint:disable=too-many-instance-attributes
         )
 
         self._mod_register(_RXB1CTRL, _RXB_RX_MASK, _RXB_RX_STDEXT)
+        self._set_mode(self._operating_mode)
+
+    def _fast_initialize(self, filter_plan=None):
+        """`initialize` in as few SPI transactions as possible: RESET, wait for CANSTAT to report
+        config mode, write only the registers that differ from their reset values (in one burst
+        per block), program `filter_plan` if given and switch to the operating mode"""
+        self._buffer[0] = _RESET
+        with self._bus_device_obj as spi:
+            spi.write(self._buffer, end=1)
+        if self._shadow is not None:
+            self._shadow.reset()
+        if not self._wait_for_mode(_MODE_CONFIG, _RESET_TIMEOUT_MS):
+            raise RuntimeError("MCP2515 did not come out of reset")
+        self._confirm_mode(_MODE_CONFIG)
+
+        cnf1, cnf2, cnf3 = self._bit_timing
+        interrupts = _RX0IF | _RX1IF
+        if self._int_line is not None:
+            interrupts |= _TX0IF | _TX1IF | _TX2IF
+        self._write_changed_registers(
+            _CNF3, (cnf3, cnf2, cnf1, interrupts, 0), _CONFIG_BLOCK_RESET
+        )
+        # the TXBnCTRL registers already read 0; the ID, DLC and data registers are written in
+        # full before every transmission, so there is nothing to clear there
+        self._write_changed_registers(
+            _RXB0CTRL, (_RXB_RX_STDEXT | _RXB_BUKT_MASK,), _CTRL_RESET
+        )
+        self._write_changed_registers(_RXB1CTRL, (_RXB_RX_STDEXT,), _CTRL_RESET)
+        if filter_plan is not None:
+            self._write_filter_plan(filter_plan)
+
+        mode = self._operating_mode
+        if mode != _MODE_CONFIG and self._request_new_mode(mode):
+            self._confirm_mode(mode)
+
+    @property
+    def _operating_mode(self):
         if self.loopback:
-            new_mode = _MODE_LOOPBACK
-        elif self.silent:
-            new_mode = _MODE_LISTENONLY
-        else:
-            new_mode = _MODE_NORMAL
+            return _MODE_LOOPBACK
+        if self.silent:
+            return _MODE_LISTENONLY
+        return _MODE_NORMAL
+
+    def _wait_for_mode(self, mode, timeout_ms):
+        """Poll CANSTAT until it reports `mode`
+
+        Returns:
+            bool: False if `timeout_ms` passed first
+        """
+        self._timer.rewind_to_ms(timeout_ms)
+        while True:
+            if (self._read_register(_CANSTAT) & _MODE_MASK) == mode:
+                return True
+            if self._timer.expired:
+                return False
+
+    def send(self, message_obj, *, priority=None):
+        """Send a message on the bus with the given data and id.
+
+        If all three transmit buffers are busy the message waits in a software queue, ordered by
+        priority, and is loaded as soon as a buffer frees up. The queue is serviced by every
+        `send` and every receive poll. If the queue is full, a message that outranks the least
+        urgent queued message replaces it; otherwise `send` waits up to ``send_timeout`` for room
+        and raises `RuntimeError` if none appears.
+
+        On a controller attached to an `SPIScheduler` the message is always queued, and loaded by
+        the scheduler's next `SPIScheduler.poll` once receive buffers have been drained.
+
+        Queued messages are held by reference, so do not modify a message until it has been sent.
 
-        self._set_mode(new_mode)
+        Args:
+            message (canio.Message): The message to send. Must be a valid `canio.Message`
+            priority (int, optional): Lower values are sent first. Defaults to the message ID,\
+                matching CAN arbitration.
+        """
+        stats = self._stats
+        if stats is None:
+            return self._send(message_obj, priority)
+        start = _now_us()
+        result = self._send(message_obj, priority)
+        stats.send_latency.record(_now_us() - start)
+        return result
+
+    def _send(self, message_obj, priority):
+        if priority is None:
+            priority = message_obj.id
+
+        scheduler = self._scheduler
+        if scheduler is not None:
+            status = 0
+        else:
+            status = self._service_tx_queue(self._read_status())
+        if not self._tx_queue and scheduler is None:
+            for buffer_index in range(3):
+                if not status & _STAT_TX_PENDING[buffer_index]:
+                    return self._write_message(
+                        self._tx_buffers[buffer_index], message_obj, priority, status
+                    )
+
+        queue_priorities = self._tx_queue_priorities
+        if len(queue_priorities) == self._tx_queue_size:
+            if priority < queue_priorities[0]:
+                self._tx_queue.pop(0)
+                queue_priorities.pop(0)
+                self._tx_dropped_count += 1
+            else:
+                self._send_timer.rewind_to_ms(self._send_timeout_ms)
+                while len(queue_priorities) == self._tx_queue_size:
+                    if self._send_timer.expired:
+                        raise RuntimeError("No transmit buffer available to send")
+                    if self._stats is not None:
+                        self._stats.tx_busy_retries += 1
+                    if scheduler is not None:
+                        # keeps every controller's receive buffers drained while waiting
+                        scheduler.poll()
+                    else:
+                        self._service_tx_queue(self._read_status())
+
+        self._queue_message(message_obj, priority)
+        return True
 
-    def send(self, message_obj):
-        """Send a message on the bus with the given data and id. If the message could not be sent
-         due to a full fifo or a bus error condition, RuntimeError is raised.
+    def _queue_message(self, message_obj, priority):
+        """Insert into the software transmit queue, behind any queued messages of the same
+        priority"""
+        queue_priorities = self._tx_queue_priorities
+        index = 0
+        while index < len(queue_priorities) and queue_priorities[index] > priority:
+            index += 1
+        self._tx_queue.insert(index, message_obj)
+        queue_priorities.insert(index, priority)
+
+    def send_latest(self, message_obj, *, priority=None):
+        """Send a message, replacing any unsent message with the same ID.
+
+        Meant for periodic state such as a joystick position, where only the newest value
+        matters. A message with the same ID still waiting in the software queue is swapped for
+        `message_obj`, in place if the priority is unchanged and otherwise moved to where
+        `priority` puts it. One still pending in a transmit buffer is aborted and the buffer
+        is reloaded with `message_obj`, unless it is already on the wire. Otherwise this behaves
+        like `send`. On a controller attached to an `SPIScheduler` only the software queue is
+        checked, and the message is queued like any other.
 
         Args:
             message (canio.Message): The message to send. Must be a valid `canio.Message`
+            priority (int, optional): Lower values are sent first. Defaults to the message ID.
         """
+        stats = self._stats
+        if stats is None:
+            return self._send_latest(message_obj, priority)
+        start = _now_us()
+        result = self._send_latest(message_obj, priority)
+        stats.send_latency.record(_now_us() - start)
+        return result
+
+    def _send_latest(self, message_obj, priority):
+        if priority is None:
+            priority = message_obj.id
+        key = (message_obj.id << 1) | message_obj.extended
+
+        queue = self._tx_queue
+        for index in range(len(queue)):
+            queued = queue[index]
+            if queued.id == message_obj.id and queued.extended == message_obj.extended:
+                if self._tx_queue_priorities[index] == priority:
+                    queue[index] = message_obj
+                else:
+                    queue.pop(index)
+                    self._tx_queue_priorities.pop(index)
+                    self._queue_message(message_obj, priority)
+                self._tx_superseded_count += 1
+                return True
 
-        # TODO: Timeout
-        tx_buff = self._get_tx_buffer()  # info = addr.
-        if tx_buff is None:
-            raise RuntimeError("No transmit buffer available to send")
+        if self._scheduler is not None:
+            return self._send(message_obj, priority)
+        status = self._read_status()
+        for buffer_index in range(3):
+            if (
+                status & _STAT_TX_PENDING[buffer_index]
+                and self._tx_buffer_keys[buffer_index] == key
+            ):
+                tx_buffer = self._tx_buffers[buffer_index]
+                self._mod_register(tx_buffer.CTRL_REG, _TXB_TXREQ_M, 0)
+                if self._read_register(tx_buffer.CTRL_REG) & _TXB_ABTF_M:
+                    self._tx_superseded_count += 1
+                    status &= ~_STAT_TX_PENDING[buffer_index]
+                    return self._write_message(tx_buffer, message_obj, priority, status)
+                # already on the wire, or sent since the status read
+                break
+
+        return self._send(message_obj, priority)
+
+    @property
+    def tx_superseded_count(self):
+        """The number of messages `send_latest` replaced before they went out (read-only)"""
+        return self._tx_superseded_count
+
+    @property
+    def tx_queue_length(self):
+        """The number of messages waiting in software for a free transmit buffer (read-only)"""
+        return len(self._tx_queue)
+
+    @property
+    def tx_dropped_count(self):
+        """The number of queued messages discarded to make room for more urgent ones (read-only)"""
+        return self._tx_dropped_count
+
+    def _service_tx_queue(self, status):
+        """Load queued messages, most urgent first, into whichever transmit buffers `status` shows
+        as free
+
+        Returns:
+            int: `status` updated with the buffers that were just loaded
+        """
+        queue = self._tx_queue
+        while queue:
+            for buffer_index in range(3):
+                if not status & _STAT_TX_PENDING[buffer_index]:
+                    break
+            else:
+                break
+            priority = self._tx_queue_priorities.pop()
+            self._write_message(self._tx_buffers[buffer_index], queue.pop(), priority, status)
+            status |= _STAT_TX_PENDING[buffer_index]
+        return status
+
+    def send_many(self, messages):
+        """Load up to three messages into the free transmit buffers and start them all with a
+        single REQUEST TO SEND. Costs one status read, one write per message and one RTS.
+
+        Messages already waiting in the software queue of `send` are loaded first, and only the
+        buffers left free after that are used. The chip then sends everything pending in priority
+        (ID) order, and messages with equal IDs in the order they appear in `messages`.
+
+        On a controller attached to an `SPIScheduler` the messages are only added to the software
+        queue, as far as it has room, for the scheduler's next `SPIScheduler.poll` to load.
+
+        Args:
+            messages (Sequence[canio.Message]): The messages to send
 
-        return self._write_message(tx_buff, message_obj)
+        Returns:
+            int: The number of messages from the front of `messages` that were loaded (or\
+                queued). The rest were not sent because no transmit buffer was free.
+        """
+        stats = self._stats
+        start = _now_us() if stats is not None else 0
+        if self._scheduler is not None:
+            sent = 0
+            while sent < len(messages) and len(self._tx_queue) < self._tx_queue_size:
+                self._send(messages[sent], messages[sent].id)
+                sent += 1
+            if stats is not None:
+                stats.send_latency.record(_now_us() - start)
+            return sent
+        status = self._service_tx_queue(self._read_status())
+        send_command = 0
+        sent = 0
+        for buffer_index in range(3):
+            if sent == len(messages):
+                break
+            if status & _STAT_TX_PENDING[buffer_index]:
+                continue
+            tx_buffer = self._tx_buffers[buffer_index]
+            message_obj = messages[sent]
+            self._load_tx_buffer(tx_buffer, message_obj, message_obj.id, status)
+            status |= _STAT_TX_PENDING[buffer_index]
+            send_command |= tx_buffer.SEND_CMD
+            sent += 1
+
+        if send_command:
+            self._buffer[0] = send_command
+            with self._bus_device_obj as spi:
+                spi.write(self._buffer, end=1)
+        if stats is not None:
+            stats.send_latency.record(_now_us() - start)
+        return sent
 
     @property
     def unread_message_count(self):
@@ -433,154 +799,387 @@ class MCP2515:  # pylint:disable=too-many-instance-attributes
         Returns:
             `canio.Message`: The next available message or None if one is not available
         """
+        stats = self._stats
+        start = _now_us() if stats is not None else 0
         if self.unread_message_count == 0:
             return None
 
-        return self._unread_message_queue.pop(0)
+        message = self._unread_message_queue.pop()
+        if stats is not None:
+            stats.receive_latency.record(_now_us() - start)
+            stats.rx_residency.record(ticks_diff(ticks_ms(), message.timestamp))
+        return message
 
-    def _read_rx_buffer(self, read_command):
-        for i in range(len(self._buffer)):  # pylint: disable=consider-using-enumerate
-            self._buffer[i] = 0
+    def read_messages(self, max_n=None):
+        """Drain both receive buffers and return every available message in one call
 
-        # read from buffer
-        with self._bus_device_obj as spi:
-            self._buffer[0] = read_command
-            spi.write_readinto(
-                self._buffer,  # because the reference does similar
-                self._buffer,
-                out_start=0,
-                out_end=1,
-                in_start=0,
-                in_end=1,
-            )
+        Args:
+            max_n (int, optional): The most messages to return. Any extra stay queued for the next\
+                call. Defaults to no limit.
+
+        Returns:
+            list: The received `canio.Message` and `canio.RemoteTransmissionRequest` objects,\
+                oldest first. Empty if nothing was available.
+        """
+        stats = self._stats
+        start = _now_us() if stats is not None else 0
+        self._read_from_rx_buffers(max_n)
+        queue = self._unread_message_queue
+        count = len(queue)
+        if max_n is not None and max_n < count:
+            count = max_n
+        messages = [queue.pop() for _ in range(count)]
+        if stats is not None and messages:
+            stats.receive_latency.record(_now_us() - start)
+            now = ticks_ms()
+            for message in messages:
+                stats.rx_residency.record(ticks_diff(now, message.timestamp))
+        return messages
+
+    @property
+    def rx_queue(self):
+        """The software receive queue, a `RingBuffer`. Its `dropped_count`,\
+            `replaced_count` and `high_water_mark` show how well ``rx_queue_size`` fits the\
+            bus load (read-only)"""
+        return self._unread_message_queue
+
+    @property
+    def last_drain_count(self):
+        """The number of frames pulled off the chip by the most recent receive poll (read-only)"""
+        return self._last_drain_count
+
+    @property
+    def rx_overflow_count(self):
+        """The number of receive buffer overflows detected so far. Each one means at least one\
+            frame was lost (read-only)"""
+        return self._rx_overflow_count
+
+    def read_message_into(self, message):
+        """Read the next available message into an existing `canio.Message` instead of creating a
+        new one. When nothing is queued the frame is parsed straight from the receive buffer, so a
+        caller that reuses one `canio.Message` does not allocate once the payload length settles.
+
+        Args:
+            message (canio.Message): The message to overwrite
 
-            spi.readinto(self._buffer, end=15)
-        ######### Unpack IDs/ set Extended #######
+        Returns:
+            `message` if a data frame was read, a new `canio.RemoteTransmissionRequest` if a remote\
+                frame was read, or None if nothing was available. `message` is only changed when\
+                it is returned.
+        """
+        stats = self._stats
+        if stats is None:
+            return self._read_message_into(message)
+        start = _now_us()
+        result = self._read_message_into(message)
+        if result is not None:
+            stats.receive_latency.record(_now_us() - start)
+            stats.rx_residency.record(ticks_diff(ticks_ms(), result.timestamp))
+        return result
+
+    def _read_message_into(self, message):
+        queued = self._unread_message_queue.pop()
+        if queued is not None:
+            if isinstance(queued, RemoteTransmissionRequest):
+                return queued
+            message.id = queued.id
+            message.extended = queued.extended
+            message.data = queued.data
+            message.timestamp = queued.timestamp
+            message.sequence = queued.sequence
+            return message
+
+        while True:
+            status = self._poll_status()
+            if self._tx_queue:
+                self._service_tx_queue(status)
+            if status & _RX0IF:
+                frame = self._read_rx_buffer_into(_READ_RX0, message)
+            elif status & _RX1IF:
+                frame = self._read_rx_buffer_into(_READ_RX1, message)
+            else:
+                return None
+            # None here means the software filter dropped the frame; look for another
+            if frame is not None:
+                return frame
+
+    @staticmethod
+    def _rx_header_id(header):
+        """The CAN ID held in the SIDH, SIDL, EID8 and EID0 bytes at the start of `header`"""
+        std_id = (header[0] << 3) | (header[1] >> 5)
+        if not header[1] & _TXB_EXIDE_M_16:
+            return std_id
+        return (std_id << 18) | ((header[1] & 0x03) << 16) | (header[2] << 8) | header[3]
+
+    def _read_rx_header(self, spi, read_command):
+        """Start a READ RX BUFFER and clock in only the four ID bytes and the DLC, leaving the
+        payload to be read into wherever it is going"""
+        self._buffer[0] = read_command
+        spi.write(self._buffer, end=1)
+        spi.readinto(self._buffer, end=5)
+        return self._buffer[4]
+
+    def _software_filter_rejects(self):
+        """True if the header in `_buffer` passed the hardware filters but matches no `Match`"""
+        software_filter = self._software_filter
+        if software_filter is None:
+            return False
+        if software_filter.accepts(
+            self._rx_header_id(self._buffer), bool(self._buffer[1] & _TXB_EXIDE_M_16)
+        ):
+            return False
+        self._software_rejected_count += 1
+        return True
 
-        raw_ids = unpack_from(">I", self._buffer)[0]
-        extended, sender_id = self._unload_ids(raw_ids)
-        ############# Length/RTR Size #########
-        dlc = self._buffer[4]
-        # length is max 8
-        message_length = min(8, dlc & 0xF)
+    def _stamp(self, frame):
+        """Mark a frame that just left the chip with the time and the next sequence number"""
+        frame.timestamp = ticks_ms()
+        frame.sequence = self._rx_sequence
+        self._rx_sequence = (self._rx_sequence + 1) & _RX_SEQUENCE_MASK
+        return frame
 
-        if (dlc & _RTR_MASK) > 0:
+    def _read_rx_buffer(self, read_command):
+        with self._bus_device_obj as spi:
+            dlc = self._read_rx_header(spi, read_command)
+            if self._software_filter_rejects():
+                # ending the read here still frees the receive buffer
+                return
+            # length is max 8
+            message_length = min(8, dlc & 0xF)
+            if not dlc & _RTR_MASK:
+                spi.readinto(self._buffer, start=5, end=5 + message_length)
+
+        sender_id = self._rx_header_id(self._buffer)
+        extended = bool(self._buffer[1] & _TXB_EXIDE_M_16)
+        if dlc & _RTR_MASK:
             frame_obj = RemoteTransmissionRequest(
                 sender_id, message_length, extended=extended
             )
         else:
             frame_obj = Message(
                 sender_id,
-                data=bytes(self._buffer[5 : 5 + message_length]),
+                data=self._buffer[5 : 5 + message_length],
                 extended=extended,
             )
-        self._unread_message_queue.append(frame_obj)
+        self._unread_message_queue.push(self._stamp(frame_obj))
+        if self._stats is not None:
+            self._stats.messages_received += 1
+
+    def _read_rx_buffer_into(self, read_command, message):
+        with self._bus_device_obj as spi:
+            dlc = self._read_rx_header(spi, read_command)
+            if self._software_filter_rejects():
+                return None
+            message_length = min(8, dlc & 0xF)
+            if not dlc & _RTR_MASK:
+                data = message.data
+                if len(data) != message_length:
+                    # only reallocates when the payload length changes
+                    message.data = bytes(message_length)
+                    data = message.data
+                if message_length:
+                    spi.readinto(data)
+
+        sender_id = self._rx_header_id(self._buffer)
+        extended = bool(self._buffer[1] & _TXB_EXIDE_M_16)
+        if self._stats is not None:
+            self._stats.messages_received += 1
+        if dlc & _RTR_MASK:
+            return self._stamp(
+                RemoteTransmissionRequest(sender_id, message_length, extended=extended)
+            )
+        message.id = sender_id
+        message.extended = extended
+        return self._stamp(message)
 
-    def _read_from_rx_buffers(self):
-        """Read the next available message into the given `bytearray`
+    def _read_from_rx_buffers(self, max_n=None, service_tx=True):
+        """Move every frame waiting in RXB0/RXB1 into the unread message queue, re-checking the
+        status until both buffers are empty so that frames arriving mid-poll are not left behind
 
         Args:
-            msg_buffer (bytearray): The buffer to load the message into
+            max_n (int, optional): Stop once this many frames have been read
+            service_tx (bool): Also load queued messages into free transmit buffers. Defaults to\
+                `True`
         """
-        status = self._read_status()
+        drained = 0
+        status = self._poll_status()
+        if service_tx and self._tx_queue:
+            self._service_tx_queue(status)
+        # with rollover on, a frame can only be lost while RXB1 is full
+        if status & _RX1IF:
+            self._check_rx_overflow()
+
+        while status & _STAT_RXIF_MASK:
+            if status & _RX0IF:
+                self._read_rx_buffer(_READ_RX0)
+                drained += 1
+                if max_n is not None and drained >= max_n:
+                    break
+
+            if status & _RX1IF:
+                self._read_rx_buffer(_READ_RX1)
+                drained += 1
+                if max_n is not None and drained >= max_n:
+                    break
+
+            status = self._read_status()
+
+        self._last_drain_count = drained
+
+    def _poll_status(self):
+        """READ STATUS for a receive poll. With an INT pin, returns 0 without touching the SPI bus
+        while INT is idle and nothing waits in the transmit queue, and acknowledges TX-complete
+        flags so INT can go idle again. With messages queued the status is always read, as only
+        a real one says which transmit buffers are free."""
+        if self._health_monitor is not None:
+            self._health_monitor.poll()
+        int_line = self._int_line
+        if int_line is None:
+            return self._read_status()
+        if not int_line.asserted and not self._tx_queue:
+            return 0
 
-        # TODO: read and store all available messages
-        if status & 0b1:
-            self._read_rx_buffer(_READ_RX0)
+        status = self._read_status()
+        if status & _STAT_TXIF_MASK:
+            # READ STATUS reports TX0IF/TX1IF/TX2IF in bits 3/5/7; CANINTF keeps them in bits 2-4
+            tx_flags = (
+                ((status >> 1) & _TX0IF) | ((status >> 2) & _TX1IF) | ((status >> 3) & _TX2IF)
+            )
+            self._mod_register(_CANINTF, tx_flags, 0)
+        return status
 
-        if status & 0b10:
-            self._read_rx_buffer(_READ_RX1)
+    def _check_rx_overflow(self):
+        bus_flags = self._read_register(_EFLG)
+        overflow_flags = bus_flags & (_EFLG_RX0OVR | _EFLG_RX1OVR)
+        if not overflow_flags:
+            return
+        if overflow_flags & _EFLG_RX0OVR:
+            self._rx_overflow_count += 1
+        if overflow_flags & _EFLG_RX1OVR:
+            self._rx_overflow_count += 1
+        if self._stats is not None:
+            self._stats.record_overflow_flags(
+                overflow_flags & _EFLG_RX0OVR, overflow_flags & _EFLG_RX1OVR
+            )
+        self._mod_register(_EFLG, overflow_flags, 0)
 
-    def _write_message(self, tx_buffer, message_obj):
+    def _load_tx_frame(self, tx_buffer, message_obj, txp=0):
+        """Lay out a WRITE starting at TXBnCTRL, followed by the ID header, DLC and payload, in
+        `_tx_frame` so the whole frame, including its TXP priority bits, goes out in one SPI
+        transaction
 
-        if tx_buffer is None:
-            raise RuntimeError("No transmit buffer available to send")
+        Returns:
+            int: The number of bytes of `_tx_frame` to write
+        """
         if isinstance(message_obj, RemoteTransmissionRequest):
             dlc = message_obj.length
+            payload_length = 0
         else:
             dlc = len(message_obj.data)
+            payload_length = dlc
 
         if dlc > _MAX_CAN_MSG_LEN:
             raise AttributeError("Message/RTR length must be <=%d" % _MAX_CAN_MSG_LEN)
-        load_command = tx_buffer.LOAD_CMD
 
         if isinstance(message_obj, RemoteTransmissionRequest):
             dlc |= _RTR_MASK
 
-        # get id buffer segment
-
-        self._load_id_buffer(message_obj.id, message_obj.extended)
-
-        # this splits up the id header, dlc (len, rtr status), and message buffer
-        # TODO: check if we can send in one buffer, in which case `id_buffer` isn't needed
-
+        frame = self._tx_frame
+        frame[0] = _WRITE
+        frame[1] = tx_buffer.CTRL_REG
+        frame[2] = txp
+        frame[3:7] = self._id_header(message_obj.id, message_obj.extended)
+        frame[7] = dlc
+        if payload_length:
+            frame[_TX_FRAME_HEADER_LEN : _TX_FRAME_HEADER_LEN + payload_length] = message_obj.data
+        return _TX_FRAME_HEADER_LEN + payload_length
+
+    def _id_header(self, can_id, extended):
+        """The four encoded ID bytes for `can_id`, cached per (id, extended)"""
+        key = (can_id << 1) | extended
+        header = self._id_header_cache.get(key)
+        if header is None:
+            if len(self._id_header_cache) >= _ID_HEADER_CACHE_SIZE:
+                self._id_header_cache.clear()
+            self._load_id_buffer(can_id, extended)
+            header = bytes(self._id_buffer)
+            self._id_header_cache[key] = header
+        return header
+
+    def _tx_priority_bits(self, priority, status):
+        """TXP bits for a message of `priority` joining the transmit buffers `status` shows as
+        pending.
+
+        The pending buffers always hold distinct TXP values, highest for the most urgent and, among
+        equal priorities, for the one loaded first, so the chip sends them in that order and never
+        falls back on its buffer-number tie break. The new message takes a value between the
+        messages ranked either side of it. When there is none free, the pending buffers are given
+        new TXP values first, one BIT MODIFY each.
+        """
+        # TXP of the least urgent message going before this one, and of the most urgent after it
+        above = 4
+        below = -1
+        for buffer_index in range(3):
+            if status & _STAT_TX_PENDING[buffer_index]:
+                txp = self._tx_buffer_txp[buffer_index]
+                if self._tx_buffer_priorities[buffer_index] <= priority:
+                    above = min(above, txp)
+                else:
+                    below = max(below, txp)
+        if above - below >= 2:
+            return (above + below + 1) // 2
+
+        ranked = [index for index in range(3) if status & _STAT_TX_PENDING[index]]
+        ranked.sort(key=lambda index: self._tx_buffer_txp[index], reverse=True)
+        position = 0
+        while position < len(ranked) and self._tx_buffer_priorities[ranked[position]] <= priority:
+            position += 1
+        spread = _TXP_SPREAD[len(ranked)]
+        for rank, buffer_index in enumerate(ranked):
+            txp = spread[rank + 1] if rank >= position else spread[rank]
+            if txp != self._tx_buffer_txp[buffer_index]:
+                self._mod_register(self._tx_buffers[buffer_index].CTRL_REG, _TXB_TXP_M, txp)
+                self._tx_buffer_txp[buffer_index] = txp
+        return spread[position]
+
+    def _load_tx_buffer(self, tx_buffer, message_obj, priority, status):
+        buffer_index = self._tx_buffers.index(tx_buffer)
+        txp = self._tx_priority_bits(priority, status)
+        self._tx_buffer_priorities[buffer_index] = priority
+        self._tx_buffer_txp[buffer_index] = txp
+        self._tx_buffer_keys[buffer_index] = (message_obj.id << 1) | message_obj.extended
+        frame_length = self._load_tx_frame(tx_buffer, message_obj, txp)
         with self._bus_device_obj as spi:
-            # send write command for the given buffer
-            self._buffer[0] = load_command
-            # spi.write(self._buffer, end=1)
-            spi.write_readinto(
-                self._buffer,  # because the reference does similar
-                self._buffer,
-                out_start=0,
-                out_end=1,
-                in_start=0,
-                in_end=1,
-            )
+            spi.write(self._tx_frame, end=frame_length)
+        if self._stats is not None:
+            self._stats.messages_sent += 1
 
-            # send id bytes
-            spi.write(self._id_buffer, end=4)
+    def _write_message(self, tx_buffer, message_obj, priority=None, status=0):
 
-            # send DLC
+        if tx_buffer is None:
+            raise RuntimeError("No transmit buffer available to send")
+        if priority is None:
+            priority = message_obj.id
 
-            spi.write(bytearray([dlc]))
-            # send message bytes, limit to 8?
-            if isinstance(message_obj, Message):
-                spi.write(message_obj.data, end=8)
+        self._load_tx_buffer(tx_buffer, message_obj, priority, status)
 
         # send the frame based on the current buffers
         self._start_transmit(tx_buffer)
         return True
 
-    # TODO: Priority
     def _start_transmit(self, tx_buffer):
-        #
         self._buffer[0] = tx_buffer.SEND_CMD
         with self._bus_device_obj as spi:
-            spi.write_readinto(
-                self._buffer,  # because the reference does similar
-                self._buffer,
-                out_start=0,
-                out_end=1,
-                in_start=0,
-                in_end=1,
-            )
+            spi.write(self._buffer, end=1)
 
-    def _set_filter_register(self, filter_index, mask, extended):
-        filter_reg_addr = FILTERS[filter_index]
-        self._write_id_to_register(filter_reg_addr, mask, extended)
+    def _set_filter_register(self, mask_index, filter_index, address, extended):
+        filter_reg_addr = FILTERS[mask_index][filter_index]
+        self._write_id_to_register(filter_reg_addr, address, extended)
 
     def _set_mask_register(self, mask_index, mask, extended):
         mask_reg_addr = MASKS[mask_index]
         self._write_id_to_register(mask_reg_addr, mask, extended)
 
-    @staticmethod
-    def _unload_ids(raw_ids):
-        """In=> 32-bit int packed with (StdID or ExTID top11  + bot18)+ extid bit
-        out=> id, extended flag"""
-        extended = (raw_ids & _TXB_EXIDE_M_16 << 16) > 0
-        # std id field is most significant 11 bits of 4 bytes of id registers
-        top_chunk = raw_ids & EXTID_TOP_11_READ_MASK
-        if extended:
-            # get bottom 18
-            bottom_chunk = raw_ids & EXTID_BOTTOM_18_MASK
-            # shift the top chunk back down 3 to start/end at bit 28=29th
-            top_chunk >>= 3
-            sender_id = top_chunk | bottom_chunk
-        else:
-            # shift down the  3 [res+extid+res]+18 extid bits
-            sender_id = top_chunk >> (18 + 3)
-        return (extended, sender_id)
-
     def _load_id_buffer(self, can_id, extended=False):
         self._id_buffer[0] = 0
         self._id_buffer[1] = 0
@@ -616,13 +1215,16 @@ class MCP2515:  # pylint:disable=too-many-instance-attributes
         pack_into(">I", self._id_buffer, 0, final_id)
 
     def _write_id_to_register(self, register, can_id, extended=False):
-        # load register in to ID buffer
+        # set the mask in the ID buffer
+        self._load_id_buffer(can_id, extended)
+        shadow = self._shadow
+        if shadow is not None and shadow.matches_block(register, self._id_buffer):
+            shadow.skipped_writes += 4
+            return
 
+        # load register in to ID buffer
         current_mode = self._mode
         self._set_mode(_MODE_CONFIG)
-        # set the mask in the ID buffer
-
-        self._load_id_buffer(can_id, extended)
 
         # write with buffer
         with self._bus_device_obj as spi:
@@ -641,9 +1243,22 @@ class MCP2515:  # pylint:disable=too-many-instance-attributes
 
             # send id bytes
             spi.write(self._id_buffer, end=4)
+        if shadow is not None:
+            shadow.store_block(register, self._id_buffer)
 
         self._set_mode(current_mode)
 
+    def _id_registers_current(self, registers):
+        """True if the shadow cache shows every ``(register, can_id, extended)`` already written"""
+        shadow = self._shadow
+        if shadow is None:
+            return False
+        for register, can_id, extended in registers:
+            self._load_id_buffer(can_id, extended)
+            if not shadow.matches_block(register, self._id_buffer):
+                return False
+        return True
+
     @property
     def _tx_buffers_in_use(self):
         # the ref code allows for reserving buffers, but didn't see any way
@@ -658,28 +1273,25 @@ class MCP2515:  # pylint:disable=too-many-instance-attributes
             bool(status & _STAT_TX2_PENDING),
         )
 
-    def _get_tx_buffer(self):
-        """Get the address of the next available tx buffer and unset
-        its interrupt bit in _CANINTF"""
-        # check all buffers by looking for match on
-        txs_busy = self._tx_buffers_in_use
-        if all(txs_busy):
-            self._dbg("none available!")
-            return None
-        buffer_index = txs_busy.index(False)  # => self._tx_buffers
-        tx_buffer = self._tx_buffers[buffer_index]
-
-        self._mod_register(_CANINTF, tx_buffer.INT_FLAG_MASK, 0)
-        return tx_buffer
-
-    def _set_baud_rate(self):
-        # ******* set baud rate ***********
-        if self._crystal_freq not in (16000000, 12000000, 8000000):
+    @staticmethod
+    def _find_bit_timing(crystal_freq, baudrate, sample_point):
+        if sample_point is None:
+            cnf = _BAUD_RATES.get(crystal_freq, {}).get(baudrate)
+            if cnf is not None:
+                return cnf
+            sample_point = timing.DEFAULT_SAMPLE_POINT
+        cnf = timing.solve(crystal_freq, baudrate, sample_point)
+        actual, _ = timing.decode(crystal_freq, *cnf)
+        if abs(actual - baudrate) > baudrate / 100:
             raise ValueError(
-                f"Incorrect crystal frequency - must be one of: {tuple(_BAUD_RATES.keys())}"
+                "No bit timing for %d bps with a %d Hz crystal (closest is %d)"
+                % (baudrate, crystal_freq, actual)
             )
+        return cnf
 
-        cnf1, cnf2, cnf3 = _BAUD_RATES[self._crystal_freq][self.baudrate]
+    def _set_baud_rate(self):
+        # ******* set baud rate ***********
+        cnf1, cnf2, cnf3 = self._bit_timing
 
         self._set_register(_CNF1, cnf1)
         self._set_register(_CNF2, cnf2)
@@ -691,25 +1303,39 @@ class MCP2515:  # pylint:disable=too-many-instance-attributes
         with self._bus_device_obj as spi:
             spi.write(self._buffer, end=1)
         sleep(0.010)
+        if self._shadow is not None:
+            self._shadow.reset()
 
     def _set_mode(self, mode):
+        shadow = self._shadow
+        if shadow is not None and shadow.mode == mode:
+            shadow.skipped_mode_changes += 1
+            return
         stat_reg = self._read_register(_CANSTAT)
         current_mode = stat_reg & _MODE_MASK
 
         if current_mode == mode:
+            if shadow is not None:
+                self._confirm_mode(mode)
             return
-        self._timer.rewind_to(5)
+        self._timer.rewind_to_ms(5000)
         while not self._timer.expired:
 
             new_mode_set = self._request_new_mode(mode)
             if new_mode_set:
-                self._mode = mode
+                self._confirm_mode(mode)
                 return
 
         raise RuntimeError("Unable to change mode")
 
+    def _confirm_mode(self, mode):
+        self._mode = mode
+        if self._shadow is not None:
+            # a sleeping controller wakes up by itself, so that mode is never trusted
+            self._shadow.mode = None if mode == _MODE_SLEEP else mode
+
     def _request_new_mode(self, mode):
-        self._timer.rewind_to(0.200)
+        self._timer.rewind_to_ms(200)
         while not self._timer.expired:
             # Request new mode
             # This is inside the loop as sometimes requesting the new mode once doesn't work
@@ -731,6 +1357,8 @@ class MCP2515:  # pylint:disable=too-many-instance-attributes
         self._buffer[3] = new_value
         with self._bus_device_obj as spi:
             spi.write(self._buffer, end=4)
+        if self._shadow is not None:
+            self._shadow.modify(register_addr, mask, new_value)
 
     def _read_register(self, regsiter_addr):
         self._buffer[0] = _READ
@@ -752,84 +1380,274 @@ class MCP2515:  # pylint:disable=too-many-instance-attributes
             spi.readinto(self._buffer, start=0, end=1)
         return self._buffer[0]
 
+    def _read_registers(self, start_addr, count):
+        """Read `count` consecutive registers from `start_addr` in one sequential READ, into the
+        start of ``self._buffer``"""
+        self._buffer[0] = _READ
+        self._buffer[1] = start_addr
+        with self._bus_device_obj as spi:
+            spi.write(self._buffer, end=2)
+            spi.readinto(self._buffer, end=count)
+        return self._buffer
+
     def _set_register(self, regsiter_addr, register_value):
+        shadow = self._shadow
+        if shadow is not None and shadow.matches(regsiter_addr, register_value):
+            shadow.skipped_writes += 1
+            return
         self._buffer[0] = _WRITE
         self._buffer[1] = regsiter_addr
         self._buffer[2] = register_value
         with self._bus_device_obj as spi:
             spi.write(self._buffer, end=3)
+        if shadow is not None:
+            shadow.store(regsiter_addr, register_value)
+
+    def _write_registers(self, start_addr, values, start=0, end=None):
+        """Write ``values[start:end]`` to consecutive registers from `start_addr` in one
+        sequential WRITE"""
+        if end is None:
+            end = len(values)
+        buffer = self._buffer
+        buffer[0] = _WRITE
+        buffer[1] = start_addr
+        for idx in range(start, end):
+            buffer[2 + idx - start] = values[idx]
+        with self._bus_device_obj as spi:
+            spi.write(buffer, end=2 + end - start)
+        if self._shadow is not None:
+            self._shadow.store_block(start_addr, values, start, end)
 
-    def _get_bus_status(self):
-        """Get the status flags that report the state of the bus"""
-        bus_flags = self._read_register(_EFLG)
+    def _write_changed_registers(self, start_addr, values, current):
+        """Write `values` to consecutive registers from `start_addr`, trimmed to the span that
+        differs from `current` (what the registers hold now). Nothing is sent when all match.
+
+        Returns:
+            int: The number of registers written
+        """
+        first = 0
+        last = len(values)
+        while first < last and values[first] == current[first]:
+            first += 1
+        while last > first and values[last - 1] == current[last - 1]:
+            last -= 1
+        if first == last:
+            return 0
+        self._write_registers(start_addr + first, values, first, last)
+        return last - first
+
+    def _read_bus_health(self):
+        """Read TEC, REC and EFLG in one sequential READ, record and clear any RX overflow flags
+        and decode the rest
 
-        flags = []
-        for idx in range(8):
-            bit_mask = 1 << idx
-            flags.append((bus_flags & bit_mask) > 0)
-        (  # pylint:disable=unbalanced-tuple-unpacking
-            error_warn,
-            _rx_error_warn,
-            _tx_err_warn,
-            rx_error_passive,
-            tx_error_passive,
-            buss_off,
-            self._rx0_overflow,
-            self._rx1_overflow,
-        ) = flags
-        if self._rx0_overflow or self._rx0_overflow:
+        Returns:
+            BusHealth: The state, error counters and raw flags
+        """
+        # TEC and REC are at 0x1C/0x1D and EFLG at 0x2D, so one 18-byte read covers all three
+        count = _EFLG - _TEC + 1
+        self._buffer[0] = _READ
+        self._buffer[1] = _TEC
+        with self._bus_device_obj as spi:
+            spi.write(self._buffer, end=2)
+            spi.readinto(self._buffer, end=count)
+        tec = self._buffer[0]
+        rec = self._buffer[_REC - _TEC]
+        bus_flags = self._buffer[_EFLG - _TEC]
+
+        self._rx0_overflow = bool(bus_flags & _EFLG_RX0OVR)
+        self._rx1_overflow = bool(bus_flags & _EFLG_RX1OVR)
+        if self._rx0_overflow or self._rx1_overflow:
+            self._rx_overflow_count += self._rx0_overflow + self._rx1_overflow
+            if self._stats is not None:
+                self._stats.record_overflow_flags(self._rx0_overflow, self._rx1_overflow)
             self._mod_register(
                 _EFLG, 0xC0, 0
             )  # clear overflow bits now that we've recorded them
 
-        if buss_off:
-            self._bus_state = BusState.BUS_OFF
-        elif tx_error_passive or rx_error_passive:
-            self._bus_state = BusState.ERROR_PASSIVE
-        elif error_warn:
-            self._bus_state = BusState.ERROR_WARNING
+        self._bus_state = bus_state(bus_flags)
+        return BusHealth(self._bus_state, tec, rec, bus_flags)
+
+    def deinit_filtering_registers(self):
+        """Clears the Receive Mask and Filter Registers"""
+        cleared = [(mask_reg, 0, False) for mask_reg in MASKS]
+        for filter_regs in FILTERS:
+            cleared.extend((filter_reg, 0, False) for filter_reg in filter_regs)
+        # with the shadow cache on, registers that are already clear cost nothing
+        if not self._id_registers_current(cleared):
+            current_mode = self._mode
+            self._set_mode(_MODE_CONFIG)
+            for register, can_id, extended in cleared:
+                self._write_id_to_register(register, can_id, extended)
+            self._set_mode(current_mode)
+        self._filter_plan = None
+        self._software_filter = None
+        self._check_shadow()
+
+    def _apply_filter_plan(self, plan):
+        if not self._id_registers_current(self._filter_plan_registers(plan)):
+            current_mode = self._mode
+            # one trip through configuration mode for all eight registers
+            self._set_mode(_MODE_CONFIG)
+            self._write_filter_plan(plan)
+            self._set_mode(current_mode)
+        self._filter_plan = plan
+        self._software_filter = plan.software_filter
+        self._check_shadow()
+
+    @staticmethod
+    def _filter_plan_registers(plan):
+        """``(register, can_id, extended)`` for every mask and filter of `plan`"""
+        registers = []
+        for mask_index, mask in enumerate(plan.masks):
+            # masks are kept in the 29-bit register layout, which the extended encoding writes as is
+            registers.append((MASKS[mask_index], mask, True))
+            for filter_index, (address, extended) in enumerate(plan.filters[mask_index]):
+                registers.append((FILTERS[mask_index][filter_index], address, extended))
+        return registers
+
+    def _write_filter_plan(self, plan):
+        # needs configuration mode
+        for register, can_id, extended in self._filter_plan_registers(plan):
+            self._write_id_to_register(register, can_id, extended)
+
+    def enable_stats(self, enabled=True):
+        """Start or stop collecting `stats`.
+
+        While on, every SPI transaction goes through a counting wrapper and the send and receive
+        calls time themselves. While off the driver only pays for an ``is None`` check on the hot
+        paths. Turning it on again starts from zero.
+
+        Args:
+            enabled (bool): `True` to collect, `False` to stop and drop the counters
+        """
+        device = self._bus_device_obj
+        if isinstance(device, CountingSPIDevice):
+            device = device.device
+        if enabled:
+            self._stats = DriverStats()
+            self._bus_device_obj = CountingSPIDevice(device, self._stats)
         else:
-            self._bus_state = BusState.ERROR_ACTIVE
+            self._stats = None
+            self._bus_device_obj = device
 
-    def _create_mask(self, match):
-        mask = match.mask
-        if mask == 0:
-            if match.extended:
-                mask = EXTID_BOTTOM_29_MASK
-            else:
-                mask = STDID_BOTTOM_11_MASK
+    def enable_shadow_registers(self, enabled=True, *, verify=False):
+        """Start or stop keeping a write-through cache of the configuration registers.
 
-        masks_used = len(self._masks_in_use)
-        if masks_used < len(MASKS):
-            next_mask_index = masks_used
+        While on, the driver remembers what it wrote to CNF1-3, RXB0CTRL, RXB1CTRL, CANCTRL and the
+        masks and filters, and which mode CANSTAT last confirmed. Writes that would store the same
+        value again are skipped, and so are the CANSTAT read and mode changes around them: a
+        `listen` with the filters already in place, or a `Listener.deinit` with them already
+        clear, costs no SPI traffic at all. The cache starts out empty when turned on and is
+        refilled by every RESET.
 
-            self._set_mask_register(next_mask_index, mask, match.extended)
-            self._masks_in_use.append(MASKS[next_mask_index])
-            return next_mask_index
+        Something else changing the controller behind the driver's back (a brown-out of the
+        MCP2515 alone, say) makes the cache stale; `verify_registers` checks it against the
+        hardware.
 
-        raise RuntimeError("No Masks Available")
+        Args:
+            enabled (bool): `True` to keep the cache, `False` to drop it
+            verify (bool): Read the registers back after every `initialize`, `restart` and filter\
+                change and raise `RuntimeError` if they differ from the cache. Meant for\
+                bring-up, as it costs a few sequential reads each time. Defaults to `False`
+        """
+        self._shadow = ShadowRegisters() if enabled else None
+        self._verify_shadow = enabled and verify
 
-    def _create_filter(self, match, mask_index):
+    @property
+    def shadow_registers(self):
+        """The `ShadowRegisters` in use, or None while `enable_shadow_registers` is off. Its\
+            ``skipped_writes`` and ``skipped_mode_changes`` count the SPI work saved (read-only)"""
+        return self._shadow
 
-        next_filter_index = len(self._filters_in_use[mask_index])
-        if next_filter_index == len(FILTERS[mask_index]):
-            raise RuntimeError("No Filters Available")
+    def verify_registers(self):
+        """Read every register the shadow cache knows back from the controller, plus CANSTAT,
+        and compare. Registers that differ are dropped from the cache so the next write to them
+        goes through.
 
-        filter_register = FILTERS[mask_index][next_filter_index]
+        The controller only reads its masks and filters back in configuration mode, so in any
+        other mode they are left out of the comparison.
 
-        self._write_id_to_register(filter_register, match.address, match.extended)
-        self._filters_in_use[mask_index].append(filter_register)
+        Returns:
+            list: ``(address, cached, actual)`` for every difference, only counting the bits the\
+                driver can write. A wrong operating mode is reported with the CANSTAT address\
+                and the mode bits. Empty when everything matches or the cache is off.
+        """
+        shadow = self._shadow
+        if shadow is None:
+            return []
+        mismatches = []
+        mode = self._read_register(_CANSTAT) & _MODE_MASK
+        blocks = READ_BLOCKS if mode == _MODE_CONFIG else RUNNING_READ_BLOCKS
+        for start_addr, count in blocks:
+            values = self._read_registers(start_addr, count)
+            mismatches.extend(shadow.compare(start_addr, values, count))
+        if shadow.mode is not None and mode != shadow.mode:
+            mismatches.append((_CANSTAT, shadow.mode, mode))
+            shadow.mode = None
+        return mismatches
+
+    def _check_shadow(self):
+        if not self._verify_shadow:
+            return
+        mismatches = self.verify_registers()
+        if mismatches:
+            raise RuntimeError(
+                "Registers differ from the shadow cache: "
+                + ", ".join("0x%02X: 0x%02X != 0x%02X" % mismatch for mismatch in mismatches)
+            )
 
-    def deinit_filtering_registers(self):
-        """Clears the Receive Mask and Filter Registers"""
+    def enable_health_monitor(self, interval=0.1, **kwargs):
+        """Cache the bus health and read it at most every `interval` seconds.
+
+        Afterwards `state`, `transmit_error_count` and `receive_error_count` come from the cache,
+        refreshed by receive polls (or by the monitor's `HealthMonitor.run` task) once the interval
+        has passed, and state changes can be watched with `HealthMonitor.on_state_change`.
 
-        for mask_index, mask_reg in enumerate(MASKS):
-            self._set_register(mask_reg, 0)
+        Args:
+            interval (float): Seconds between register reads. Defaults to 0.1
+            kwargs: ``auto_recover``, ``recovery_backoff`` and ``max_recovery_backoff``, see\
+                `HealthMonitor`
+
+        Returns:
+            HealthMonitor: The monitor, also available as `health_monitor`
+        """
+        self._health_monitor = HealthMonitor(self, interval, **kwargs)
+        return self._health_monitor
+
+    def disable_health_monitor(self):
+        """Go back to reading the error registers on every access"""
+        self._health_monitor = None
 
-            for filter_reg in FILTERS[mask_index]:
-                self._set_register(filter_reg, 0)
-        self._masks_in_use = []
-        self._filters_in_use = [[], []]
+    @property
+    def health_monitor(self):
+        """The `HealthMonitor` in use, or None (read-only)"""
+        return self._health_monitor
+
+    def _bus_health(self):
+        monitor = self._health_monitor
+        if monitor is not None:
+            return monitor.poll()
+        return self._read_bus_health()
+
+    @property
+    def stats(self):
+        """The `DriverStats` being collected, or None while `enable_stats` is off. Its\
+            ``rx_residency`` histogram shows how long received frames waited in software before\
+            the application read them (read-only)"""
+        return self._stats
+
+    @property
+    def filter_plan(self):
+        """The `FilterPlan` programmed by the last `listen`, or None if every frame is accepted.\
+            Its ``acceptance_ratio`` is the expected share of received frames that a match wants\
+            (read-only)"""
+        return self._filter_plan
+
+    @property
+    def software_rejected_count(self):
+        """The number of frames the hardware filters let through but no `Match` wanted, dropped\
+            after reading only their header (read-only)"""
+        return self._software_rejected_count
 
     ######## CANIO API METHODS #############
     @property
@@ -842,6 +1660,8 @@ class MCP2515:  # pylint:disable=too-many-instance-attributes
         """ The number of transmit errors (read-only). Increased for a detected transmission error,\
              decreased for successful transmission. Limited to the range from 0 to 255 inclusive. \
                  Also called TEC."""
+        if self._health_monitor is not None:
+            return self._health_monitor.poll().transmit_error_count
         return self._read_register(_TEC)
 
     @property
@@ -849,6 +1669,8 @@ class MCP2515:  # pylint:disable=too-many-instance-attributes
         """ The number of receive errors (read-only). Increased for a detected reception error, \
             decreased for successful reception. Limited to the range from 0 to 255 inclusive. Also
          called REC."""
+        if self._health_monitor is not None:
+            return self._health_monitor.poll().receive_error_count
         return self._read_register(_REC)
 
     @property
@@ -869,8 +1691,7 @@ class MCP2515:  # pylint:disable=too-many-instance-attributes
     @property
     def state(self):  # State
         """The current state of the bus. (read-only)"""
-        self._get_bus_status()
-        return self._bus_state
+        return self._bus_health().state
 
     @property
     def loopback(self):  # bool
@@ -884,9 +1705,29 @@ class MCP2515:  # pylint:disable=too-many-instance-attributes
 
     def restart(self):
         """If the device is in the bus off state, restart it."""
+        if self._fast_init:
+            # program the masks and filters while the reset leaves the chip in config mode
+            timed = self._stats is not None
+            start = _now_us() if timed else 0
+            self._fast_initialize(self._filter_plan)
+            if timed:
+                self._startup_time_us = _now_us() - start
+                self._dbg("restarted in %d us" % self._startup_time_us)
+            self._check_shadow()
+            return
         self.initialize()
+        if self._filter_plan is not None:
+            # the reset cleared the masks and filters
+            self._apply_filter_plan(self._filter_plan)
 
-    def listen(self, matches=None, *, timeout: float = 10):
+    @property
+    def startup_time_us(self):
+        """Microseconds the last `initialize` or `restart` took, from the RESET command to the\
+            controller reaching its operating mode. Only measured while stats are on (see\
+            `enable_stats`), None before that (read-only)"""
+        return self._startup_time_us
+
+    def listen(self, matches=None, *, timeout: float = 10, asynchronous: bool = False):
         """Start receiving messages that match any one of the filters.
 
         Creating a listener is an expensive operation and can interfere with reception of messages
@@ -895,8 +1736,10 @@ class MCP2515:  # pylint:disable=too-many-instance-attributes
     There is an implementation-defined maximum number of listeners and limit to the complexity of
     the filters.
 
-    If the hardware cannot support all the requested matches, a ValueError is raised. Note that \
-        generally there are some number of hardware filters shared among all fifos.
+    Any number of matches can be given. The two masks and six filters are assigned to let through\
+        as few unwanted frames as possible (see `plan_filters`), and frames the hardware cannot\
+        exclude are dropped in software before their payload is read. `filter_plan` reports the\
+        expected acceptance ratio.
 
     A message can be received by at most one Listener. If more than one listener matches a message,\
          it is undefined which one actually receives it.
@@ -908,6 +1751,9 @@ class MCP2515:  # pylint:disable=too-many-instance-attributes
         Args:
             match (Optional[Sequence[Match]], optional): [description]. Defaults to None.
             timeout (float, optional): [description]. Defaults to 10.
+            asynchronous (bool, optional): Return an `AsyncListener`, whose ``receive()`` is\
+                awaited and which supports ``async for``, instead of a blocking `Listener`.\
+                Defaults to False.
 
         Returns:
             Listener: [description]
@@ -920,25 +1766,23 @@ class MCP2515:  # pylint:disable=too-many-instance-attributes
                 `silent`==`True` and `loopback` == `False`"
             )
 
-        for match in matches:
-            self._dbg("match:", match)
-            mask_index_used = self._create_mask(match)
-            self._create_filter(match, mask_index=mask_index_used)
-
-        used_masks = len(self._masks_in_use)
-        # if matches were made and there are unused masks
-        # set the unused masks to prevent them from leaking packets
-        if len(matches) > 0 and used_masks < len(MASKS):
-            next_mask_index = used_masks
-            for idx in range(next_mask_index, len(MASKS)):
-                print("using unused mask index:", idx)
-                self._create_mask(matches[-1])
+        if matches:
+            plan = plan_filters(matches)
+            self._dbg("filter plan:", plan)
+            self._apply_filter_plan(plan)
 
+        if asynchronous:
+            return AsyncListener(self, timeout)
         return Listener(self, timeout)
 
     def deinit(self):
         """Deinitialize this object, freeing its hardware resources"""
+        if self._scheduler is not None:
+            self._scheduler.detach(self)
+            self._scheduler = None
         self._cs_pin.deinit()
+        if self._int_line is not None:
+            self._int_line.deinit()
 
     def __enter__(self):
         """Returns self, to allow the object to be used in a The with statement statement for \
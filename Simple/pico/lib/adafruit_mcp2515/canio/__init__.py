@@ -8,7 +8,15 @@ from ..timer import Timer
 
 
 class Message:
-    """A class representing a CANbus data frame"""
+    """A class representing a CANbus data frame
+
+    A `Message` can be reused with `Listener.receive_into` to receive without allocating.
+
+    Received messages also carry ``timestamp``, the `adafruit_ticks.ticks_ms` value when the\
+    driver read the frame off the chip, and ``sequence``, a running count of received frames.\
+    Both are None on messages created to send."""
+
+    __slots__ = ("id", "_data", "extended", "timestamp", "sequence")
 
     # pylint:disable=too-many-arguments,invalid-name,redefined-builtin
     def __init__(self, id, data, extended=False):
@@ -27,6 +35,8 @@ class Message:
         self.id = id
         self.data = data
         self.extended = extended
+        self.timestamp = None
+        self.sequence = None
 
     @property
     def data(self):
@@ -46,11 +56,18 @@ class Message:
             )
         # self.rtr = False
         # self._data = new_data
-        self._data = bytearray(new_data)
+        if self._data is not None and len(self._data) == len(new_data):
+            # same length: copy in place rather than allocate
+            self._data[:] = new_data
+        else:
+            self._data = bytearray(new_data)
 
 
 class RemoteTransmissionRequest:
-    """A class representing a CANbus remote frame"""
+    """A class representing a CANbus remote frame. Received ones carry ``timestamp`` and\
+    ``sequence`` like a `Message`."""
+
+    __slots__ = ("id", "length", "extended", "timestamp", "sequence")
 
     def __init__(self, id: int, length: int, *, extended: bool = False):
         """Construct a RemoteTransmissionRequest to send on a CAN bus
@@ -65,6 +82,8 @@ class RemoteTransmissionRequest:
         self.id = id
         self.length = length
         self.extended = extended
+        self.timestamp = None
+        self.sequence = None
 
 
 class Listener:
@@ -78,6 +97,7 @@ class Listener:
         self._timer = Timer()
         self._can_bus_obj = can_bus_obj
         self._timeout = None
+        self._timeout_ms = 0
         self.timeout = timeout
 
     @property
@@ -89,6 +109,8 @@ class Listener:
     @timeout.setter
     def timeout(self, timeout):
         self._timeout = float(timeout)
+        # converted once so each receive only does integer tick arithmetic
+        self._timeout_ms = int(timeout * 1000)
 
     def receive(self):
         """Receives a message. If after waiting up to self.timeout seconds if no message is\
@@ -97,13 +119,37 @@ class Listener:
             raise ValueError(
                 "Object has been deinitialized and can no longer be used. Create a new object."
             )
-        self._timer.rewind_to(self.timeout)
+        self._timer.rewind_to_ms(self._timeout_ms)
         while not self._timer.expired:
             if self._can_bus_obj.unread_message_count == 0:
                 continue
             return self._can_bus_obj.read_message()
         return None
 
+    def receive_into(self, message):
+        """Receives a message into an existing `Message`, waiting up to self.timeout seconds.
+
+        The ID, payload and extended flag are parsed straight into `message`, so a control loop\
+        that keeps reusing one `Message` does not allocate per frame.
+
+        Args:
+            message (Message): The message to overwrite
+
+        Returns:
+            `message` if a data frame was received, a new `RemoteTransmissionRequest` if a remote\
+                frame was received, or None if nothing arrived in time
+        """
+        if self._can_bus_obj is None:
+            raise ValueError(
+                "Object has been deinitialized and can no longer be used. Create a new object."
+            )
+        self._timer.rewind_to_ms(self._timeout_ms)
+        while not self._timer.expired:
+            frame = self._can_bus_obj.read_message_into(message)
+            if frame is not None:
+                return frame
+        return None
+
     def in_waiting(self):
         """Returns the number of messages waiting"""
         if self._can_bus_obj is None:
@@ -153,6 +199,76 @@ class Listener:
         self.deinit()
 
 
+class AsyncListener(Listener):
+    """A `Listener` for `asyncio` code: ``await listener.receive()`` and\
+        ``async for message in listener``.
+
+    While no message is waiting it sleeps between polls, so other tasks keep running. The pause
+    starts at `min_poll_interval`, doubles on every empty poll up to `max_poll_interval`, and
+    drops back to `min_poll_interval` as soon as a message arrives, so bursts are picked up
+    quickly while an idle bus costs few SPI transactions.
+
+    Created by calling the `listen` method of a canio.CAN object with ``asynchronous=True``.
+    """
+
+    def __init__(
+        self, can_bus_obj, timeout=1.0, *, min_poll_interval=0.0, max_poll_interval=0.01
+    ):
+        super().__init__(can_bus_obj, timeout)
+        self.min_poll_interval = min_poll_interval
+        self.max_poll_interval = max_poll_interval
+
+    async def _wait_for(self, method_name, *args):
+        """Call the `MCP2515` read method `method_name` until it returns a frame or the timeout
+        passes. The method is looked up only after the deinit check."""
+        # pylint: disable=import-outside-toplevel
+        import asyncio
+
+        if self._can_bus_obj is None:
+            raise ValueError(
+                "Object has been deinitialized and can no longer be used. Create a new object."
+            )
+        read = getattr(self._can_bus_obj, method_name)
+        self._timer.rewind_to_ms(self._timeout_ms)
+        interval = self.min_poll_interval
+        while True:
+            frame = read(*args)
+            if frame is not None:
+                return frame
+            if self._timer.expired:
+                return None
+            await asyncio.sleep(interval)
+            interval = min(self.max_poll_interval, max(interval * 2, 0.001))
+
+    async def receive(self):
+        """Receives a message, yielding to other tasks while waiting. If after waiting up to\
+        self.timeout seconds no message is received, None is returned. Otherwise, a Message is\
+        returned."""
+        return await self._wait_for("read_message")
+
+    async def receive_into(self, message):
+        """Like `Listener.receive_into`, yielding to other tasks while waiting"""
+        return await self._wait_for("read_message_into", message)
+
+    def __iter__(self):
+        raise TypeError("Use `async for` with an AsyncListener")
+
+    def __aiter__(self):
+        """Returns self"""
+        if self._can_bus_obj is None:
+            raise ValueError(
+                "Object has been deinitialized and can no longer be used. Create a new object."
+            )
+        return self
+
+    async def __anext__(self):
+        """Waits, without blocking other tasks, for the next message"""
+        while True:
+            message = await self.receive()
+            if message is not None:
+                return message
+
+
 class BusState:
     """The state of the CAN bus"""
 
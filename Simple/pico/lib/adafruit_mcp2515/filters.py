@@ -0,0 +1,231 @@
+# SPDX-FileCopyrightText: Copyright (c) 2020 Bryan Siepert for Adafruit Industries
+#
+# SPDX-License-Identifier: MIT
+"""Acceptance mask and filter planning for `MCP2515.listen`; see `plan_filters`"""
+from collections import namedtuple
+
+# IDs are handled in the 29-bit layout of the mask/filter registers: a standard ID sits in the
+# top 11 bits (SID), an extended ID fills all 29 (SID + EID)
+_ID_BITS = 29
+_STD_BITS = 11
+_STD_SHIFT = 18
+_ALL_ID_BITS = (1 << _ID_BITS) - 1
+_EID_BITS = (1 << _STD_SHIFT) - 1
+_SID_BITS = _ALL_ID_BITS & ~_EID_BITS
+
+# RXB0 is covered by mask 0 and filters 0-1, RXB1 by mask 1 and filters 2-5
+_FILTER_SLOTS = (2, 4)
+# above this many distinct matches only a few RXB0/RXB1 splits are tried
+_EXHAUSTIVE_SPLIT_LIMIT = 6
+# above this many sets, unions are estimated by summing instead of computed exactly
+_INCLUSION_EXCLUSION_LIMIT = 10
+
+# How `MCP2515.listen` programs the acceptance registers.
+#
+# ``masks`` holds the RXM0 and RXM1 values in register layout. ``filters`` holds two tuples of
+# ``(address, extended)``, for RXF0-1 and RXF2-5. ``software_filter`` is a `SoftwareFilter` for
+# the frames the hardware lets through beyond the matches, or None if the hardware is exact.
+# ``acceptance_ratio`` is the share of hardware-accepted IDs that some match wants, so 1.0 means
+# no SPI reads are spent on unwanted frames (assuming traffic spread evenly over IDs).
+# (A comment rather than ``__doc__``: CircuitPython's namedtuple types can't be assigned to.)
+FilterPlan = namedtuple(
+    "FilterPlan", ["masks", "filters", "software_filter", "acceptance_ratio"]
+)
+
+
+def _popcount(value):
+    return bin(value).count("1")
+
+
+def _term(match):
+    """(value, care, extended) for a `Match`, in register layout"""
+    if match.extended:
+        care = (match.mask & _ALL_ID_BITS) or _ALL_ID_BITS
+        return (match.address & care, care, True)
+    care = ((match.mask & 0x7FF) or 0x7FF) << _STD_SHIFT
+    return ((match.address << _STD_SHIFT) & care, care, False)
+
+
+def _covers(outer, inner):
+    """True if every ID accepted by term `inner` is also accepted by term `outer`"""
+    return (
+        outer[2] == inner[2]
+        and outer[1] & inner[1] == outer[1]
+        and inner[0] & outer[1] == outer[0]
+    )
+
+
+def _union_size(entries):
+    """The number of IDs in the union of (value, care, extended) sets"""
+    total = 0
+    for extended in (False, True):
+        group = [entry for entry in entries if entry[2] == extended]
+        space = _ALL_ID_BITS if extended else _SID_BITS
+        bits = _ID_BITS if extended else _STD_BITS
+        if len(group) > _INCLUSION_EXCLUSION_LIMIT:
+            # upper bound, only used for very long match lists
+            for value, care, _ in group:
+                total += 1 << (bits - _popcount(care & space))
+            continue
+        for subset in range(1, 1 << len(group)):
+            value = care = 0
+            members = 0
+            for index, (entry_value, entry_care, _) in enumerate(group):
+                if not subset & (1 << index):
+                    continue
+                members += 1
+                if (value ^ entry_value) & care & entry_care:
+                    break
+                value |= entry_value & entry_care
+                care |= entry_care
+            else:
+                size = 1 << (bits - _popcount(care & space))
+                total += size if members % 2 else -size
+    return total
+
+
+def _groups(terms, mask):
+    """The distinct filters needed for `terms` under `mask`"""
+    groups = []
+    for value, _, extended in terms:
+        group = (value & mask, extended)
+        if group not in groups:
+            groups.append(group)
+    return groups
+
+
+def _buffer_config(terms, slots):
+    """The widest mask that lets `terms` share `slots` filters, and the filters themselves.
+
+    Starts from every bit all the terms care about and, while there are more distinct filter
+    values than slots, clears the bit that merges the most of them.
+    """
+    mask = _ALL_ID_BITS
+    for _, care, extended in terms:
+        mask &= care
+        if not extended:
+            # for standard frames the EID mask bits are applied to the first two data bytes
+            mask &= _SID_BITS
+    groups = _groups(terms, mask)
+    while len(groups) > slots:
+        differing = 0
+        for value, _ in groups:
+            differing |= value ^ groups[0][0]
+        best = None
+        for bit in range(_ID_BITS):
+            bit_mask = 1 << bit
+            if not mask & differing & bit_mask:
+                continue
+            candidate = _groups(terms, mask & ~bit_mask)
+            if best is None or len(candidate) < len(best[1]):
+                best = (mask & ~bit_mask, candidate)
+        if best is None:
+            # only the standard/extended split is left, which no mask can merge
+            return None
+        mask, groups = best
+    return mask, groups
+
+
+def _splits(count):
+    if count <= _EXHAUSTIVE_SPLIT_LIMIT:
+        return range(1 << count)
+    return [0] + [1 << index for index in range(count)]
+
+
+def plan_filters(matches):
+    """Work out the masks and filters that accept every frame `matches` asks for while letting
+    through as few other frames as possible.
+
+    Any number of matches is accepted. Each way of dividing them between RXB0 (2 filters) and
+    RXB1 (4 filters) is scored by the number of IDs the hardware would let through, trying every
+    division for up to six distinct matches. Matches that cannot get an exact filter share a
+    wider one, and a `SoftwareFilter` drops the extra frames.
+
+    Args:
+        matches (Sequence[Match]): The IDs to receive. Must not be empty.
+
+    Returns:
+        FilterPlan: The register values, software filter and expected acceptance ratio
+    """
+    terms = []
+    for match in matches:
+        term = _term(match)
+        if term not in terms:
+            terms.append(term)
+    # drop matches already covered by a wider one
+    terms = [
+        term
+        for term in terms
+        if not any(other is not term and _covers(other, term) for other in terms)
+    ]
+
+    best = None
+    for split in _splits(len(terms)):
+        rxb0 = [term for index, term in enumerate(terms) if split & (1 << index)]
+        rxb1 = [term for index, term in enumerate(terms) if not split & (1 << index)]
+        config0 = _buffer_config(rxb0, _FILTER_SLOTS[0]) if rxb0 else None
+        config1 = _buffer_config(rxb1, _FILTER_SLOTS[1]) if rxb1 else None
+        if (rxb0 and config0 is None) or (rxb1 and config1 is None):
+            continue
+        # an unused buffer repeats part of the other one so it lets nothing new through
+        if config0 is None:
+            config0 = (config1[0], config1[1][:1])
+        if config1 is None:
+            config1 = config0
+        entries = [(value, config[0], ext) for config in (config0, config1) for value, ext in config[1]]
+        accepted = _union_size(entries)
+        if best is None or accepted < best[0]:
+            best = (accepted, config0, config1)
+
+    accepted, config0, config1 = best
+    wanted = _union_size(terms)
+    filters = []
+    for config, slots in zip((config0, config1), _FILTER_SLOTS):
+        groups = config[1]
+        # spare filters repeat the last one rather than match ID 0
+        groups = groups + [groups[-1]] * (slots - len(groups))
+        filters.append(
+            tuple(
+                (value if extended else value >> _STD_SHIFT, extended)
+                for value, extended in groups
+            )
+        )
+
+    software_filter = None if accepted == wanted else SoftwareFilter(matches)
+    return FilterPlan(
+        (config0[0], config1[0]), tuple(filters), software_filter, wanted / accepted
+    )
+
+
+class SoftwareFilter:
+    """Accepts exactly the frames a list of `Match` objects asks for.
+
+    Exact matches are checked with a single set lookup; masked matches need one lookup per
+    distinct mask.
+    """
+
+    def __init__(self, matches):
+        self._exact = set()
+        self._masked = []
+        masked = {}
+        for match in matches:
+            extended = bool(match.extended)
+            width = _ALL_ID_BITS if extended else 0x7FF
+            mask = match.mask & width
+            if mask in (0, width):
+                self._exact.add(((match.address & width) << 1) | extended)
+            else:
+                key = (mask, extended)
+                if key not in masked:
+                    masked[key] = set()
+                    self._masked.append((mask, extended, masked[key]))
+                masked[key].add(match.address & mask)
+
+    def accepts(self, can_id, extended):
+        """True if a frame with this ID is wanted"""
+        if ((can_id << 1) | extended) in self._exact:
+            return True
+        for mask, mask_extended, values in self._masked:
+            if mask_extended == extended and (can_id & mask) in values:
+                return True
+        return False
@@ -0,0 +1,159 @@
+# SPDX-FileCopyrightText: Copyright (c) 2020 Bryan Siepert for Adafruit Industries
+#
+# SPDX-License-Identifier: MIT
+"""Cached, rate-limited bus health for `MCP2515`; see `HealthMonitor`"""
+from collections import namedtuple
+from .canio import BusState
+from .timer import Timer
+
+# EFLG bits
+EFLG_EWARN = 0x01
+EFLG_RXWAR = 0x02
+EFLG_TXWAR = 0x04
+EFLG_RXEP = 0x08
+EFLG_TXEP = 0x10
+EFLG_TXBO = 0x20
+EFLG_RX0OVR = 0x40
+EFLG_RX1OVR = 0x80
+
+# One reading of the error registers. ``state`` is a `BusState`, ``flags`` the raw EFLG byte
+# (test it with the ``EFLG_*`` masks). A comment, as CircuitPython's namedtuple types don't
+# accept a ``__doc__`` assignment.
+BusHealth = namedtuple(
+    "BusHealth", ["state", "transmit_error_count", "receive_error_count", "flags"]
+)
+
+
+def bus_state(flags):
+    """The `BusState` that an EFLG value reports"""
+    if flags & EFLG_TXBO:
+        return BusState.BUS_OFF
+    if flags & (EFLG_TXEP | EFLG_RXEP):
+        return BusState.ERROR_PASSIVE
+    if flags & EFLG_EWARN:
+        return BusState.ERROR_WARNING
+    return BusState.ERROR_ACTIVE
+
+
+class HealthMonitor:  # pylint: disable=too-many-instance-attributes
+    """Reads EFLG, TEC and REC at most once per `interval` and keeps the result, so `MCP2515.state`,
+    `MCP2515.transmit_error_count` and `MCP2515.receive_error_count` are free between reads.
+
+    Create it with `MCP2515.enable_health_monitor`. The driver polls it on every receive poll; it
+    can also be driven by `run` as an asyncio task, or by calling `poll` from a main loop.
+
+    Args:
+        can_bus (MCP2515): The controller to watch
+        interval (float): Seconds between register reads. Defaults to 0.1
+        auto_recover (bool): Restart the controller while it is bus-off, first after\
+            `recovery_backoff` seconds and then after twice as long each time it is still\
+            bus-off, up to `max_recovery_backoff`. Defaults to `False`
+        recovery_backoff (float): The first wait before restarting. Defaults to 0.1
+        max_recovery_backoff (float): The longest wait between restarts. Defaults to 5.0
+    """
+
+    def __init__(
+        self,
+        can_bus,
+        interval=0.1,
+        *,
+        auto_recover=False,
+        recovery_backoff=0.1,
+        max_recovery_backoff=5.0,
+    ):  # pylint: disable=too-many-arguments
+        self._can_bus = can_bus
+        self._interval = None
+        self._interval_ms = 0
+        self.interval = interval
+        self.auto_recover = auto_recover
+        # backoffs are kept in integer milliseconds, see `Timer.rewind_to_ms`
+        self._recovery_backoff_ms = int(recovery_backoff * 1000)
+        self._max_recovery_backoff_ms = int(max_recovery_backoff * 1000)
+        self._backoff_ms = self._recovery_backoff_ms
+        self._recovery_timer = Timer()
+        self._recovering = False
+        self._recovery_count = 0
+        self._poll_timer = Timer()
+        self._callbacks = []
+        self._health = None
+        self.poll(force=True)
+
+    @property
+    def interval(self):
+        """Seconds between register reads"""
+        return self._interval
+
+    @interval.setter
+    def interval(self, interval):
+        self._interval = interval
+        self._interval_ms = int(interval * 1000)
+
+    @property
+    def health(self):
+        """The last `BusHealth` read, without touching the bus (read-only)"""
+        return self._health
+
+    @property
+    def recovery_count(self):
+        """The number of times `auto_recover` restarted the controller (read-only)"""
+        return self._recovery_count
+
+    def on_state_change(self, callback):
+        """Call ``callback(old_state, new_state, health)`` whenever a poll finds the `BusState`
+        changed, for example ERROR_WARNING to ERROR_PASSIVE to BUS_OFF and back"""
+        self._callbacks.append(callback)
+
+    def poll(self, force=False):
+        """Read the registers if `interval` has passed since the last read (or `force` is set),
+        fire callbacks for a state change and handle bus-off recovery
+
+        Returns:
+            BusHealth: The current, possibly cached, health
+        """
+        if not force and not self._poll_timer.expired:
+            return self._health
+        self._poll_timer.rewind_to_ms(self._interval_ms)
+
+        health = self._can_bus._read_bus_health()  # pylint: disable=protected-access
+        previous = self._health
+        self._health = health
+        if previous is not None and previous.state != health.state:
+            for callback in self._callbacks:
+                callback(previous.state, health.state, health)
+
+        if health.state == BusState.BUS_OFF:
+            if self.auto_recover and self._recover():
+                # read the registers again so the result of the restart is seen straight away
+                return self.poll(force=True)
+        elif health.state == BusState.ERROR_ACTIVE:
+            self._backoff_ms = self._recovery_backoff_ms
+            self._recovering = False
+        return health
+
+    def _recover(self):
+        """Restart the controller once the backoff has passed
+
+        Returns:
+            bool: True if it was restarted
+        """
+        timer = self._recovery_timer
+        if not self._recovering:
+            # give the chip one backoff period to come back by itself first
+            self._recovering = True
+            timer.rewind_to_ms(self._backoff_ms)
+            return False
+        if not timer.expired:
+            return False
+        self._can_bus.restart()
+        self._recovery_count += 1
+        self._backoff_ms = min(self._backoff_ms * 2, self._max_recovery_backoff_ms)
+        timer.rewind_to_ms(self._backoff_ms)
+        return True
+
+    async def run(self):
+        """Poll forever, sleeping `interval` between reads. Meant for ``asyncio.create_task``."""
+        import asyncio  # pylint: disable=import-outside-toplevel
+
+        while True:
+            self.poll()
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,50 @@
+# SPDX-FileCopyrightText: Copyright (c) 2020 Bryan Siepert for Adafruit Industries
+#
+# SPDX-License-Identifier: MIT
+"""Watches the MCP2515 INT output; see `InterruptLine`"""
+
+
+class InterruptLine:
+    """The MCP2515's active-low INT output, read as a plain GPIO.
+
+    INT is level triggered: it stays low for as long as any enabled flag in CANINTF is set, so
+    reading the level tells the driver exactly when there is work without an SPI transaction.
+
+    Args:
+        pin (~microcontroller.Pin): The pin wired to INT. Anything with a boolean ``value``, such\
+            as a `digitalio.DigitalInOut` already set up as an input or a `SimulatedInterruptPin`,\
+            is used as is.
+    """
+
+    def __init__(self, pin):
+        self._owns_io = not hasattr(pin, "value")
+        if self._owns_io:
+            # pylint: disable=import-outside-toplevel
+            from digitalio import DigitalInOut, Pull
+
+            pin = DigitalInOut(pin)
+            pin.switch_to_input(pull=Pull.UP)
+        self._io = pin
+
+    @property
+    def asserted(self):
+        """True while the MCP2515 is signalling a pending event"""
+        return not self._io.value
+
+    def deinit(self):
+        """Release the pin, if this object set it up"""
+        if self._owns_io:
+            self._io.deinit()
+        self._io = None
+
+
+class SimulatedInterruptPin:
+    """Stand-in for the INT pin when running without hardware. Set `value` to False to signal an
+    interrupt and back to True once it has been handled.
+    """
+
+    def __init__(self, value=True):
+        self.value = value
+
+    def deinit(self):
+        """Matches `digitalio.DigitalInOut.deinit`"""
@@ -0,0 +1,132 @@
+# SPDX-FileCopyrightText: Copyright (c) 2020 Bryan Siepert for Adafruit Industries
+#
+# SPDX-License-Identifier: MIT
+"""Fixed-capacity receive queue; see `RingBuffer`"""
+
+
+class OverflowPolicy:
+    """What a full `RingBuffer` does with a new frame"""
+
+    DROP_OLDEST = 0
+    """Discard the oldest queued frame to make room for the new one"""
+
+    DROP_NEWEST = 1
+    """Discard the new frame and keep what is already queued"""
+
+    KEEP_LATEST = 2
+    """Keep only the newest frame for each ID. A frame whose ID is already queued replaces the\
+        queued one in place, keeping its position. When a frame with a new ID arrives and the\
+        queue is full, the oldest frame is discarded."""
+
+
+class RingBuffer:
+    """A preallocated first-in first-out queue of CAN frames.
+
+    Pushing and popping never allocate and take constant time, unlike ``list.pop(0)``.
+
+    Args:
+        capacity (int): The number of frames the queue can hold
+        policy (int): One of the `OverflowPolicy` values. Defaults to `OverflowPolicy.DROP_OLDEST`
+    """
+
+    def __init__(self, capacity, policy=OverflowPolicy.DROP_OLDEST):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        if policy not in (
+            OverflowPolicy.DROP_OLDEST,
+            OverflowPolicy.DROP_NEWEST,
+            OverflowPolicy.KEEP_LATEST,
+        ):
+            raise ValueError("Unknown overflow policy")
+        self._slots = [None] * capacity
+        self._capacity = capacity
+        self._policy = policy
+        self._head = 0
+        self._count = 0
+        # ID key => slot index, only used by KEEP_LATEST
+        self._slot_by_id = {} if policy == OverflowPolicy.KEEP_LATEST else None
+        self._dropped_count = 0
+        self._replaced_count = 0
+        self._high_water_mark = 0
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def capacity(self):
+        """The number of frames the queue can hold (read-only)"""
+        return self._capacity
+
+    @property
+    def policy(self):
+        """The `OverflowPolicy` in use (read-only)"""
+        return self._policy
+
+    @property
+    def dropped_count(self):
+        """The number of frames discarded because the queue was full (read-only)"""
+        return self._dropped_count
+
+    @property
+    def replaced_count(self):
+        """The number of queued frames overwritten by a newer frame with the same ID, with\
+            `OverflowPolicy.KEEP_LATEST` (read-only)"""
+        return self._replaced_count
+
+    @property
+    def high_water_mark(self):
+        """The most frames that have been queued at once (read-only)"""
+        return self._high_water_mark
+
+    @staticmethod
+    def _id_key(frame):
+        # fits a 29-bit ID and the extended flag in a small int
+        return (frame.id << 1) | frame.extended
+
+    def push(self, frame):
+        """Add a frame to the back of the queue, applying the overflow policy
+
+        Returns:
+            bool: False if the new frame was dropped
+        """
+        slot_by_id = self._slot_by_id
+        if slot_by_id is not None:
+            key = self._id_key(frame)
+            slot = slot_by_id.get(key)
+            if slot is not None:
+                self._slots[slot] = frame
+                self._replaced_count += 1
+                return True
+
+        if self._count == self._capacity:
+            self._dropped_count += 1
+            if self._policy == OverflowPolicy.DROP_NEWEST:
+                return False
+            self.pop()
+
+        slot = (self._head + self._count) % self._capacity
+        self._slots[slot] = frame
+        self._count += 1
+        if slot_by_id is not None:
+            slot_by_id[key] = slot
+        if self._count > self._high_water_mark:
+            self._high_water_mark = self._count
+        return True
+
+    def pop(self):
+        """Remove and return the frame at the front of the queue, or None if it is empty"""
+        if self._count == 0:
+            return None
+        head = self._head
+        frame = self._slots[head]
+        self._slots[head] = None
+        self._head = (head + 1) % self._capacity
+        self._count -= 1
+        if self._slot_by_id is not None:
+            self._slot_by_id.pop(self._id_key(frame), None)
+        return frame
+
+    def clear(self):
+        """Discard every queued frame. The counters are kept."""
+        while self._count:
+            self.pop()
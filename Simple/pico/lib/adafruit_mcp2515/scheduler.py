@@ -0,0 +1,149 @@
+# SPDX-FileCopyrightText: Copyright (c) 2020 Bryan Siepert for Adafruit Industries
+#
+# SPDX-License-Identifier: MIT
+"""Several MCP2515 controllers on one SPI bus; see `SPIScheduler`"""
+
+
+class _SharedDevice:
+    """Takes the place of `adafruit_bus_device.spi_device.SPIDevice` for a controller attached to
+    an `SPIScheduler`. Inside a batch the bus is already locked and configured, so a transaction
+    only drives chip select."""
+
+    def __init__(self, scheduler, chip_select):
+        self._scheduler = scheduler
+        self.chip_select = chip_select
+        chip_select.switch_to_output(value=True)
+
+    def __enter__(self):
+        self._scheduler._acquire()  # pylint: disable=protected-access
+        self.chip_select.value = False
+        return self._scheduler.spi
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.chip_select.value = True
+        self._scheduler._release()  # pylint: disable=protected-access
+        return False
+
+
+class SPIScheduler:  # pylint: disable=too-many-instance-attributes
+    """Serves several `MCP2515` controllers that share one SPI bus, each with its own chip select.
+
+    Pass the scheduler to `MCP2515` in place of the `busio.SPI` object. Controllers created that
+    way still work on their own, but most of their work is meant to happen in `poll`, which takes
+    the bus lock and configures the bus once and, while holding it:
+
+    1. drains the receive buffers of every controller into its software queue, at most
+       `rx_burst` frames each, starting with the next controller in turn each time so a busy bus
+       cannot starve a quiet one
+    2. loads messages waiting in each controller's software transmit queue into free transmit
+       buffers
+
+    `MCP2515.send`, `MCP2515.send_latest` and `MCP2515.send_many` on an attached controller only
+    queue messages, so transmitting never holds off receive draining. Call `poll` from the main
+    loop (or run `run` as an asyncio task) at least as often as frames arrive, and read with
+    `MCP2515.read_messages` as usual.
+
+    Args:
+        spi (~busio.SPI): The bus every controller is wired to
+        baudrate (int): The SPI clock. Defaults to 100000, like `SPIDevice`
+        polarity (int): The SPI clock polarity. Defaults to 0
+        phase (int): The SPI clock phase. Defaults to 0
+        rx_burst (int): The most frames taken from one controller per `poll`. Defaults to 4
+    """
+
+    def __init__(self, spi, *, baudrate=100000, polarity=0, phase=0, rx_burst=4):
+        # pylint: disable=too-many-arguments
+        self.spi = spi
+        self._baudrate = baudrate
+        self._polarity = polarity
+        self._phase = phase
+        self.rx_burst = rx_burst
+        self._controllers = []
+        self._next = 0
+        self._depth = 0
+        self._lock_count = 0
+
+    def device(self, chip_select):
+        """The SPI device for the controller on `chip_select`, used by `MCP2515` itself"""
+        return _SharedDevice(self, chip_select)
+
+    def attach(self, can_bus):
+        """Include a controller in `poll`; `MCP2515` does this when created with the scheduler"""
+        self._controllers.append(can_bus)
+
+    def detach(self, can_bus):
+        """Leave a controller out of `poll` from now on"""
+        self._controllers.remove(can_bus)
+        self._next = 0
+
+    @property
+    def controllers(self):
+        """The attached controllers, as a tuple (read-only)"""
+        return tuple(self._controllers)
+
+    @property
+    def lock_count(self):
+        """The number of times the bus lock was taken (read-only)"""
+        return self._lock_count
+
+    def _acquire(self):
+        if not self._depth:
+            while not self.spi.try_lock():
+                pass
+            self.spi.configure(
+                baudrate=self._baudrate, polarity=self._polarity, phase=self._phase
+            )
+            self._lock_count += 1
+        self._depth += 1
+
+    def _release(self):
+        self._depth -= 1
+        if not self._depth:
+            self.spi.unlock()
+
+    def __enter__(self):
+        """Hold the bus for a batch of transactions on any of the controllers"""
+        self._acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._release()
+        return False
+
+    def poll(self):
+        """Drain every controller's receive buffers, then service their transmit queues, under
+        one bus lock
+
+        Returns:
+            int: The number of frames moved into software receive queues
+        """
+        # pylint: disable=protected-access
+        controllers = self._controllers
+        count = len(controllers)
+        if not count:
+            return 0
+        first = self._next % count
+        self._next = first + 1
+        received = 0
+        self._acquire()
+        try:
+            for offset in range(count):
+                can_bus = controllers[(first + offset) % count]
+                can_bus._read_from_rx_buffers(self.rx_burst, service_tx=False)
+                received += can_bus.last_drain_count
+            for offset in range(count):
+                can_bus = controllers[(first + offset) % count]
+                if can_bus._tx_queue:
+                    can_bus._service_tx_queue(can_bus._read_status())
+        finally:
+            self._release()
+        return received
+
+    async def run(self, interval=0.0):
+        """Poll forever, sleeping `interval` seconds between polls. Meant for
+        ``asyncio.create_task``."""
+        import asyncio  # pylint: disable=import-outside-toplevel
+
+        while True:
+            self.poll()
+            await asyncio.sleep(interval)
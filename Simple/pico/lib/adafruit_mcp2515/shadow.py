@@ -0,0 +1,155 @@
+# SPDX-FileCopyrightText: Copyright (c) 2020 Bryan Siepert for Adafruit Industries
+#
+# SPDX-License-Identifier: MIT
+"""Write-through cache of the MCP2515 configuration registers; see `ShadowRegisters`"""
+
+_MODE_CONFIG = 0x80
+_REGISTER_COUNT = 0x80
+
+# address -> the bits that read back what was written. Bits the controller sets itself (RXBnCTRL
+# FILHIT and RXRTR, for instance) and unimplemented bits are left out, so they never make a cached
+# value look stale. Addresses not listed are not cached.
+_WRITABLE_BITS = bytearray(_REGISTER_COUNT)
+# RXF0-RXF2 at 0x00-0x0B and RXF3-RXF5 at 0x10-0x1B: SIDH, SIDL, EID8, EID0 each
+for _base in (0x00, 0x04, 0x08, 0x10, 0x14, 0x18):
+    _WRITABLE_BITS[_base] = 0xFF
+    _WRITABLE_BITS[_base + 1] = 0xEB
+    _WRITABLE_BITS[_base + 2] = 0xFF
+    _WRITABLE_BITS[_base + 3] = 0xFF
+# RXM0 and RXM1 at 0x20-0x27
+for _base in (0x20, 0x24):
+    _WRITABLE_BITS[_base] = 0xFF
+    _WRITABLE_BITS[_base + 1] = 0xE3
+    _WRITABLE_BITS[_base + 2] = 0xFF
+    _WRITABLE_BITS[_base + 3] = 0xFF
+_WRITABLE_BITS[0x0F] = 0xFF  # CANCTRL
+_WRITABLE_BITS[0x28] = 0xC7  # CNF3
+_WRITABLE_BITS[0x29] = 0xFF  # CNF2
+_WRITABLE_BITS[0x2A] = 0xFF  # CNF1
+_WRITABLE_BITS[0x60] = 0x64  # RXB0CTRL: RXM and BUKT
+_WRITABLE_BITS[0x70] = 0x60  # RXB1CTRL: RXM
+
+# what a RESET leaves in the cached registers; the masks and filters are undefined
+_RESET_VALUES = ((0x0F, 0x87), (0x28, 0x00), (0x29, 0x00), (0x2A, 0x00), (0x60, 0x00), (0x70, 0x00))
+
+# (first address, count) of the sequential reads that cover every cached register, CANSTAT
+# (0x0E) included
+READ_BLOCKS = ((0x00, 16), (0x10, 12), (0x20, 11), (0x60, 1), (0x70, 1))
+# the same without the masks and filters, which read as 0 outside configuration mode
+RUNNING_READ_BLOCKS = ((0x0C, 4), (0x28, 3), (0x60, 1), (0x70, 1))
+
+
+class ShadowRegisters:
+    """What the driver last wrote to the configuration registers (CNF1-3, RXBnCTRL, CANCTRL and
+    the masks and filters) and the operating mode it last confirmed.
+
+    `MCP2515` keeps one while `MCP2515.enable_shadow_registers` is on, updating it on every write,
+    and uses it to skip writes that would not change anything and the CANSTAT reads and mode
+    changes around them. Values are only trusted once written or known from a RESET, so a new
+    cache starts out knowing nothing.
+    """
+
+    def __init__(self):
+        self._values = bytearray(_REGISTER_COUNT)
+        self._known = bytearray(_REGISTER_COUNT)
+        self.mode = None
+        """The operating mode last confirmed through CANSTAT, or None if unknown"""
+        self.skipped_writes = 0
+        """Register writes left out because the cache showed them already done"""
+        self.skipped_mode_changes = 0
+        """CANSTAT reads left out because the cache showed the mode already set"""
+
+    @staticmethod
+    def cached(address):
+        """True if `address` is one of the registers kept"""
+        return address < _REGISTER_COUNT and _WRITABLE_BITS[address] != 0
+
+    def get(self, address):
+        """The cached value of a register, or None if it is not known"""
+        if address < _REGISTER_COUNT and self._known[address]:
+            return self._values[address]
+        return None
+
+    def matches(self, address, value):
+        """True if the register is known to hold `value` already"""
+        if address >= _REGISTER_COUNT or not self._known[address]:
+            return False
+        return (value & _WRITABLE_BITS[address]) == self._values[address]
+
+    def matches_block(self, start_address, values, start=0, end=None):
+        """True if ``values[start:end]`` are known to be in consecutive registers from
+        `start_address`"""
+        if end is None:
+            end = len(values)
+        for idx in range(start, end):
+            if not self.matches(start_address + idx - start, values[idx]):
+                return False
+        return True
+
+    def store(self, address, value):
+        """Record a value written to a register; ignored for registers that are not kept"""
+        if address < _REGISTER_COUNT:
+            writable = _WRITABLE_BITS[address]
+            if writable:
+                self._values[address] = value & writable
+                self._known[address] = 1
+
+    def store_block(self, start_address, values, start=0, end=None):
+        """Record ``values[start:end]`` written to consecutive registers from `start_address`"""
+        if end is None:
+            end = len(values)
+        for idx in range(start, end):
+            self.store(start_address + idx - start, values[idx])
+
+    def modify(self, address, mask, value):
+        """Record a BIT MODIFY. A register that was not known stays unknown."""
+        if address < _REGISTER_COUNT and self._known[address]:
+            self.store(address, (self._values[address] & ~mask) | (value & mask))
+
+    def reset(self):
+        """Forget everything, then record the values a RESET leaves behind"""
+        self.invalidate()
+        for address, value in _RESET_VALUES:
+            self.store(address, value)
+        self.mode = _MODE_CONFIG
+
+    def invalidate(self, address=None):
+        """Forget one register, or everything (the mode too) if `address` is None"""
+        if address is not None:
+            if address < _REGISTER_COUNT:
+                self._known[address] = 0
+            return
+        for idx in range(_REGISTER_COUNT):
+            self._known[idx] = 0
+        self.mode = None
+
+    def compare(self, start_address, actual, count):
+        """Compare registers read back from the controller with the cache, forgetting any that
+        differ so the next write to them goes through
+
+        Args:
+            start_address (int): The address ``actual[0]`` was read from
+            actual (bytearray): The values read
+            count (int): How many of them to check
+
+        Returns:
+            list: ``(address, cached, actual)`` for every known register that differs
+        """
+        mismatches = []
+        for idx in range(count):
+            address = start_address + idx
+            if not self._known[address]:
+                continue
+            value = actual[idx] & _WRITABLE_BITS[address]
+            if value != self._values[address]:
+                mismatches.append((address, self._values[address], value))
+                self._known[address] = 0
+        return mismatches
+
+    def __repr__(self):
+        return "ShadowRegisters(known=%d, mode=%r, skipped_writes=%d, skipped_mode_changes=%d)" % (
+            sum(self._known),
+            self.mode,
+            self.skipped_writes,
+            self.skipped_mode_changes,
+        )
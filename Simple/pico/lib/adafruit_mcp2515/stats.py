@@ -0,0 +1,322 @@
+# SPDX-FileCopyrightText: Copyright (c) 2020 Bryan Siepert for Adafruit Industries
+#
+# SPDX-License-Identifier: MIT
+"""Optional driver instrumentation; see `DriverStats`"""
+
+# The driver only calls _now_us while stats are on: it is not a wrapping tick counter, and on
+# CircuitPython ``monotonic_ns()`` is a long int, so every call allocates
+try:
+    from time import monotonic_ns
+
+    def _now_us():
+        """Microseconds from an arbitrary starting point, the unit latencies are kept in"""
+        return monotonic_ns() // 1000
+
+except ImportError:
+    from time import monotonic
+
+    def _now_us():
+        """Microseconds from an arbitrary starting point, the unit latencies are kept in"""
+        return int(monotonic() * 1000000)
+
+
+# SPI operations, named after the instruction that starts the transaction
+OPERATIONS = (
+    "reset",
+    "read",
+    "write",
+    "bit_modify",
+    "read_status",
+    "rx_status",
+    "read_rx",
+    "load_tx",
+    "rts",
+    "other",
+)
+_RESET, _READ, _WRITE, _BIT_MODIFY, _READ_STATUS, _RX_STATUS, _READ_RX, _LOAD_TX, _RTS, _OTHER = (
+    range(len(OPERATIONS))
+)
+
+
+def _operation_index(instruction):
+    if instruction == 0xC0:
+        return _RESET
+    if instruction == 0x03:
+        return _READ
+    if instruction == 0x02:
+        return _WRITE
+    if instruction == 0x05:
+        return _BIT_MODIFY
+    if instruction == 0xA0:
+        return _READ_STATUS
+    if instruction == 0xB0:
+        return _RX_STATUS
+    if instruction & 0xF9 == 0x90:
+        return _READ_RX
+    if instruction & 0xF8 == 0x40:
+        return _LOAD_TX
+    if instruction & 0xF8 == 0x80:
+        return _RTS
+    return _OTHER
+
+
+# one entry per possible instruction byte, so classifying a transaction is a single index
+_OPERATION_BY_INSTRUCTION = bytes(_operation_index(instruction) for instruction in range(256))
+
+
+class LatencyStats:
+    """Minimum, mean and maximum of a series of durations, in microsecond ticks"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def record(self, ticks):
+        """Add one duration"""
+        self.count += 1
+        self.total += ticks
+        if self.min is None or ticks < self.min:
+            self.min = ticks
+        if self.max is None or ticks > self.max:
+            self.max = ticks
+
+    @property
+    def mean(self):
+        """The average duration, or None if nothing was recorded"""
+        if not self.count:
+            return None
+        return self.total / self.count
+
+    def reset(self):
+        """Forget every recorded duration"""
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def __repr__(self):
+        return "LatencyStats(count=%d, min=%r, mean=%r, max=%r)" % (
+            self.count,
+            self.min,
+            self.mean,
+            self.max,
+        )
+
+
+class Histogram:
+    """Counts of non-negative integers in power-of-two buckets: bucket 0 holds 0, bucket 1 holds
+    1, bucket 2 holds 2-3, bucket 3 holds 4-7 and so on, with everything too large for the last
+    bucket counted there. Recording is a few integer compares, and allocates nothing while the
+    values and `total` stay within the small-int range.
+
+    Args:
+        bucket_count (int): The number of buckets. Defaults to 12 (up to 1024 and above)
+    """
+
+    def __init__(self, bucket_count=12):
+        self._counts = [0] * bucket_count
+        self.count = 0
+        self.total = 0
+        self.max = None
+
+    def record(self, value):
+        """Add one value"""
+        if value < 0:
+            value = 0
+        index = 0
+        limit = 1
+        last = len(self._counts) - 1
+        while value >= limit and index < last:
+            index += 1
+            limit <<= 1
+        self._counts[index] += 1
+        self.count += 1
+        self.total += value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    @property
+    def buckets(self):
+        """``(low, high, count)`` for every bucket, where a value v lands in the bucket with\
+            ``low <= v <= high``. The last bucket's ``high`` is None."""
+        result = []
+        low = 0
+        for index, count in enumerate(self._counts):
+            high = (1 << index) - 1 if index else 0
+            if index == len(self._counts) - 1:
+                high = None
+            result.append((low, high, count))
+            low = 1 << index
+        return result
+
+    @property
+    def mean(self):
+        """The average value, or None if nothing was recorded"""
+        if not self.count:
+            return None
+        return self.total / self.count
+
+    def percentile(self, percent):
+        """The upper bound of the bucket holding the `percent` percentile, or None if nothing was
+        recorded. Falls back to `max` for the open-ended last bucket."""
+        if not self.count:
+            return None
+        wanted = self.count * percent / 100
+        seen = 0
+        for _, high, count in self.buckets:
+            seen += count
+            if seen >= wanted and count:
+                return self.max if high is None else min(high, self.max)
+        return self.max
+
+    def reset(self):
+        """Forget every recorded value"""
+        for index in range(len(self._counts)):
+            self._counts[index] = 0
+        self.count = 0
+        self.total = 0
+        self.max = None
+
+    def __repr__(self):
+        return "Histogram(count=%d, mean=%r, max=%r, buckets=%r)" % (
+            self.count,
+            self.mean,
+            self.max,
+            [bucket for bucket in self.buckets if bucket[2]],
+        )
+
+
+class DriverStats:  # pylint: disable=too-many-instance-attributes
+    """Counters for what an `MCP2515` has done since it was enabled or last `reset`.
+
+    Only exists while instrumentation is on (see `MCP2515.enable_stats`); with it off the driver
+    skips all of this bookkeeping.
+    """
+
+    def __init__(self):
+        self._spi_transactions = [0] * len(OPERATIONS)
+        self._spi_bytes = [0] * len(OPERATIONS)
+        self.messages_sent = 0
+        """Frames loaded into a transmit buffer"""
+        self.messages_received = 0
+        """Frames read out of a receive buffer and kept"""
+        self.tx_busy_retries = 0
+        """Status polls spent waiting because every transmit buffer was busy"""
+        self.rx0_overflows = 0
+        """Frames lost because RXB0 was full"""
+        self.rx1_overflows = 0
+        """Frames lost because RXB1 was full"""
+        self.send_latency = LatencyStats()
+        """Time spent in `MCP2515.send` and friends"""
+        self.receive_latency = LatencyStats()
+        """Time spent in receive calls that returned a frame"""
+        self.rx_residency = Histogram()
+        """Milliseconds each received frame spent between leaving the chip and being handed to\
+        the application, from its ``timestamp``"""
+
+    @property
+    def spi_transactions(self):
+        """SPI transactions (chip select cycles) by operation, as a dict"""
+        return dict(zip(OPERATIONS, self._spi_transactions))
+
+    @property
+    def spi_bytes(self):
+        """Bytes clocked over SPI, in both directions, by operation, as a dict"""
+        return dict(zip(OPERATIONS, self._spi_bytes))
+
+    @property
+    def total_spi_transactions(self):
+        """SPI transactions of every kind"""
+        return sum(self._spi_transactions)
+
+    @property
+    def total_spi_bytes(self):
+        """Bytes clocked over SPI for every kind of transaction"""
+        return sum(self._spi_bytes)
+
+    @property
+    def rx_overflows(self):
+        """Frames lost to full receive buffers"""
+        return self.rx0_overflows + self.rx1_overflows
+
+    def record_overflow_flags(self, rx0_overflow, rx1_overflow):
+        """Count the RX0OVR/RX1OVR flags read from EFLG"""
+        if rx0_overflow:
+            self.rx0_overflows += 1
+        if rx1_overflow:
+            self.rx1_overflows += 1
+
+    def reset(self):
+        """Zero every counter"""
+        for index in range(len(OPERATIONS)):
+            self._spi_transactions[index] = 0
+            self._spi_bytes[index] = 0
+        self.messages_sent = 0
+        self.messages_received = 0
+        self.tx_busy_retries = 0
+        self.rx0_overflows = 0
+        self.rx1_overflows = 0
+        self.send_latency.reset()
+        self.receive_latency.reset()
+        self.rx_residency.reset()
+
+
+class _CountingSPI:
+    """Passes calls through to the real SPI object, adding up transactions and bytes"""
+
+    def __init__(self, stats):
+        self._stats = stats
+        self._spi = None
+        self._operation = None
+
+    def _count(self, first_byte, count):
+        if self._operation is None:
+            self._operation = _OPERATION_BY_INSTRUCTION[first_byte]
+            self._stats._spi_transactions[self._operation] += 1  # pylint: disable=protected-access
+        self._stats._spi_bytes[self._operation] += count  # pylint: disable=protected-access
+
+    def write(self, buffer, *, start=0, end=None):
+        """Counts, then calls `busio.SPI.write`"""
+        end = len(buffer) if end is None else end
+        self._count(buffer[start], end - start)
+        self._spi.write(buffer, start=start, end=end)
+
+    def readinto(self, buffer, *, start=0, end=None, write_value=0):
+        """Counts, then calls `busio.SPI.readinto`"""
+        end = len(buffer) if end is None else end
+        self._count(write_value, end - start)
+        self._spi.readinto(buffer, start=start, end=end, write_value=write_value)
+
+    def write_readinto(
+        self, buffer_out, buffer_in, *, out_start=0, out_end=None, in_start=0, in_end=None
+    ):  # pylint: disable=too-many-arguments
+        """Counts, then calls `busio.SPI.write_readinto`"""
+        out_end = len(buffer_out) if out_end is None else out_end
+        self._count(buffer_out[out_start], out_end - out_start)
+        self._spi.write_readinto(
+            buffer_out,
+            buffer_in,
+            out_start=out_start,
+            out_end=out_end,
+            in_start=in_start,
+            in_end=in_end,
+        )
+
+
+class CountingSPIDevice:
+    """Wraps an `adafruit_bus_device.spi_device.SPIDevice` so every transaction made through it is
+    counted in a `DriverStats`, by the instruction it starts with"""
+
+    def __init__(self, device, stats):
+        self.device = device
+        self._spi = _CountingSPI(stats)
+
+    def __enter__(self):
+        self._spi._spi = self.device.__enter__()  # pylint: disable=protected-access
+        self._spi._operation = None  # pylint: disable=protected-access
+        return self._spi
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return self.device.__exit__(exc_type, exc_value, traceback)
@@ -2,15 +2,20 @@
 #
 # SPDX-License-Identifier: MIT
 """Provides a simple timer class; see `Timer`"""
-from time import monotonic
+from adafruit_ticks import ticks_ms, ticks_add, ticks_diff
 
 
 class Timer:
-    """A reusable class to track timeouts, like an egg timer"""
+    """A reusable class to track timeouts, like an egg timer
+
+    The deadline is kept as an `adafruit_ticks.ticks_ms` value, so rewinding with
+    `rewind_to_ms` and checking `expired` only do small-int arithmetic: nothing is allocated
+    and the resolution stays at one millisecond however long the board has been running.
+    Timeouts must be shorter than the ticks half period (about three days).
+    """
 
     def __init__(self, timeout=0.0):
-        self._timeout = None
-        self._start_time = None
+        self._deadline = ticks_ms()
         if timeout:
             self.rewind_to(timeout)
 
@@ -21,9 +26,18 @@ class Timer:
         Returns:
             bool: True if more than `timeout` seconds has past since it was set
         """
-        return (monotonic() - self._start_time) > self._timeout
+        return ticks_diff(ticks_ms(), self._deadline) > 0
+
+    @property
+    def remaining_ms(self):
+        """Milliseconds left before the timer expires, 0 once it has"""
+        remaining = ticks_diff(self._deadline, ticks_ms())
+        return remaining if remaining > 0 else 0
 
     def rewind_to(self, new_timeout):
-        """Re-wind the timer to a new timeout and start ticking"""
-        self._timeout = float(new_timeout)
-        self._start_time = monotonic()
+        """Re-wind the timer to a new timeout, in seconds, and start ticking"""
+        self.rewind_to_ms(int(new_timeout * 1000))
+
+    def rewind_to_ms(self, timeout_ms):
+        """Re-wind the timer to a new timeout, in integer milliseconds, and start ticking"""
+        self._deadline = ticks_add(ticks_ms(), timeout_ms)
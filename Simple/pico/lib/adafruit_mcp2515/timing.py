@@ -0,0 +1,132 @@
+# SPDX-FileCopyrightText: Copyright (c) 2020 Bryan Siepert for Adafruit Industries
+#
+# SPDX-License-Identifier: MIT
+"""MCP2515 bit timing: works out CNF1/CNF2/CNF3 for any crystal and bitrate; see `solve`"""
+
+# A bit is 1 sync TQ + PRSEG + PHSEG1 + PHSEG2. The datasheet asks for 8 to 25 TQ; shorter bits
+# work but are only used when a bitrate can't be reached otherwise
+_MIN_TQ_PER_BIT = 5
+_NOMINAL_MIN_TQ_PER_BIT = 8
+_MAX_TQ_PER_BIT = 25
+_MAX_BRP = 64
+_MAX_SEGMENT = 8
+_MIN_PHSEG2 = 2  # information processing time
+
+_CNF2_BTLMODE = 0x80  # PHSEG2 comes from CNF3
+_CNF2_SAM = 0x40  # sample three times
+
+DEFAULT_SAMPLE_POINT = 75.0
+"""Sample point, in percent of the bit time, used when none is given"""
+
+_solutions = {}
+
+
+def _split(tq_per_bit, sample_point):
+    """(PRSEG, PHSEG1, PHSEG2) for a bit of `tq_per_bit` TQ, closest to `sample_point` percent"""
+    best = None
+    for phseg2 in range(_MIN_PHSEG2, _MAX_SEGMENT + 1):
+        before_sample = tq_per_bit - 1 - phseg2  # PRSEG + PHSEG1
+        # PRSEG + PHSEG1 must be at least PHSEG2, and each of them fit in 1..8
+        if before_sample < phseg2 or before_sample < 2 or before_sample > 2 * _MAX_SEGMENT:
+            continue
+        error = abs(100 * (tq_per_bit - phseg2) / tq_per_bit - sample_point)
+        if best is None or error < best[0]:
+            # give PHSEG1 as much as PHSEG2 so resynchronisation works both ways, the rest to PRSEG
+            phseg1 = min(before_sample - 1, max(phseg2, before_sample - _MAX_SEGMENT))
+            best = (error, before_sample - phseg1, phseg1, phseg2)
+    return best
+
+
+def solve(crystal_freq, bitrate, sample_point=DEFAULT_SAMPLE_POINT):
+    """Find the register values for `bitrate` on an MCP2515 clocked by `crystal_freq`.
+
+    Tries every prescaler and bit length, like ``can_timing_calc.py``, and picks the closest
+    bitrate, then a bit of at least 8 TQ, then the closest sample point, then the most TQ per
+    bit. Results are memoized per (crystal_freq, bitrate, sample_point).
+
+    Args:
+        crystal_freq (int): The MCP2515 oscillator frequency in Hz
+        bitrate (int): The bus bit rate in bits per second
+        sample_point (float): Where in the bit to sample, in percent. Defaults to 75.
+
+    Returns:
+        tuple: (CNF1, CNF2, CNF3)
+
+    Raises:
+        ValueError: If no valid timing exists
+    """
+    key = (crystal_freq, bitrate, sample_point)
+    cnf = _solutions.get(key)
+    if cnf is not None:
+        return cnf
+
+    best = None
+    for brp in range(1, _MAX_BRP + 1):
+        for tq_per_bit in range(_MIN_TQ_PER_BIT, _MAX_TQ_PER_BIT + 1):
+            bitrate_error = abs(crystal_freq / (2 * brp * tq_per_bit) - bitrate)
+            if best is not None and bitrate_error > best[0]:
+                continue
+            split = _split(tq_per_bit, sample_point)
+            if split is None:
+                continue
+            sample_point_error, prseg, phseg1, phseg2 = split
+            score = (
+                bitrate_error,
+                tq_per_bit < _NOMINAL_MIN_TQ_PER_BIT,
+                sample_point_error,
+                -tq_per_bit,
+            )
+            if best is None or score < best[:4]:
+                best = score + (brp, prseg, phseg1, phseg2)
+
+    if best is None:
+        raise ValueError("No bit timing for %d bps with a %d Hz crystal" % (bitrate, crystal_freq))
+    brp, prseg, phseg1, phseg2 = best[4:]
+    # SJW of 1 TQ
+    cnf = (
+        brp - 1,
+        _CNF2_BTLMODE | ((phseg1 - 1) << 3) | (prseg - 1),
+        phseg2 - 1,
+    )
+    _solutions[key] = cnf
+    return cnf
+
+
+def decode(crystal_freq, cnf1, cnf2, cnf3):
+    """The bitrate and sample point (in percent) that register values produce
+
+    Returns:
+        tuple: (bitrate, sample_point)
+    """
+    brp = (cnf1 & 0x3F) + 1
+    prseg = (cnf2 & 0x07) + 1
+    phseg1 = ((cnf2 >> 3) & 0x07) + 1
+    if cnf2 & _CNF2_BTLMODE:
+        phseg2 = (cnf3 & 0x07) + 1
+    else:
+        phseg2 = max(phseg1, _MIN_PHSEG2)
+    tq_per_bit = 1 + prseg + phseg1 + phseg2
+    bitrate = crystal_freq / (2 * brp * tq_per_bit)
+    return bitrate, 100 * (tq_per_bit - phseg2) / tq_per_bit
+
+
+def check_table(table, tolerance=0.01):
+    """Compare a ``{crystal: {bitrate: (CNF1, CNF2, CNF3)}}`` table with the solver.
+
+    An entry is reported if the bitrate it produces is further from its key than `tolerance`
+    (relative) allows while the solver gets closer.
+
+    Returns:
+        list: ``(crystal, bitrate, actual_bitrate, solver_cnf)`` for every bad entry
+    """
+    bad = []
+    for crystal_freq, rates in table.items():
+        for bitrate, cnf in rates.items():
+            actual, _ = decode(crystal_freq, *cnf)
+            if abs(actual - bitrate) <= tolerance * bitrate:
+                continue
+            solved = solve(crystal_freq, bitrate)
+            solved_rate, _ = decode(crystal_freq, *solved)
+            if abs(solved_rate - bitrate) < abs(actual - bitrate):
+                bad.append((crystal_freq, bitrate, actual, solved))
+    return bad
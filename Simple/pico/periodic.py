@@ -0,0 +1,199 @@
+"""Runs functions at fixed periods on deadlines rather than sleeps; see `PeriodicScheduler`"""
+import time
+from adafruit_ticks import ticks_ms, ticks_add, ticks_diff
+from histogram import Histogram
+
+CATCH_UP = 0
+"""After missed deadlines, run once per missed period, back to back, until caught up"""
+SKIP = 1
+"""After missed deadlines, run once and continue at the next period boundary"""
+
+# CATCH_UP gives up on periods missed beyond this many, so a long stall is not followed by a
+# long burst
+MAX_CATCH_UP = 10
+
+
+# the profiling clock: monotonic_ns() is a long int on CircuitPython, so every reading allocates
+if hasattr(time, "monotonic_ns"):
+
+    def _now_us():
+        return time.monotonic_ns() // 1000
+
+else:
+
+    def _now_us():
+        return int(time.monotonic() * 1000000)
+
+
+class PeriodicTask:  # pylint: disable=too-many-instance-attributes
+    """One function run every `period_ms`, with its timing statistics. Created by
+    `PeriodicScheduler.add`.
+
+    How late each run starts is always measured, with `adafruit_ticks.ticks_ms` so it costs only
+    small-int arithmetic. How long the callback takes is only measured when the scheduler was
+    created with ``profile=True``, as a sub-millisecond clock means long ints on the board.
+    """
+
+    def __init__(self, callback, period_ms, policy, name, first_deadline, profile=False):
+        # pylint: disable=too-many-arguments
+        self.callback = callback
+        self.period_ms = period_ms
+        self.policy = policy
+        self.name = name
+        self._deadline = first_deadline
+        self.runs = 0
+        """Times the callback ran"""
+        self.missed = 0
+        """Deadlines dropped by `SKIP` (or by `CATCH_UP` beyond `MAX_CATCH_UP`)"""
+        self.lateness_ms = Histogram()
+        """Milliseconds each run started after its deadline: the task's jitter"""
+        self.execution_us = Histogram(16) if profile else None
+        """Microseconds each run of the callback took, or None when not profiling"""
+
+    @property
+    def deadline(self):
+        """The `adafruit_ticks.ticks_ms` value the next run is due at (read-only)"""
+        return self._deadline
+
+    def _run(self, now):
+        """Run the callback once, after dropping whatever deadlines the policy gives up on
+
+        Returns:
+            int: The number of deadlines dropped this time
+        """
+        period = self.period_ms
+        late = ticks_diff(now, self._deadline)
+        behind = 0
+        if late >= period:
+            behind = late // period
+            if self.policy == CATCH_UP:
+                behind = max(0, behind - MAX_CATCH_UP)
+            if behind:
+                self.missed += behind
+                self._deadline = ticks_add(self._deadline, behind * period)
+
+        self.lateness_ms.record(ticks_diff(ticks_ms(), self._deadline))
+        execution_us = self.execution_us
+        if execution_us is None:
+            self.callback()
+        else:
+            start = _now_us()
+            self.callback()
+            execution_us.record(_now_us() - start)
+        self.runs += 1
+        self._deadline = ticks_add(self._deadline, period)
+        return behind
+
+    def reset_stats(self):
+        """Zero the counters and histograms"""
+        self.runs = 0
+        self.missed = 0
+        self.lateness_ms.reset()
+        if self.execution_us is not None:
+            self.execution_us.reset()
+
+    def report(self):
+        """A one-line summary, for the serial console"""
+        line = "%s: %d runs, %d missed, late p50/p99/max %s/%s/%s ms" % (
+            self.name,
+            self.runs,
+            self.missed,
+            self.lateness_ms.percentile(50),
+            self.lateness_ms.percentile(99),
+            self.lateness_ms.max,
+        )
+        if self.execution_us is not None:
+            line += ", exec p50/p99/max %s/%s/%s us" % (
+                self.execution_us.percentile(50),
+                self.execution_us.percentile(99),
+                self.execution_us.max,
+            )
+        return line
+
+
+class PeriodicScheduler:
+    """Runs functions at exact periods from one loop.
+
+    Every task has a deadline kept in `adafruit_ticks.ticks_ms`. Each deadline moves forward by
+    exactly one period per run, so the time the work takes never adds up into drift the way a
+    fixed ``sleep`` after the work does. When a task falls more than a period behind, its
+    `policy` decides whether the missed runs are made up (`CATCH_UP`) or dropped (`SKIP`).
+
+    Tasks due at the same time run in the order they were added.
+
+    Args:
+        on_missed (callable, optional): Called as ``on_missed(index, count)`` whenever the task\
+            added `index`-th (from 0) drops `count` deadlines, to log it
+        profile (bool): Also measure how long each callback takes, in microseconds. This\
+            allocates on every run, so leave it off in production. Defaults to `False`
+    """
+
+    def __init__(self, on_missed=None, *, profile=False):
+        self._tasks = []
+        self._on_missed = on_missed
+        self._profile = profile
+
+    @property
+    def tasks(self):
+        """The tasks, in the order they were added, as a tuple (read-only)"""
+        return tuple(self._tasks)
+
+    def add(self, callback, period_ms, *, policy=SKIP, name=None, phase_ms=0):
+        """Run ``callback()`` every `period_ms` milliseconds
+
+        Args:
+            callback (callable): The function to run, with no arguments
+            period_ms (int): The period
+            policy (int): `SKIP` or `CATCH_UP`. Defaults to `SKIP`
+            name (str, optional): Shown in `report`. Defaults to the callback's name
+            phase_ms (int): Delay before the first run, to spread tasks with equal periods.\
+                Defaults to 0
+
+        Returns:
+            PeriodicTask: The new task
+        """
+        if name is None:
+            name = getattr(callback, "__name__", "task")
+        task = PeriodicTask(
+            callback, period_ms, policy, name, ticks_add(ticks_ms(), phase_ms), self._profile
+        )
+        self._tasks.append(task)
+        return task
+
+    def poll(self):
+        """Run every task that is due
+
+        Returns:
+            int: Milliseconds until the next deadline, 0 if a task is already due again
+        """
+        now = ticks_ms()
+        tasks = self._tasks
+        for index in range(len(tasks)):
+            task = tasks[index]
+            if ticks_diff(now, task.deadline) >= 0:
+                missed = task._run(now)  # pylint: disable=protected-access
+                if missed and self._on_missed is not None:
+                    self._on_missed(index, missed)
+                now = ticks_ms()
+        wait = None
+        for task in self._tasks:
+            remaining = ticks_diff(task.deadline, now)
+            if wait is None or remaining < wait:
+                wait = remaining
+        return max(0, wait) if wait is not None else 0
+
+    def run(self):
+        """`poll` forever, sleeping until the next deadline in between"""
+        while True:
+            wait = self.poll()
+            if wait:
+                time.sleep(wait / 1000)
+
+    def reset_stats(self):
+        """Zero every task's counters and histograms"""
+        for task in self._tasks:
+            task.reset_stats()
+
+    def report(self):
+        """One line per task, for the serial console"""
+        return "\n".join(task.report() for task in self._tasks)
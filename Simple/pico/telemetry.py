@@ -0,0 +1,187 @@
+"""Binary event log for the Pico's control loop, and its host-side decoder; see `Telemetry`.
+
+Recording an event packs a fixed-size record into a preallocated ring buffer, without
+allocating or touching USB. `Telemetry.flush`, run from a low-priority task, writes the records
+out in batches whenever the serial port has room. `decode` (or ``cantools/telemetry_dump.py``)
+turns the byte stream back into text on the host.
+
+Each batch is a packet:
+
+    header   0xA5 0x5A, format version, record count, records dropped since the last packet (u16)
+    records  ticks_ms (u32), level (u8), event (u8), a (i16), b (i16), c (u32)
+    trailer  checksum byte, chosen so the records and itself add up to 0 modulo 256
+"""
+import struct
+
+try:
+    from adafruit_ticks import ticks_ms
+except ImportError:
+    # the host decoder does not need a clock
+    ticks_ms = None
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARNING", ERROR: "ERROR"}
+
+EVENT_JOYSTICK_SENT = 1
+EVENT_FRAME_RECEIVED = 2
+EVENT_SEND_FAILED = 3
+EVENT_TASK_MISSED = 4
+# event -> (name, format of the a, b and c fields)
+EVENTS = {
+    EVENT_JOYSTICK_SENT: ("joystick sent", "x={a} y={b} sequence={c}"),
+    EVENT_FRAME_RECEIVED: ("frame received", "id={c:#x} length={a} first byte={b:#04x}"),
+    EVENT_SEND_FAILED: ("send failed", "id={c:#x}"),
+    EVENT_TASK_MISSED: ("deadlines missed", "task={a} missed={c}"),
+}
+
+FORMAT_VERSION = 1
+_MAGIC = b"\xa5\x5a"
+_HEADER = "<BBBBH"
+_HEADER_SIZE = struct.calcsize(_HEADER)
+_RECORD = "<IBBhhI"
+RECORD_SIZE = struct.calcsize(_RECORD)
+
+
+class Telemetry:  # pylint: disable=too-many-instance-attributes
+    """A ring buffer of event records with a level threshold.
+
+    When the ring is full the oldest records are overwritten and counted in `dropped`, so a
+    stalled USB host never slows down the loop doing the recording.
+
+    Args:
+        capacity (int): Records held. Defaults to 128
+        level (int): Records below this level are ignored. Defaults to `INFO`
+        batch (int): The most records written per `flush`. Defaults to 16
+    """
+
+    def __init__(self, capacity=128, level=INFO, batch=16):
+        self.level = level
+        self._capacity = capacity
+        self._ring = bytearray(capacity * RECORD_SIZE)
+        self._head = 0  # next slot to write
+        self._count = 0
+        self._batch = batch
+        self._packet = bytearray(_HEADER_SIZE + batch * RECORD_SIZE + 1)
+        self._packet_view = memoryview(self._packet)
+        self.dropped = 0
+        """Records overwritten before they could be flushed"""
+        self._dropped_reported = 0
+
+    def __len__(self):
+        return self._count
+
+    def record(self, event, a=0, b=0, c=0, level=INFO):
+        """Add an event. ``a`` and ``b`` must fit an int16 and ``c`` a uint32."""
+        if level < self.level:
+            return
+        if self._count == self._capacity:
+            self.dropped += 1
+        else:
+            self._count += 1
+        struct.pack_into(
+            _RECORD, self._ring, self._head * RECORD_SIZE, ticks_ms(), level, event, a, b, c
+        )
+        self._head = (self._head + 1) % self._capacity
+
+    def debug(self, event, a=0, b=0, c=0):
+        """`record` at `DEBUG` level"""
+        self.record(event, a, b, c, DEBUG)
+
+    def info(self, event, a=0, b=0, c=0):
+        """`record` at `INFO` level"""
+        self.record(event, a, b, c, INFO)
+
+    def warning(self, event, a=0, b=0, c=0):
+        """`record` at `WARNING` level"""
+        self.record(event, a, b, c, WARNING)
+
+    def error(self, event, a=0, b=0, c=0):
+        """`record` at `ERROR` level"""
+        self.record(event, a, b, c, ERROR)
+
+    def flush(self, stream):
+        """Write up to `batch` records to `stream` as one packet, if it has room.
+
+        A stream with a ``connected`` attribute (`usb_cdc.Serial`) is skipped while no host has
+        the port open, and one with ``out_waiting`` while earlier output is still queued, so the
+        write never blocks.
+
+        Returns:
+            int: The number of records written
+        """
+        if not self._count:
+            return 0
+        if not getattr(stream, "connected", True) or getattr(stream, "out_waiting", 0):
+            return 0
+        count = min(self._count, self._batch)
+        tail = (self._head - self._count) % self._capacity
+        packet = self._packet
+        dropped = (self.dropped - self._dropped_reported) & 0xFFFF
+        struct.pack_into(_HEADER, packet, 0, _MAGIC[0], _MAGIC[1], FORMAT_VERSION, count, dropped)
+        offset = _HEADER_SIZE
+        ring = self._ring
+        total = 0
+        for _ in range(count):
+            start = tail * RECORD_SIZE
+            for idx in range(start, start + RECORD_SIZE):
+                value = ring[idx]
+                packet[offset] = value
+                total += value
+                offset += 1
+            tail = (tail + 1) % self._capacity
+        packet[offset] = -total & 0xFF
+        offset += 1
+        stream.write(self._packet_view[:offset])
+        self._count -= count
+        self._dropped_reported = self.dropped
+        return count
+
+
+def format_record(ticks, level, event, a, b, c):
+    """One record as a line of text"""
+    name, fields = EVENTS.get(event, ("event %d" % event, "a={a} b={b} c={c}"))
+    return "%10d %-7s %s: %s" % (
+        ticks,
+        LEVEL_NAMES.get(level, str(level)),
+        name,
+        fields.format(a=a, b=b, c=c),
+    )
+
+
+def decode(data):
+    """Find and unpack every complete packet in `data`, skipping anything else (console text
+    mixed into the same port, or a corrupt packet)
+
+    Returns:
+        tuple: ``(records, dropped, rest)``: a list of ``(ticks, level, event, a, b, c)``\
+            tuples, the records the device reported overwritten, and the unconsumed tail of\
+            `data` (a packet not yet complete) to prepend to the next chunk
+    """
+    records = []
+    dropped = 0
+    pos = 0
+    while True:
+        start = data.find(_MAGIC, pos)
+        if start < 0:
+            # keep a trailing first magic byte, the second may be in the next chunk
+            return records, dropped, data[-1:] if data[-1:] == _MAGIC[:1] else b""
+        if len(data) - start < _HEADER_SIZE:
+            return records, dropped, data[start:]
+        _, _, version, count, lost = struct.unpack_from(_HEADER, data, start)
+        end = start + _HEADER_SIZE + count * RECORD_SIZE + 1
+        if version != FORMAT_VERSION:
+            pos = start + 1
+            continue
+        if len(data) < end:
+            return records, dropped, data[start:]
+        body = data[start + _HEADER_SIZE : end]
+        if sum(body) & 0xFF:
+            pos = start + 1
+            continue
+        dropped += lost
+        for idx in range(count):
+            records.append(struct.unpack_from(_RECORD, body, idx * RECORD_SIZE))
+        pos = end
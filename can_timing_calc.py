@@ -1,76 +1,249 @@
 ##Calulation script for CAN timings.
 
 """
-BRP (Baud Rate Prescaler): 2
-PRSEG (Propagation Segment): 4
-PHSEG1 (Phase Segment 1): 8
-PHSEG2 (Phase Segment 2): 5
+Finds MCP2515 bit timings for many crystals and bitrates at once.
 
-The actual baud rate with this configuration is approximately 75.925 kbps, 
-and the sample point is at approximately 72.22% of the total bit time. 
-This is as close as we can get given the constraints of the CAN controller and 
-the desired baud rate.
+A bit is 1 sync TQ + PRSEG + PHSEG1 + PHSEG2, with TQ = 2 * BRP / F_OSC. Every
+BRP / bit length / PHSEG2 / SJW combination is evaluated as one NumPy grid, and
+for each (crystal, bitrate) the configurations that are Pareto-optimal in
 
-when setting these values in your MCP2515 CAN controller, 
-you will need to subtract 1 from each of them because they are represented as 
-value−1 in the register. For example, a BRP of 2 should be set as 1 in the CNF1 
-register.
+    - baud rate error
+    - sample point error
+    - oscillator tolerance (the clock mismatch the bus survives, per the CAN
+      spec: min(PHSEG1, PHSEG2) / (2 * (13 * bit - PHSEG2)) and SJW / (20 * bit))
 
-CNF1 = BRP - 1 = 2 - 1 = 1
-CNF2 = ((PRSEG - 1) << 3) | ((PHSEG1 - 1) << 6) | (1 << 7) = ((4 - 1) << 3) | ((8 - 1) << 6) | (1 << 7) = 0xB3
-CNF3 = PHSEG2 - 1 = 5 - 1 = 4
+are returned, best first.
 
+The registers hold each value minus 1:
 
-mcp2515.setRegister(MCP_CNF1, 0x01);
-mcp2515.setRegister(MCP_CNF2, 0xB3);
-mcp2515.setRegister(MCP_CNF3, 0x04);
+CNF1 = (SJW - 1) << 6 | (BRP - 1)
+CNF2 = 0x80 | (PHSEG1 - 1) << 3 | (PRSEG - 1)     (0x80: PHSEG2 comes from CNF3)
+CNF3 = PHSEG2 - 1
 
+Usage:
 
-"""
+    python can_timing_calc.py --crystal 8e6 --bitrate 75e3
+    python can_timing_calc.py --table > baud_rates.txt
 
+--table prints a ready-to-paste _BAUD_RATES dict for adafruit_mcp2515.
+"""
 
+import argparse
+import time
+from collections import namedtuple
 
+import numpy as np
 
 # Define the maximum and minimum values for BRP, PRSEG, PHSEG1, and PHSEG2
 BRP_min, BRP_max = 1, 64
 PRSEG_min, PRSEG_max = 1, 8
 PHSEG1_min, PHSEG1_max = 1, 8
-PHSEG2_min, PHSEG2_max = 1, 8
-
-# Oscillator frequency
-F_OSC = 8e6  # 8 MHz
-# F_OSC = 16e6  # 16 MHz
-# F_OSC = 12e6  # 12 MHz
-
-
-# Desired baud rate
-target_baud_rate = 75e3  # 75 kbps
+PHSEG2_min, PHSEG2_max = 2, 8  # PHSEG2 covers the 2 TQ information processing time
+SJW_max = 4
+# The datasheet asks for 8 to 25 TQ per bit; 5 to 7 work and are kept as a last resort
+BIT_TQ_min, BIT_TQ_nominal, BIT_TQ_max = 5, 8, 25
+
+# Oscillators and bitrates the driver's _BAUD_RATES table covers
+CRYSTALS = (16000000, 12000000, 8000000)
+BITRATES = (
+    1000000, 500000, 250000, 200000, 125000, 100000, 95000, 83300, 80000,
+    50000, 40000, 33000, 31250, 25000, 20000, 10000, 5000, 666000,
+)
 
 # Desired sample point
 target_sample_point = 75  # 75%
 
-# Initialize the best solution with a high error
-best_solution = None
-best_baud_rate_error = float('inf')
-best_sample_point_error = float('inf')
-
-# Iterate over all possible values
-for BRP in range(BRP_min, BRP_max+1):
-    for PRSEG in range(PRSEG_min, PRSEG_max+1):
-        for PHSEG1 in range(PHSEG1_min, PHSEG1_max+1):
-            for PHSEG2 in range(PHSEG2_min, PHSEG2_max+1):
-                # Calculate the time quantum, the bit time, the baud rate, and the sample point
-                TQ = 2 * (BRP + 1) / F_OSC
-                T_BIT = (1 + PRSEG + PHSEG1 + PHSEG2) * TQ
-                baud_rate = 1 / T_BIT
-                sample_point = (1 + PRSEG + PHSEG1) / (1 + PRSEG + PHSEG1 + PHSEG2) * 100
-                # Calculate the errors
-                baud_rate_error = abs(baud_rate - target_baud_rate)
-                sample_point_error = abs(sample_point - target_sample_point)
-                # If this solution is better than the best solution so far, update the best solution
-                if baud_rate_error < best_baud_rate_error or (baud_rate_error == best_baud_rate_error and sample_point_error < best_sample_point_error):
-                    best_solution = (BRP, PRSEG, PHSEG1, PHSEG2)
-                    best_baud_rate_error = baud_rate_error
-                    best_sample_point_error = sample_point_error
-
-print(best_solution, best_baud_rate_error, best_sample_point_error)
+# Candidates further off than this are not considered, unless nothing is closer
+max_baud_rate_error = 0.01  # 1%
+
+Timing = namedtuple(
+    "Timing",
+    [
+        "brp", "prseg", "phseg1", "phseg2", "sjw",
+        "baud_rate", "baud_rate_error", "sample_point", "sample_point_error",
+        "tolerance", "cnf",
+    ],
+)
+
+
+def _segment_grid(max_sjw):
+    """Every (bit length, PHSEG2) with the best PRSEG/PHSEG1 split and SJW for it.
+
+    The sample point only depends on the bit length and PHSEG2, and the oscillator
+    tolerance only gets better with larger SJW and min(PHSEG1, PHSEG2), so PHSEG1
+    takes as much as PHSEG2 where it can, PRSEG the rest, and SJW is as large as
+    PHSEG1, PHSEG2 and `max_sjw` allow. Any other choice would be dominated.
+    """
+    bit = np.arange(BIT_TQ_min, BIT_TQ_max + 1)[:, None]
+    phseg2 = np.arange(PHSEG2_min, PHSEG2_max + 1)[None, :]
+    bit, phseg2 = np.broadcast_arrays(bit, phseg2)
+
+    before_sample = bit - 1 - phseg2  # PRSEG + PHSEG1
+    phseg1 = np.minimum(
+        np.minimum(before_sample - PRSEG_min, PHSEG1_max),
+        np.maximum(phseg2, before_sample - PRSEG_max),
+    )
+    prseg = before_sample - phseg1
+    # SJW must not exceed PHSEG1 and must be less than PHSEG2
+    sjw = np.minimum(np.minimum(phseg1, phseg2 - 1), max_sjw)
+    valid = (
+        (prseg >= PRSEG_min) & (prseg <= PRSEG_max)
+        & (phseg1 >= PHSEG1_min)
+        & (before_sample >= phseg2)  # PRSEG + PHSEG1 >= PHSEG2
+    )
+    columns = [a[valid] for a in (bit, prseg, phseg1, phseg2, sjw)]
+    bit, prseg, phseg1, phseg2, sjw = columns
+
+    sample_point = 100.0 * (bit - phseg2) / bit
+    tolerance = np.minimum(
+        np.minimum(phseg1, phseg2) / (2.0 * (13 * bit - phseg2)),
+        sjw / (20.0 * bit),
+    )
+    return bit, prseg, phseg1, phseg2, sjw, sample_point, tolerance
+
+
+def _pareto_mask(costs):
+    """True where no other candidate of the same target dominates.
+
+    `costs` is (..., candidate, objective), lower is better.
+    """
+    no_worse = True
+    better = False
+    # one objective at a time keeps the temporaries at (..., candidate, candidate)
+    for k in range(costs.shape[-1]):
+        a = costs[..., :, None, k]
+        b = costs[..., None, :, k]
+        no_worse = no_worse & (a <= b)
+        better = better | (a < b)
+    return ~(no_worse & better).any(axis=-2)
+
+
+def solve(crystals, bitrates, sample_point=target_sample_point, max_sjw=SJW_max):
+    """Pareto-optimal timings for every (crystal, bitrate) pair.
+
+    Returns:
+        dict: ``{crystal: {bitrate: [Timing, ...]}}``, each list best first (smallest
+        baud rate error, then at least 8 TQ, then sample point error, then tolerance)
+    """
+    bit, prseg, phseg1, phseg2, sjw, sp, tolerance = _segment_grid(max_sjw)
+    brp = np.arange(BRP_min, BRP_max + 1)
+
+    crystals = np.asarray(crystals, dtype=float)
+    bitrates = np.asarray(bitrates, dtype=float)
+    # (crystal, BRP, segment row): the bitrate every configuration produces
+    rates = crystals[:, None, None] / (2.0 * brp[None, :, None] * bit[None, None, :])
+    # (crystal, bitrate, BRP, segment row)
+    errors = np.abs(rates[:, None] - bitrates[None, :, None, None]) / bitrates[None, :, None, None]
+
+    # sample point and tolerance don't depend on BRP, so only the best BRP of each row matters
+    best_brp = errors.argmin(axis=2)
+    errors = np.take_along_axis(errors, best_brp[:, :, None], axis=2)[:, :, 0]
+
+    # the closest reachable bitrate bounds how far off a kept candidate may be
+    limit = np.maximum(errors.min(axis=2, keepdims=True), max_baud_rate_error)
+    candidate = errors <= limit
+
+    # (crystal, bitrate, row, objective), rounded so float noise doesn't split equal candidates
+    sp_error = np.abs(sp - sample_point)
+    shape = errors.shape
+    costs = np.stack(
+        [
+            np.round(errors, 9),
+            np.broadcast_to(bit < BIT_TQ_nominal, shape),
+            np.broadcast_to(np.round(sp_error, 9), shape),
+            np.broadcast_to(-np.round(tolerance, 9), shape),
+        ],
+        axis=-1,
+    )
+    costs[~candidate] = np.inf
+    front = _pareto_mask(costs) & candidate
+
+    results = {}
+    for ci, crystal in enumerate(crystals):
+        per_crystal = results.setdefault(int(crystal), {})
+        for bi, bitrate in enumerate(bitrates):
+            rows = np.nonzero(front[ci, bi])[0]
+            target_costs = costs[ci, bi, rows]
+            rows = rows[np.lexsort(target_costs.T[::-1])]
+
+            timings = []
+            seen = set()
+            for r in rows:
+                key = tuple(costs[ci, bi, r])
+                if key in seen:
+                    # same scores as a better-ranked row
+                    continue
+                seen.add(key)
+                b = int(brp[best_brp[ci, bi, r]])
+                rate = crystal / (2.0 * b * bit[r])
+                cnf = (
+                    ((int(sjw[r]) - 1) << 6) | (b - 1),
+                    0x80 | ((int(phseg1[r]) - 1) << 3) | (int(prseg[r]) - 1),
+                    int(phseg2[r]) - 1,
+                )
+                timings.append(
+                    Timing(
+                        b, int(prseg[r]), int(phseg1[r]), int(phseg2[r]), int(sjw[r]),
+                        rate, float(errors[ci, bi, r]), float(sp[r]),
+                        float(sp_error[r]), float(tolerance[r]), cnf,
+                    )
+                )
+            per_crystal[int(bitrate)] = timings
+    return results
+
+
+def format_baud_rates(results):
+    """The best timing of each entry as a _BAUD_RATES dict, ready to paste"""
+    lines = ["_BAUD_RATES = {"]
+    for crystal, per_bitrate in results.items():
+        lines.append("    %d: {" % crystal)
+        lines.append("        # CNF1, CNF2, CNF3")
+        for bitrate, timings in per_bitrate.items():
+            best = timings[0]
+            if best.baud_rate_error > max_baud_rate_error:
+                lines.append("        # %d: not reachable, closest is %.0f bps" % (bitrate, best.baud_rate))
+                continue
+            lines.append(
+                "        %d: (0x%02X, 0x%02X, 0x%02X),  # %.0f bps, %.1f%%, +-%.2f%%"
+                % ((bitrate,) + best.cnf + (best.baud_rate, best.sample_point, 100 * best.tolerance))
+            )
+        lines.append("    },")
+    lines.append("}")
+    return "\n".join(lines)
+
+
+def _main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--crystal", type=float, nargs="+", default=CRYSTALS)
+    parser.add_argument("--bitrate", type=float, nargs="+", default=BITRATES)
+    parser.add_argument("--sample-point", type=float, default=target_sample_point)
+    parser.add_argument("--max-sjw", type=int, default=SJW_max, choices=range(1, SJW_max + 1))
+    parser.add_argument("--table", action="store_true", help="print a _BAUD_RATES dict")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = solve(args.crystal, args.bitrate, args.sample_point, args.max_sjw)
+    elapsed = time.perf_counter() - start
+
+    if args.table:
+        print(format_baud_rates(results))
+        print("# solved in %.1f ms" % (elapsed * 1000))
+        return
+    for crystal, per_bitrate in results.items():
+        for bitrate, timings in per_bitrate.items():
+            print("%d Hz crystal, %d bps:" % (crystal, bitrate))
+            for t in timings:
+                print(
+                    "  BRP %2d PRSEG %d PHSEG1 %d PHSEG2 %d SJW %d  %9.1f bps (%.3f%%)"
+                    "  sample %.1f%%  tolerance %.2f%%  CNF 0x%02X 0x%02X 0x%02X"
+                    % (
+                        (t.brp, t.prseg, t.phseg1, t.phseg2, t.sjw, t.baud_rate,
+                         100 * t.baud_rate_error, t.sample_point, 100 * t.tolerance)
+                        + t.cnf
+                    )
+                )
+    print("solved in %.1f ms" % (elapsed * 1000))
+
+
+if __name__ == "__main__":
+    _main()
@@ -0,0 +1,112 @@
+"""Compare the joystick ADC filters on simulated readings.
+
+"sort 200" is the routine analog_reading.py used to run: 200 readings per axis, one axis after
+the other, sorted, element 100 taken. "streaming" is joystick_filter.JoystickSampler. Both see
+the same stick movement, Gaussian noise and occasional spikes, and are scored on
+
+    - ADC reads per update and update rate (host CPU time, so only the ratio matters)
+    - noise: standard deviation of the output while the stick rests off centre
+    - lag: updates until a step change is 90% through
+
+    python cantools/bench_adc_filter.py --noise 300 --spikes 0.01
+"""
+import argparse
+import random
+import statistics
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Simple", "pico"))
+from joystick_filter import JoystickSampler  # pylint: disable=wrong-import-position
+
+CENTRE = 32768
+REST = 45000  # off centre, so the dead zone does not hide the noise
+
+
+class SimulatedAxis:
+    """Stands in for `analogio.AnalogIn`: `target` plus noise and spikes"""
+
+    def __init__(self, noise, spikes, rng):
+        self.target = REST
+        self.reads = 0
+        self._noise = noise
+        self._spikes = spikes
+        self._rng = rng
+
+    @property
+    def value(self):
+        self.reads += 1
+        if self._rng.random() < self._spikes:
+            return self._rng.choice((0, 65535))
+        value = int(self._rng.gauss(self.target, self._noise))
+        return min(65535, max(0, value))
+
+
+def sort_200(x_input, y_input, dead_zone=650):
+    """The routine analog_reading.py used before joystick_filter"""
+    x_list = []
+    y_list = []
+    for _ in range(200):
+        x_list.append(x_input.value)
+    for _ in range(200):
+        y_list.append(y_input.value)
+    x_list.sort()
+    y_list.sort()
+    x = x_list[100]
+    y = y_list[100]
+    if abs(x - CENTRE) < dead_zone:
+        x = CENTRE
+    if abs(y - CENTRE) < dead_zone:
+        y = CENTRE
+    return x, y
+
+
+def _score(name, make_reader, args):
+    rng = random.Random(args.seed)
+    x_axis = SimulatedAxis(args.noise, args.spikes, rng)
+    y_axis = SimulatedAxis(args.noise, args.spikes, rng)
+    read = make_reader(x_axis, y_axis)
+
+    # settle, then measure noise at rest
+    for _ in range(50):
+        read()
+    start = time.perf_counter()
+    outputs = [read()[0] for _ in range(args.updates)]
+    elapsed = time.perf_counter() - start
+    reads = x_axis.reads + y_axis.reads
+
+    # step back to the centre and count updates until 90% of the way there
+    x_axis.target = CENTRE
+    lag = 0
+    while read()[0] > REST - 0.9 * (REST - CENTRE):
+        lag += 1
+
+    print(
+        "%-10s %10.0f %12.0f %10.1f %10d"
+        % (
+            name,
+            reads / (args.updates + 50 + lag + 1),
+            args.updates / elapsed,
+            statistics.pstdev(outputs),
+            lag + 1,
+        )
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the joystick ADC filters")
+    parser.add_argument("--noise", type=float, default=300, help="ADC noise, counts RMS")
+    parser.add_argument("--spikes", type=float, default=0.01, help="share of wild readings")
+    parser.add_argument("--updates", type=int, default=500)
+    parser.add_argument("--samples", type=int, default=8, help="streaming readings per axis")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print("%-10s %10s %12s %10s %10s" % ("filter", "reads/upd", "updates/s", "noise", "lag"))
+    _score("sort 200", lambda x, y: lambda: sort_200(x, y), args)
+    _score("streaming", lambda x, y: JoystickSampler(x, y, samples=args.samples).read, args)
+
+
+if __name__ == "__main__":
+    main()
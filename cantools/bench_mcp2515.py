@@ -0,0 +1,190 @@
+"""Benchmark the adafruit_mcp2515 driver on the emulated MCP2515 in mcp2515_emulator.py.
+
+Reports SPI transactions, SPI bytes and wall time per frame for send, read_message and listen,
+and per start-up for the driver's initialization, so changes to the driver's bus usage can be
+compared without hardware:
+
+    python cantools/bench_mcp2515.py --frames 2000
+"""
+import argparse
+import os
+import sys
+import time
+
+from mcp2515_emulator import EmulatedBus, EmulatedSPI, MCP2515Emulator, install_stand_ins
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Simple", "pico", "lib"))
+install_stand_ins()
+
+from adafruit_mcp2515 import MCP2515  # pylint: disable=wrong-import-position
+from adafruit_mcp2515.canio import Match, Message  # pylint: disable=wrong-import-position
+from adafruit_mcp2515.scheduler import SPIScheduler  # pylint: disable=wrong-import-position
+
+BAUDRATE = 250000
+
+
+def _pair(**kwargs):
+    """Two controllers on one emulated bus"""
+    bus = EmulatedBus()
+    chips = (MCP2515Emulator(bus=bus), MCP2515Emulator(bus=bus))
+    nodes = tuple(MCP2515(chip.spi, chip.cs, baudrate=BAUDRATE, **kwargs) for chip in chips)
+    return chips, nodes
+
+
+class _Measurement:
+    def __init__(self, name, chip):
+        self.name = name
+        self._stats = chip.spi.stats
+        self._start = 0.0
+        self.elapsed = 0.0
+        self.frames = 0
+
+    def __enter__(self):
+        self._stats.reset()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self._start
+        self.transactions = self._stats.transactions
+        self.bytes = self._stats.bytes
+
+    def row(self):
+        frames = max(self.frames, 1)
+        return "%-28s %8d %10.2f %10.2f %10.1f" % (
+            self.name,
+            self.frames,
+            self.transactions / frames,
+            self.bytes / frames,
+            1e6 * self.elapsed / frames,
+        )
+
+
+def bench_send(frames):
+    """`send` of 8-byte frames, the other controller draining them"""
+    chips, (sender, receiver) = _pair()
+    message = Message(0x123, bytes(range(8)))
+    with _Measurement("send", chips[0]) as result:
+        for _ in range(frames):
+            sender.send(message)
+            receiver.read_messages()
+        result.frames = frames
+    return result
+
+
+def bench_send_many(frames, batch=3):
+    """`send_many` in batches filling all three transmit buffers"""
+    chips, (sender, receiver) = _pair()
+    messages = [Message(0x100 + idx, bytes(range(8))) for idx in range(batch)]
+    with _Measurement("send_many x%d" % batch, chips[0]) as result:
+        for _ in range(frames // batch):
+            sender.send_many(messages)
+            receiver.read_messages()
+        result.frames = frames // batch * batch
+    return result
+
+
+def bench_read_message(frames):
+    """`read_message` with both receive buffers full on every poll"""
+    chips, (_, receiver) = _pair()
+    chip = chips[1]
+    with _Measurement("read_message", chip) as result:
+        for idx in range(0, frames, 2):
+            chip.inject(0x200 + (idx & 0xFF), bytes(8))
+            chip.inject(0x200 + (idx & 0xFF), bytes(8))
+            receiver.read_message()
+            receiver.read_message()
+        result.frames = frames
+    return result
+
+
+def bench_listen(frames, wanted_share=0.25):
+    """`Listener.receive` for 4 IDs while the bus also carries frames nobody asked for"""
+    chips, (_, receiver) = _pair()
+    chip = chips[1]
+    matches = [Match(0x300 + idx) for idx in range(4)]
+    every = int(round(1 / wanted_share))
+    with receiver.listen(matches, timeout=0.1) as listener:
+        with _Measurement("listen (%d%% wanted)" % (100 * wanted_share), chip) as result:
+            received = 0
+            for idx in range(frames * every):
+                wanted = idx % every == 0
+                chip.inject((0x300 + (idx & 3)) if wanted else 0x400 + (idx & 0xFF), bytes(8))
+                if wanted and listener.receive() is not None:
+                    received += 1
+            result.frames = received
+    return result
+
+
+def bench_idle_poll(polls, use_int_pin):
+    """Empty `read_messages` polls, with or without the INT pin"""
+    bus = EmulatedBus()
+    chip = MCP2515Emulator(bus=bus)
+    kwargs = {"int_pin": chip.int_pin} if use_int_pin else {}
+    node = MCP2515(chip.spi, chip.cs, baudrate=BAUDRATE, **kwargs)
+    name = "idle poll (%s)" % ("INT pin" if use_int_pin else "SPI")
+    with _Measurement(name, chip) as result:
+        for _ in range(polls):
+            node.read_messages()
+        result.frames = polls
+    return result
+
+
+def bench_shared_bus(frames):
+    """Two controllers on one SPI bus served by an `SPIScheduler`, one receiving two frames and
+    the other one frame per poll while also sending"""
+    spi = EmulatedSPI()
+    chips = (MCP2515Emulator(spi, EmulatedBus()), MCP2515Emulator(spi, EmulatedBus()))
+    scheduler = SPIScheduler(spi)
+    nodes = tuple(MCP2515(scheduler, chip.cs, baudrate=BAUDRATE) for chip in chips)
+    message = Message(0x300, bytes(8))
+    with _Measurement("shared bus (2 controllers)", chips[0]) as result:
+        received = 0
+        for idx in range(frames // 3):
+            chips[0].inject(0x100, bytes(8))
+            chips[0].inject(0x101, bytes(8))
+            chips[1].inject(0x200, bytes(8))
+            if idx % 4 == 0:
+                nodes[1].send(message)
+            received += scheduler.poll()
+            for node in nodes:
+                node.rx_queue.clear()
+        result.frames = received
+    return result
+
+
+def bench_startup(runs, fast_init):
+    """Constructing the driver, which resets and configures the controller"""
+    bus = EmulatedBus()
+    chip = MCP2515Emulator(bus=bus)
+    name = "startup (%s)" % ("fast_init" if fast_init else "full")
+    with _Measurement(name, chip) as result:
+        for _ in range(runs):
+            MCP2515(chip.spi, chip.cs, baudrate=BAUDRATE, fast_init=fast_init)
+        result.frames = runs
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark adafruit_mcp2515 on the emulator")
+    parser.add_argument("--frames", type=int, default=1000)
+    args = parser.parse_args()
+
+    results = [
+        bench_send(args.frames),
+        bench_send_many(args.frames),
+        bench_read_message(args.frames),
+        bench_listen(args.frames),
+        bench_idle_poll(args.frames, False),
+        bench_idle_poll(args.frames, True),
+        bench_shared_bus(args.frames),
+        bench_startup(10, False),
+        bench_startup(10, True),
+    ]
+    print("%-28s %8s %10s %10s %10s" % ("operation", "frames", "xfers/fr", "bytes/fr", "us/fr"))
+    for result in results:
+        print(result.row())
+
+
+if __name__ == "__main__":
+    main()
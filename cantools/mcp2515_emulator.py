@@ -0,0 +1,680 @@
+"""Register-level MCP2515 emulator with busio.SPI / DigitalInOut stand-ins.
+
+Lets the CircuitPython ``adafruit_mcp2515`` driver run unmodified under CPython so it can be
+benchmarked and exercised without hardware::
+
+    chip = MCP2515Emulator()
+    can_bus = MCP2515(chip.spi, chip.cs, baudrate=250000)
+
+Two controllers can be put on the same emulated bus with `EmulatedBus`, and a bus can be
+bridged to a SocketCAN ``vcan`` interface with `VirtualCANBridge` (needs ``python-can``).
+
+The driver imports ``micropython`` and ``adafruit_bus_device``; on a machine without Blinka or
+the bus device library, call `install_stand_ins` before importing it.
+"""
+import sys
+import types
+
+# Instructions
+_RESET = 0xC0
+_READ = 0x03
+_WRITE = 0x02
+_BITMOD = 0x05
+_READ_STATUS = 0xA0
+_RX_STATUS = 0xB0
+
+# Registers
+_CANSTAT = 0x0E
+_CANCTRL = 0x0F
+_TEC = 0x1C
+_REC = 0x1D
+_CNF3 = 0x28
+_CNF2 = 0x29
+_CNF1 = 0x2A
+_CANINTE = 0x2B
+_CANINTF = 0x2C
+_EFLG = 0x2D
+_TXBCTRL = (0x30, 0x40, 0x50)
+_RXBCTRL = (0x60, 0x70)
+_FILTERS = (0x00, 0x04, 0x08, 0x10, 0x14, 0x18)
+_MASKS = (0x20, 0x24)
+
+# Modes (CANCTRL.REQOP / CANSTAT.OPMOD)
+MODE_NORMAL = 0x00
+MODE_SLEEP = 0x20
+MODE_LOOPBACK = 0x40
+MODE_LISTENONLY = 0x60
+MODE_CONFIG = 0x80
+_MODE_MASK = 0xE0
+
+# Bits
+_TXREQ = 0x08
+_RXIF = (0x01, 0x02)
+_TXIF = (0x04, 0x08, 0x10)
+_RXOVR = (0x40, 0x80)
+_BUKT = 0x04
+_EXIDE = 0x08
+_RTR = 0x40
+
+# Mask and filter registers: written in configuration mode only, and read as 0 outside it
+_MASKS_AND_FILTERS = frozenset(
+    list(range(0x00, 0x0C)) + list(range(0x10, 0x1C)) + list(range(0x20, 0x28))
+)
+# Registers that can only be written in configuration mode
+_CONFIG_ONLY = _MASKS_AND_FILTERS | {_CNF1, _CNF2, _CNF3}
+
+
+class Frame:
+    """A CAN frame as it travels across an `EmulatedBus`"""
+
+    __slots__ = ("id", "extended", "rtr", "data")
+
+    def __init__(self, id, data=b"", *, extended=False, rtr=False):  # pylint: disable=redefined-builtin
+        self.id = id
+        self.extended = extended
+        self.rtr = rtr
+        self.data = bytes(data)
+
+    def __repr__(self):
+        return "Frame(id=%#x, data=%r, extended=%r, rtr=%r)" % (
+            self.id,
+            self.data,
+            self.extended,
+            self.rtr,
+        )
+
+
+class SPIStats:
+    """Counts of what the driver put on the emulated SPI bus"""
+
+    def __init__(self):
+        self.transactions = 0
+        self.bytes = 0
+        self.locks = 0
+        self.by_instruction = {}
+
+    def reset(self):
+        """Zero every counter"""
+        self.transactions = 0
+        self.bytes = 0
+        self.locks = 0
+        self.by_instruction = {}
+
+
+class EmulatedPin:
+    """Stand-in for a `digitalio.DigitalInOut` (chip select, or the INT line when read)"""
+
+    def __init__(self, value=True, on_change=None):
+        self._value = value
+        self._on_change = on_change
+
+    def switch_to_output(self, value=False, **_kwargs):
+        """Matches `digitalio.DigitalInOut.switch_to_output`"""
+        self.value = value
+
+    def switch_to_input(self, **_kwargs):
+        """Matches `digitalio.DigitalInOut.switch_to_input`"""
+
+    @property
+    def value(self):
+        """The current logic level of the pin"""
+        return self._value
+
+    @value.setter
+    def value(self, value):
+        value = bool(value)
+        changed = value != self._value
+        self._value = value
+        if changed and self._on_change is not None:
+            self._on_change(value)
+
+    def deinit(self):
+        """Matches `digitalio.DigitalInOut.deinit`"""
+
+
+class _InterruptPin:
+    """Read-only view of the emulated active-low INT output"""
+
+    def __init__(self, chip):
+        self._chip = chip
+
+    @property
+    def value(self):
+        """False while any enabled interrupt flag is set"""
+        return not self._chip.interrupt_pending
+
+    def switch_to_input(self, **_kwargs):
+        """Matches `digitalio.DigitalInOut.switch_to_input`"""
+
+    def deinit(self):
+        """Matches `digitalio.DigitalInOut.deinit`"""
+
+
+class EmulatedSPIDevice:
+    """Stand-in for `adafruit_bus_device.spi_device.SPIDevice`: locks the bus and drives chip
+    select around each ``with`` block"""
+
+    def __init__(self, spi, chip_select=None, *, baudrate=100000, polarity=0, phase=0, extra_clocks=0):
+        # pylint: disable=too-many-arguments,unused-argument
+        self.spi = spi
+        self.chip_select = chip_select
+        if chip_select is not None:
+            chip_select.switch_to_output(value=True)
+
+    def __enter__(self):
+        while not self.spi.try_lock():
+            pass
+        if self.chip_select is not None:
+            self.chip_select.value = False
+        return self.spi
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.chip_select is not None:
+            self.chip_select.value = True
+        self.spi.unlock()
+        return False
+
+
+def install_stand_ins():
+    """Make ``micropython.const`` and ``adafruit_bus_device.spi_device`` importable under plain
+    CPython, using `EmulatedSPIDevice`. Real modules that are already installed are kept."""
+    try:
+        import micropython  # pylint: disable=import-outside-toplevel,unused-import
+    except ImportError:
+        module = types.ModuleType("micropython")
+        module.const = lambda value: value
+        sys.modules["micropython"] = module
+    try:
+        from adafruit_bus_device import spi_device  # pylint: disable=import-outside-toplevel,unused-import
+    except ImportError:
+        package = types.ModuleType("adafruit_bus_device")
+        module = types.ModuleType("adafruit_bus_device.spi_device")
+        module.SPIDevice = EmulatedSPIDevice
+        package.spi_device = module
+        sys.modules["adafruit_bus_device"] = package
+        sys.modules["adafruit_bus_device.spi_device"] = module
+
+
+class EmulatedSPI:
+    """Stand-in for `busio.SPI` that clocks bytes into one or more emulated chips.
+
+    Every chip sharing the bus has its own chip select; only the selected chip sees the bytes.
+    """
+
+    def __init__(self):
+        self._locked = False
+        self._chips = []
+        self.stats = SPIStats()
+
+    def attach(self, chip):
+        """Connect an `MCP2515Emulator` to this bus"""
+        self._chips.append(chip)
+
+    def try_lock(self):
+        """Matches `busio.SPI.try_lock`"""
+        if self._locked:
+            return False
+        self._locked = True
+        self.stats.locks += 1
+        return True
+
+    def unlock(self):
+        """Matches `busio.SPI.unlock`"""
+        self._locked = False
+
+    def configure(self, **_kwargs):
+        """Matches `busio.SPI.configure`"""
+
+    def _selected(self):
+        for chip in self._chips:
+            if chip.selected:
+                return chip
+        return None
+
+    def _transfer(self, out_byte):
+        self.stats.bytes += 1
+        chip = self._selected()
+        if chip is None:
+            return 0xFF
+        return chip.transfer(out_byte)
+
+    def write(self, buffer, *, start=0, end=None):
+        """Matches `busio.SPI.write`"""
+        end = len(buffer) if end is None else min(end, len(buffer))
+        for idx in range(start, end):
+            self._transfer(buffer[idx])
+
+    def readinto(self, buffer, *, start=0, end=None, write_value=0):
+        """Matches `busio.SPI.readinto`"""
+        end = len(buffer) if end is None else min(end, len(buffer))
+        for idx in range(start, end):
+            buffer[idx] = self._transfer(write_value)
+
+    def write_readinto(
+        self, buffer_out, buffer_in, *, out_start=0, out_end=None, in_start=0, in_end=None
+    ):  # pylint: disable=too-many-arguments
+        """Matches `busio.SPI.write_readinto`"""
+        # like busio, out-of-range ends are clamped to the buffer
+        out_end = len(buffer_out) if out_end is None else min(out_end, len(buffer_out))
+        for idx in range(out_end - out_start):
+            value = self._transfer(buffer_out[out_start + idx])
+            buffer_in[in_start + idx] = value
+
+
+class MCP2515Emulator:  # pylint: disable=too-many-instance-attributes
+    """Register model of one MCP2515.
+
+    Covers the SPI instruction set (RESET, READ, WRITE, BITMOD, READ STATUS, RX STATUS,
+    READ RX BUFFER, LOAD TX BUFFER, RTS), operating modes, the acceptance masks and filters
+    with RXB0 to RXB1 rollover, RX overflow flags, TX priority and the INT line.
+
+    Args:
+        spi (EmulatedSPI, optional): Bus to attach to. A new one is created if not given.
+        bus (EmulatedBus, optional): CAN bus to join.
+        auto_transmit (bool): If `True` (default) a requested frame is sent immediately.
+            Otherwise frames stay pending until `process` is called, which models a busy bus.
+    """
+
+    def __init__(self, spi=None, bus=None, *, auto_transmit=True):
+        self.spi = spi if spi is not None else EmulatedSPI()
+        self.spi.attach(self)
+        self.cs = EmulatedPin(True, self._cs_changed)
+        self.int_pin = _InterruptPin(self)
+        self.auto_transmit = auto_transmit
+        self.registers = bytearray(0x80)
+        self.selected = False
+        self.transmitted = []
+        self._bus = None
+        self._rx_buffers_read = [False, False]
+        self._reset_state()
+        self._begin_transaction()
+        if bus is not None:
+            bus.attach(self)
+
+    ################ state helpers ################
+    def _reset_state(self):
+        for idx in range(len(self.registers)):
+            self.registers[idx] = 0
+        self.registers[_CANSTAT] = MODE_CONFIG
+        self.registers[_CANCTRL] = 0x87
+
+    @property
+    def mode(self):
+        """The current operating mode"""
+        return self.registers[_CANSTAT] & _MODE_MASK
+
+    @property
+    def interrupt_pending(self):
+        """True when the INT line is asserted"""
+        return bool(self.registers[_CANINTF] & self.registers[_CANINTE])
+
+    @property
+    def status(self):
+        """The byte the READ STATUS instruction returns"""
+        regs = self.registers
+        intf = regs[_CANINTF]
+        status = intf & 0x03
+        for idx, ctrl in enumerate(_TXBCTRL):
+            if regs[ctrl] & _TXREQ:
+                status |= 0x04 << (2 * idx)
+            if intf & _TXIF[idx]:
+                status |= 0x08 << (2 * idx)
+        return status
+
+    def set_error_counters(self, tec=None, rec=None, eflg=None):
+        """Force the error counters/flags, for exercising bus-state handling"""
+        if tec is not None:
+            self.registers[_TEC] = tec
+        if rec is not None:
+            self.registers[_REC] = rec
+        if eflg is not None:
+            self.registers[_EFLG] = eflg
+
+    ################ SPI protocol ################
+    def _cs_changed(self, level):
+        if level:
+            self._end_transaction()
+            self.selected = False
+        else:
+            self.selected = True
+            self.spi.stats.transactions += 1
+            self._begin_transaction()
+
+    def _begin_transaction(self):
+        self._instruction = None
+        self._address = None
+        self._bitmod_mask = None
+        self._rx_buffers_read = [False, False]
+
+    def _end_transaction(self):
+        for idx in (0, 1):
+            if self._rx_buffers_read[idx]:
+                self.registers[_CANINTF] &= ~_RXIF[idx] & 0xFF
+        self._instruction = None
+
+    def transfer(self, out_byte):
+        """Clock one byte in, return the byte clocked out"""
+        if self._instruction is None:
+            return self._start_instruction(out_byte)
+        handler = self._instruction
+        return handler(out_byte)
+
+    def _start_instruction(self, byte):
+        by_instruction = self.spi.stats.by_instruction
+        by_instruction[byte] = by_instruction.get(byte, 0) + 1
+        if byte == _RESET:
+            self._reset_state()
+            self._instruction = self._ignore
+        elif byte == _READ:
+            self._instruction = self._read_address
+        elif byte == _WRITE:
+            self._instruction = self._write_address
+        elif byte == _BITMOD:
+            self._instruction = self._bitmod_address
+        elif byte == _READ_STATUS:
+            self._instruction = self._read_status
+        elif byte == _RX_STATUS:
+            self._instruction = self._rx_status
+        elif byte & 0xF9 == 0x90:
+            buffer_index = (byte >> 2) & 0x01
+            self._address = _RXBCTRL[buffer_index] + (6 if byte & 0x02 else 1)
+            self._rx_buffers_read[buffer_index] = True
+            self._instruction = self._read_data
+        elif byte & 0xF8 == 0x40 and byte & 0x07 < 6:
+            self._address = _TXBCTRL[(byte >> 1) & 0x03] + (6 if byte & 0x01 else 1)
+            self._instruction = self._write_data
+        elif byte & 0xF8 == 0x80:
+            for idx in range(3):
+                if byte & (1 << idx):
+                    self._request_transmit(idx)
+            self._instruction = self._ignore
+        else:
+            self._instruction = self._ignore
+        return 0
+
+    @staticmethod
+    def _ignore(_byte):
+        return 0
+
+    def _read_address(self, byte):
+        self._address = byte
+        self._instruction = self._read_data
+        return 0
+
+    def _read_data(self, _byte):
+        address = self._address & 0x7F
+        if address in _MASKS_AND_FILTERS and self.mode != MODE_CONFIG:
+            # masks and filters only read back in configuration mode
+            value = 0
+        else:
+            value = self.registers[address]
+        self._address += 1
+        return value
+
+    def _write_address(self, byte):
+        self._address = byte
+        self._instruction = self._write_data
+        return 0
+
+    def _write_data(self, byte):
+        self._write_register(self._address & 0x7F, byte)
+        self._address += 1
+        return 0
+
+    def _bitmod_address(self, byte):
+        self._address = byte
+        self._instruction = self._bitmod_mask_byte
+        return 0
+
+    def _bitmod_mask_byte(self, byte):
+        self._bitmod_mask = byte
+        self._instruction = self._bitmod_data
+        return 0
+
+    def _bitmod_data(self, byte):
+        current = self.registers[self._address & 0x7F]
+        mask = self._bitmod_mask
+        self._write_register(self._address & 0x7F, (current & ~mask & 0xFF) | (byte & mask))
+        self._instruction = self._ignore
+        return 0
+
+    def _read_status(self, _byte):
+        return self.status
+
+    def _rx_status(self, _byte):
+        return self.registers[_CANINTF] & 0x03  # enough for the driver's purposes
+
+    def _write_register(self, address, value):
+        regs = self.registers
+        if address in _CONFIG_ONLY and self.mode != MODE_CONFIG:
+            return
+        if address == _CANSTAT:
+            return
+        if address == _CANCTRL:
+            regs[_CANCTRL] = value
+            regs[_CANSTAT] = (regs[_CANSTAT] & ~_MODE_MASK & 0xFF) | (value & _MODE_MASK)
+            return
+        if address in _TXBCTRL:
+            idx = _TXBCTRL.index(address)
+            was_requested = regs[address] & _TXREQ
+            if was_requested and not value & _TXREQ:
+                regs[address] = (value & 0x03) | 0x40  # aborted
+                return
+            regs[address] = value & 0x0B
+            if value & _TXREQ and not was_requested:
+                regs[address] &= ~_TXREQ & 0xFF
+                self._request_transmit(idx)
+            return
+        regs[address] = value
+
+    ################ CAN side ################
+    def _request_transmit(self, idx):
+        if self.mode not in (MODE_NORMAL, MODE_LOOPBACK):
+            return
+        self.registers[_TXBCTRL[idx]] |= _TXREQ
+        self.registers[_TXBCTRL[idx]] &= ~0x40 & 0xFF
+        if self.auto_transmit:
+            self.process()
+
+    def pending_transmit(self):
+        """Indexes of the TX buffers holding a requested frame, highest priority first"""
+        regs = self.registers
+        pending = [idx for idx in range(3) if regs[_TXBCTRL[idx]] & _TXREQ]
+        # higher TXP wins, then the higher buffer number
+        pending.sort(key=lambda idx: (regs[_TXBCTRL[idx]] & 0x03, idx), reverse=True)
+        return pending
+
+    def process(self, max_frames=None):
+        """Put pending TX frames on the bus, in hardware priority order.
+
+        Returns:
+            int: The number of frames sent
+        """
+        sent = 0
+        while True:
+            if max_frames is not None and sent >= max_frames:
+                return sent
+            pending = self.pending_transmit()
+            if not pending:
+                return sent
+            self._transmit(pending[0])
+            sent += 1
+
+    def _transmit(self, idx):
+        regs = self.registers
+        base = _TXBCTRL[idx]
+        frame = self._decode_frame(regs[base + 1 : base + 14])
+        regs[base] &= ~_TXREQ & 0xFF
+        regs[_CANINTF] |= _TXIF[idx]
+        self.transmitted.append(frame)
+        if self.mode == MODE_LOOPBACK:
+            self.receive(frame)
+        elif self._bus is not None:
+            self._bus.broadcast(frame, self)
+
+    @staticmethod
+    def _decode_frame(raw):
+        sidh, sidl, eid8, eid0, dlc = raw[0], raw[1], raw[2], raw[3], raw[4]
+        std_id = (sidh << 3) | (sidl >> 5)
+        extended = bool(sidl & _EXIDE)
+        if extended:
+            can_id = (std_id << 18) | ((sidl & 0x03) << 16) | (eid8 << 8) | eid0
+        else:
+            can_id = std_id
+        length = min(8, dlc & 0x0F)
+        rtr = bool(dlc & _RTR)
+        data = b"" if rtr else bytes(raw[5 : 5 + length])
+        frame = Frame(can_id, data, extended=extended, rtr=rtr)
+        if rtr:
+            frame.data = bytes(length)
+        return frame
+
+    @staticmethod
+    def _encode_id(can_id, extended):
+        if extended:
+            std_part = (can_id >> 18) & 0x7FF
+            return (
+                std_part >> 3,
+                ((std_part & 0x07) << 5) | _EXIDE | ((can_id >> 16) & 0x03),
+                (can_id >> 8) & 0xFF,
+                can_id & 0xFF,
+            )
+        return ((can_id >> 3) & 0xFF, (can_id & 0x07) << 5, 0, 0)
+
+    def _accepts(self, frame, mask_addr, filter_addrs):
+        regs = self.registers
+        sidh, sidl, eid8, eid0 = self._encode_id(frame.id, frame.extended)
+        if not frame.extended:
+            # standard frames apply the EID bytes of the mask/filter to the first two data bytes
+            eid8 = frame.data[0] if len(frame.data) > 0 else 0
+            eid0 = frame.data[1] if len(frame.data) > 1 else 0
+        frame_bytes = (sidh, sidl & 0xE3, eid8, eid0)
+        mask = regs[mask_addr : mask_addr + 4]
+        mask_bytes = (mask[0], mask[1] & 0xE3, mask[2], mask[3])
+        if not any(mask_bytes):
+            # an all-zero mask lets every frame through, standard or extended
+            return True
+        for filter_addr in filter_addrs:
+            filt = regs[filter_addr : filter_addr + 4]
+            if bool(filt[1] & _EXIDE) != frame.extended:
+                continue
+            if all(
+                (frame_bytes[i] & mask_bytes[i]) == (filt[i] & (0xE3 if i == 1 else 0xFF) & mask_bytes[i])
+                for i in range(4)
+            ):
+                return True
+        return False
+
+    def _buffer_accepts(self, idx, frame):
+        rxm = (self.registers[_RXBCTRL[idx]] >> 5) & 0x03
+        if rxm == 0x03:
+            return True
+        if idx == 0:
+            return self._accepts(frame, _MASKS[0], _FILTERS[0:2])
+        return self._accepts(frame, _MASKS[1], _FILTERS[2:6])
+
+    def receive(self, frame):
+        """Offer a frame from the bus to this controller.
+
+        Returns:
+            bool: True if the frame landed in a receive buffer
+        """
+        if self.mode not in (MODE_NORMAL, MODE_LOOPBACK, MODE_LISTENONLY):
+            return False
+        regs = self.registers
+        target = None
+        if self._buffer_accepts(0, frame):
+            if not regs[_CANINTF] & _RXIF[0]:
+                target = 0
+            elif regs[_RXBCTRL[0]] & _BUKT and not regs[_CANINTF] & _RXIF[1]:
+                target = 1
+            else:
+                regs[_EFLG] |= _RXOVR[0] if not regs[_RXBCTRL[0]] & _BUKT else _RXOVR[1]
+                return False
+        elif self._buffer_accepts(1, frame):
+            if regs[_CANINTF] & _RXIF[1]:
+                regs[_EFLG] |= _RXOVR[1]
+                return False
+            target = 1
+        else:
+            return False
+        base = _RXBCTRL[target]
+        sidh, sidl, eid8, eid0 = self._encode_id(frame.id, frame.extended)
+        regs[base + 1] = sidh
+        regs[base + 2] = sidl
+        regs[base + 3] = eid8
+        regs[base + 4] = eid0
+        length = len(frame.data)
+        regs[base + 5] = length | (_RTR if frame.rtr else 0)
+        if not frame.rtr:
+            regs[base + 6 : base + 6 + length] = frame.data
+        regs[_CANINTF] |= _RXIF[target]
+        return True
+
+    def inject(self, can_id, data=b"", *, extended=False, rtr=False):
+        """Deliver a frame as if another node had sent it"""
+        return self.receive(Frame(can_id, data, extended=extended, rtr=rtr))
+
+
+class EmulatedBus:
+    """A CAN bus connecting several `MCP2515Emulator` controllers"""
+
+    def __init__(self):
+        self.nodes = []
+        self.frames = 0
+
+    def attach(self, chip):
+        """Connect a controller to the bus"""
+        chip._bus = self  # pylint: disable=protected-access
+        self.nodes.append(chip)
+
+    def broadcast(self, frame, sender=None):
+        """Deliver a frame to every node but its sender"""
+        self.frames += 1
+        for node in self.nodes:
+            if node is not sender:
+                node.receive(frame)
+
+
+class VirtualCANBridge:
+    """Forward frames between an `EmulatedBus` and a python-can bus such as SocketCAN ``vcan0``"""
+
+    def __init__(self, bus, channel="vcan0", interface="socketcan"):
+        import can  # pylint: disable=import-outside-toplevel
+
+        self._can = can
+        self._bus = bus
+        self._host = can.interface.Bus(interface=interface, channel=channel)
+        bus.attach(self)
+
+    def receive(self, frame):
+        """Forward a frame from the emulated bus to the host bus"""
+        self._host.send(
+            self._can.Message(
+                arbitration_id=frame.id,
+                data=frame.data,
+                is_extended_id=frame.extended,
+                is_remote_frame=frame.rtr,
+            )
+        )
+        return True
+
+    def poll(self, timeout=0.0):
+        """Forward at most one frame from the host bus to the emulated bus"""
+        message = self._host.recv(timeout)
+        if message is None:
+            return False
+        self._bus.broadcast(
+            Frame(
+                message.arbitration_id,
+                message.data,
+                extended=message.is_extended_id,
+                rtr=message.is_remote_frame,
+            ),
+            self,
+        )
+        return True
+
+    def shutdown(self):
+        """Close the host bus"""
+        self._host.shutdown()
@@ -0,0 +1,47 @@
+"""Print the binary telemetry written by the Pico's code.py (see Simple/pico/telemetry.py).
+
+Reads a serial port (needs pyserial) or a file captured from one:
+
+    python cantools/telemetry_dump.py /dev/ttyACM1
+    python cantools/telemetry_dump.py capture.bin
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Simple", "pico"))
+from telemetry import decode, format_record  # pylint: disable=wrong-import-position
+
+
+def _chunks(path, baudrate):
+    if os.path.isfile(path):
+        with open(path, "rb") as capture:
+            while True:
+                chunk = capture.read(4096)
+                if not chunk:
+                    return
+                yield chunk
+    import serial  # pylint: disable=import-outside-toplevel
+
+    with serial.Serial(path, baudrate, timeout=0.1) as port:
+        while True:
+            yield port.read(4096)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Decode Pico telemetry")
+    parser.add_argument("source", help="serial port or capture file")
+    parser.add_argument("--baudrate", type=int, default=115200)
+    args = parser.parse_args()
+
+    pending = b""
+    for chunk in _chunks(args.source, args.baudrate):
+        records, dropped, pending = decode(pending + chunk)
+        if dropped:
+            print("... %d record(s) dropped on the device" % dropped)
+        for record in records:
+            print(format_record(*record))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+"""Runs the driver against `mcp2515_emulator` under plain CPython"""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [
+    os.path.join(ROOT, "Simple", "pico", "lib"),
+    os.path.join(ROOT, "cantools"),
+]
+
+from mcp2515_emulator import MCP2515Emulator, install_stand_ins  # noqa: E402
+
+install_stand_ins()
+
+
+@pytest.fixture
+def chip():
+    """An emulated MCP2515 that only transmits when `MCP2515Emulator.process` is called"""
+    return MCP2515Emulator(auto_transmit=False)
+
+
+@pytest.fixture
+def can_bus(chip):
+    """A driver on `chip`"""
+    from adafruit_mcp2515 import MCP2515  # pylint: disable=import-outside-toplevel
+
+    return MCP2515(chip.spi, chip.cs)
@@ -0,0 +1,22 @@
+import asyncio
+
+import pytest
+
+from adafruit_mcp2515.canio import Message
+
+
+def test_receive(chip, can_bus):
+    listener = can_bus.listen(timeout=0.01, asynchronous=True)
+    chip.inject(0x123, b"hi")
+    message = asyncio.run(listener.receive())
+    assert (message.id, message.data) == (0x123, b"hi")
+    listener.deinit()
+
+
+def test_receive_after_deinit_raises_value_error(can_bus):
+    listener = can_bus.listen(timeout=0.01, asynchronous=True)
+    listener.deinit()
+    with pytest.raises(ValueError):
+        asyncio.run(listener.receive())
+    with pytest.raises(ValueError):
+        asyncio.run(listener.receive_into(Message(0, b"")))
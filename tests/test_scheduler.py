@@ -0,0 +1,40 @@
+from adafruit_mcp2515 import MCP2515
+from adafruit_mcp2515.canio import Message
+from adafruit_mcp2515.scheduler import SPIScheduler
+from mcp2515_emulator import EmulatedSPI, MCP2515Emulator
+
+
+def make_controllers(count, rx_burst):
+    spi = EmulatedSPI()
+    chips = [MCP2515Emulator(spi) for _ in range(count)]
+    scheduler = SPIScheduler(spi, rx_burst=rx_burst)
+    controllers = [MCP2515(scheduler, chip.cs, fast_init=True) for chip in chips]
+    return scheduler, chips, controllers
+
+
+def test_rx_burst_bounds_frames_per_controller():
+    scheduler, chips, controllers = make_controllers(2, rx_burst=1)
+    for can_bus in controllers:
+        can_bus.listen(timeout=0.01)
+    for chip in chips:
+        # fill RXB0 and RXB1
+        chip.inject(0x100, b"a")
+        chip.inject(0x101, b"b")
+        assert chip.registers[0x2C] & 0x03 == 0x03
+
+    assert scheduler.poll() == 2
+    for can_bus in controllers:
+        assert can_bus.last_drain_count == 1
+    assert scheduler.poll() == 2
+    for can_bus in controllers:
+        assert [message.id for message in can_bus.read_messages()] == [0x100, 0x101]
+
+
+def test_send_only_queues_until_poll():
+    scheduler, chips, controllers = make_controllers(1, rx_burst=4)
+    can_bus = controllers[0]
+    can_bus.listen(timeout=0.01)
+    can_bus.send(Message(0x10, b"x"))
+    assert chips[0].transmitted == []
+    scheduler.poll()
+    assert [frame.id for frame in chips[0].transmitted] == [0x10]
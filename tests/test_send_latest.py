@@ -0,0 +1,40 @@
+from adafruit_mcp2515.canio import Message
+
+
+def fill_transmit_buffers(can_bus):
+    for can_id in (0x001, 0x002, 0x003):
+        can_bus.send(Message(can_id, b"busy"))
+
+
+def test_replaces_queued_message_in_place(chip, can_bus):
+    with can_bus.listen(timeout=0.01):
+        fill_transmit_buffers(can_bus)
+        can_bus.send(Message(0x100, b"a"))
+        can_bus.send(Message(0x200, b"b"))
+        can_bus.send_latest(Message(0x100, b"c"))
+        assert can_bus.tx_queue_length == 2
+        assert can_bus.tx_superseded_count == 1
+        for _ in range(3):
+            chip.process()
+            can_bus.read_messages()
+    assert [(frame.id, frame.data) for frame in chip.transmitted[3:]] == [
+        (0x100, b"c"),
+        (0x200, b"b"),
+    ]
+
+
+def test_replacement_with_new_priority_is_requeued(chip, can_bus):
+    with can_bus.listen(timeout=0.01):
+        fill_transmit_buffers(can_bus)
+        can_bus.send(Message(0x100, b"a"))
+        can_bus.send(Message(0x200, b"b"))
+        # now less urgent than 0x200
+        can_bus.send_latest(Message(0x100, b"c"), priority=0x300)
+        assert can_bus.tx_queue_length == 2
+        for _ in range(3):
+            chip.process()
+            can_bus.read_messages()
+    assert [(frame.id, frame.data) for frame in chip.transmitted[3:]] == [
+        (0x200, b"b"),
+        (0x100, b"c"),
+    ]
@@ -0,0 +1,14 @@
+from adafruit_mcp2515 import MCP2515
+
+
+def test_startup_not_timed_without_stats(chip):
+    can_bus = MCP2515(chip.spi, chip.cs, fast_init=True)
+    assert can_bus.stats is None
+    assert can_bus.startup_time_us is None
+
+
+def test_startup_timed_with_stats(chip):
+    can_bus = MCP2515(chip.spi, chip.cs, fast_init=True, collect_stats=True)
+    assert can_bus.startup_time_us >= 0
+    can_bus.restart()
+    assert can_bus.startup_time_us >= 0
@@ -0,0 +1,15 @@
+import pytest
+
+from adafruit_mcp2515 import _BAUD_RATES
+from adafruit_mcp2515 import timing
+
+
+def test_baud_rate_table_matches_solver():
+    assert timing.check_table(_BAUD_RATES) == []
+
+
+@pytest.mark.parametrize("crystal_freq", [8000000, 10000000, 16000000])
+@pytest.mark.parametrize("bitrate", [125000, 250000, 500000])
+def test_solved_timing_hits_the_bitrate(crystal_freq, bitrate):
+    actual, _ = timing.decode(crystal_freq, *timing.solve(crystal_freq, bitrate))
+    assert actual == bitrate